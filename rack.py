@@ -0,0 +1,388 @@
+# ==============================================================================
+# Rack Command Line
+# Builds and exports selected parts of a rack design.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py list                                   # designs and their parts
+#     python rack.py build v106                             # everything, like running rack_v106.py
+#     python rack.py build v106 --parts tray,shelf --formats stl
+#     python rack.py build v3 --parts box --out build/ --show
+#     python rack.py build v3 --profile preview                # coarse STL mesh for everything
+#     python rack.py build v106 --profile tray=archive          # per part, others keep their profile
+#     python rack.py build v106 --show --detail detailed        # colored board components, see rack_lod.py
+#     python rack.py sweep v106 --grid wall_thickness=1.6,2.0 --parts tray   # variants, see rack_sweep.py
+#     python rack.py watch v106 --params my_rack.json           # rebuild on save, see rack_watch.py
+#     python rack.py deps v106 --changed leg_inset              # what a change rebuilds, see rack_deps.py
+#     python rack.py check v106                                 # colliding parts, see rack_interference.py
+#     python rack.py infill v106 --params best.json             # lightest honeycombs, see rack_infill.py
+#     python rack.py layout v3 --set m2_y=40                    # top view and gaps without OCC, see rack_layout.py
+#     python rack.py pack v3 --params packed.json               # smallest box for the boards, see rack_pack.py
+#     python rack.py build v3 --params packed.json              # build with parameter overrides
+#
+# Only the requested parts are built ("assembly" pulls in every part of its
+# design). Exports follow the design's EXPORTS list, filtered by --formats.
+# Files that haven't changed since the last export are skipped (--force
+# writes them anyway).
+#
+# STL mesh profiles (rack_mesh.py): a bare --profile name replaces the default
+# and the design's STL_PROFILES; part=name entries override single parts.
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+from rack_estimate import MATERIALS
+from rack_export import FORMATS, STL_PROFILE, export_format, export_parts
+from rack_infill import MIN_RIM, MIN_WALL
+import rack_lod
+from rack_manifest import FORCE, design_params
+from rack_mesh import PROFILES
+from rack_params import load_variant, parse_value
+from rack_sweep import grid_variants, parse_values, run_sweep
+
+# Design name -> generator module
+DESIGNS = {
+    "v2": "rack_v2",
+    "v3": "rack_v3",
+    "v106": "rack_v106",
+}
+
+
+def load_design(name):
+    return importlib.import_module(DESIGNS[name])
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# --- Commands ---
+
+def cmd_list(args):
+    for name in args.designs or DESIGNS:
+        module = load_design(name)
+        print(f"{name} ({DESIGNS[name]}.py)")
+        for part in module.PART_NAMES:
+            files = [filename for p, filename in module.EXPORTS if p == part]
+            print(f"  {part:<12} {', '.join(files) if files else '(no exports)'}")
+
+
+def cmd_build(args, parser):
+    if args.params:
+        with open(args.params) as f:
+            overrides = json.load(f)
+        os.environ["RACK_JOBS"] = "1" # Workers would import the module without the overrides
+        try:
+            module = load_variant(DESIGNS[args.design], overrides, register=True)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        module = load_design(args.design)
+
+    names = split_list(args.parts) if args.parts else list(module.PART_NAMES)
+    unknown = [name for name in names if name not in module.PART_NAMES]
+    if unknown:
+        parser.error(f"unknown part(s) for {args.design}: {', '.join(unknown)} (choose from {', '.join(module.PART_NAMES)})")
+
+    formats = split_list(args.formats) if args.formats else FORMATS
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+
+    for name in names:
+        if not any(p == name and export_format(filename) in formats for p, filename in module.EXPORTS):
+            print(f"Note: {name} has no {'/'.join(formats)} export (built for --show only)")
+
+    default, overrides = None, {}
+    for item in split_list(args.profile or ""):
+        part, _, name = item.rpartition("=")
+        if name not in PROFILES:
+            parser.error(f"unknown profile: {name} (choose from {', '.join(PROFILES)})")
+        if part and part not in module.PART_NAMES:
+            parser.error(f"unknown part for {args.design}: {part} (choose from {', '.join(module.PART_NAMES)})")
+        if part:
+            overrides[part] = name
+        else:
+            default = name
+    # A bare profile wins over the design's own per-part choices
+    profiles = dict({} if default else getattr(module, "STL_PROFILES", {}), **overrides)
+
+    parts = module.build(names)
+
+    os.makedirs(args.out, exist_ok=True)
+    export_parts(parts, module.EXPORTS, formats, args.out, design_params(vars(module)), args.force,
+                 profile=default or STL_PROFILE, profiles=profiles, design=DESIGNS[args.design])
+
+    if args.show:
+        try:
+            module.show_parts(parts)
+        except Exception as e:
+            print(f"Visualization skipped: {e}")
+
+    if args.check:
+        if "assembly" not in parts:
+            print("Interference check skipped: no assembly built")
+            return 0
+        return check_assembly(parts["assembly"])
+    return 0
+
+
+def check_assembly(assembly):
+    from rack_interference import check, collisions, print_report
+
+    report = check(assembly)
+    print_report(report)
+    return 1 if collisions(report) else 0
+
+
+def cmd_sweep(args, parser):
+    module = load_design(args.design)
+    names = split_list(args.parts) if args.parts else None
+    unknown = [name for name in names or () if name not in module.PART_NAMES]
+    if unknown:
+        parser.error(f"unknown part(s) for {args.design}: {', '.join(unknown)} (choose from {', '.join(module.PART_NAMES)})")
+
+    grid = {}
+    for item in args.grid or ():
+        name, sep, values = item.partition("=")
+        if not sep or not values:
+            parser.error(f"--grid expects name=values, got {item!r}")
+        grid[name.strip()] = parse_values(values)
+    base = None
+    if args.variants:
+        with open(args.variants) as f:
+            base = json.load(f)
+    variants = grid_variants(grid, base)
+
+    try:
+        rows = run_sweep(DESIGNS[args.design], variants, names, split_list(args.formats) if args.formats else None,
+                         args.out, args.timeout, args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+    return 1 if any(row["status"] != "ok" for row in rows) else 0
+
+
+def cmd_watch(args, parser):
+    module = load_design(args.design)
+    names = split_list(args.parts) if args.parts else None
+    unknown = [name for name in names or () if name not in module.PART_NAMES]
+    if unknown:
+        parser.error(f"unknown part(s) for {args.design}: {', '.join(unknown)} (choose from {', '.join(module.PART_NAMES)})")
+
+    from rack_watch import Watcher
+    try:
+        Watcher(DESIGNS[args.design], args.params, names, args.export, args.port).run(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_check(args, parser):
+    module = load_design(args.design)
+    if "assembly" not in module.PART_NAMES:
+        parser.error(f"{args.design} has no assembly to check")
+    return check_assembly(module.build(["assembly"])["assembly"])
+
+
+def cmd_deps(args, parser):
+    import rack_deps
+
+    module = load_design(args.design)
+    if args.changed:
+        changed = split_list(args.changed)
+        unknown = [name for name in changed if name not in rack_deps.parameters(vars(module))]
+        if unknown:
+            parser.error(f"unknown parameter(s) for {args.design}: {', '.join(unknown)}")
+        parts, files = rack_deps.affected(module, changed)
+        print(f"Parts:   {', '.join(parts) or '(none)'}")
+        print(f"Exports: {', '.join(files) or '(none)'}")
+        return 0
+
+    if args.check:
+        status = 0
+        for name, lines in sorted(rack_deps.duplicates(module).items()):
+            print(f"{DESIGNS[args.design]}.py: {name} assigned on lines {', '.join(map(str, lines))}")
+            status = 1
+        for name in getattr(module, "PARTS", None) or ():
+            func = getattr(module, module.PARTS[name][0])
+            declared = getattr(func, "cache_params", None)
+            if declared is not None:
+                missing = sorted(rack_deps.generator_reads(func) - set(declared))
+                if missing:
+                    print(f"{func.__name__}: reads undeclared {', '.join(missing)} (keyed anyway)")
+        print("No duplicate assignments" if status == 0 else "Duplicate assignments found")
+        return status
+
+    for name, deps in rack_deps.part_dependencies(module).items():
+        print(f"{name} ({len(deps)})")
+        print(f"  {', '.join(sorted(deps)) or '(none)'}")
+    return 0
+
+
+def cmd_infill(args, parser):
+    import rack_infill
+
+    module = load_design(args.design)
+    plates = rack_infill.plates(module)
+    if not plates:
+        parser.error(f"{args.design} has no honeycomb plates")
+    names = split_list(args.plate) if args.plate else list(plates)
+    unknown = [name for name in names if name not in plates]
+    if unknown:
+        parser.error(f"unknown plate(s) for {args.design}: {', '.join(unknown)} (choose from {', '.join(plates)})")
+
+    found = {}
+    for name in names:
+        result = rack_infill.optimize(plates[name], args.min_wall, args.max_cell, args.min_rim, args.material)
+        rack_infill.print_result(name, plates[name], result, args.material, args.min_rim)
+        found.update(rack_infill.overrides(plates[name], result["hex"]))
+    if args.params:
+        with open(args.params, "w") as f:
+            json.dump(found, f, indent=2)
+        print(f"Wrote {args.params} ({len(found)} parameters)")
+    return 0
+
+
+def cmd_layout(args, parser):
+    import rack_layout
+
+    overrides = {}
+    if args.params:
+        with open(args.params) as f:
+            overrides.update(json.load(f))
+    for item in args.set or ():
+        name, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--set needs NAME=VALUE, got {item!r}")
+        overrides[name.strip()] = parse_value(value.strip())
+    try:
+        report = rack_layout.run(DESIGNS[args.design], overrides)
+    except ValueError as e:
+        parser.error(str(e))
+    rack_layout.print_report(report, args.gaps)
+    for path in rack_layout.write(report, args.out):
+        print(f"Wrote {path}")
+    return 1 if rack_layout.problems(report) else 0
+
+
+def cmd_pack(args, parser):
+    import rack_layout
+    import rack_pack
+
+    try:
+        result = rack_pack.pack(DESIGNS[args.design], None, args.gap, args.wall_gap, args.step)
+    except ValueError as e:
+        parser.error(str(e))
+    rack_pack.print_result(result)
+    if args.params:
+        with open(args.params, "w") as f:
+            json.dump(result["overrides"], f, indent=2)
+        print(f"Wrote {args.params} ({len(result['overrides'])} parameters)")
+    return 1 if rack_layout.problems(result["check"]) else 0
+
+
+# --- Main ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="rack", description="Build and export 10\" rack parts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p_list = commands.add_parser("list", help="list designs, parts and export files")
+    p_list.add_argument("designs", nargs="*", metavar="design", help=f"{', '.join(DESIGNS)} (default: all)")
+
+    p_build = commands.add_parser("build", help="build and export parts of a design")
+    p_build.add_argument("design", choices=list(DESIGNS))
+    p_build.add_argument("--parts", help="comma-separated parts (default: all)")
+    p_build.add_argument("--formats", help=f"comma-separated formats: {','.join(FORMATS)} (default: all)")
+    p_build.add_argument("--out", default=".", help="output folder (default: current folder)")
+    p_build.add_argument("--show", action="store_true", help="send the parts to ocp_vscode")
+    p_build.add_argument("--profile", help=f"STL mesh profile ({', '.join(PROFILES)}), or comma-separated part=profile")
+    p_build.add_argument("--force", action="store_true", default=FORCE, help="export even if rack_manifest.json says a file is unchanged")
+    p_build.add_argument("--check", action="store_true", help="check the assembly for colliding parts (exit 1 on collisions)")
+    p_build.add_argument("--detail", choices=rack_lod.DETAILS, help="board models: ghost (one solid per board) or detailed (default: RACK_BOARD_DETAIL or ghost)")
+    p_build.add_argument("--params", metavar="FILE", help="JSON file of {parameter: value} overrides (builds in-process)")
+
+    p_sweep = commands.add_parser("sweep", help="build parameter variants of a design side by side")
+    p_sweep.add_argument("design", choices=list(DESIGNS))
+    p_sweep.add_argument("--grid", action="append", metavar="NAME=VALUES", help="parameter values: 6,10 or start:stop:step (repeatable)")
+    p_sweep.add_argument("--variants", metavar="FILE", help="JSON list of {parameter: value} overrides")
+    p_sweep.add_argument("--parts", help="comma-separated parts (default: all)")
+    p_sweep.add_argument("--formats", help=f"comma-separated formats: {','.join(FORMATS)} (default: all)")
+    p_sweep.add_argument("--out", default="sweeps", help="output folder, one subfolder per variant (default: sweeps)")
+    p_sweep.add_argument("--timeout", type=float, help="seconds before a variant is killed (default: none)")
+    p_sweep.add_argument("--jobs", type=int, help="variants built at the same time (default: RACK_JOBS or CPU count)")
+
+    p_watch = commands.add_parser("watch", help="rebuild on every change and push it to the viewer")
+    p_watch.add_argument("design", choices=list(DESIGNS))
+    p_watch.add_argument("--params", metavar="FILE", help="JSON file of {parameter: value} overrides, watched too")
+    p_watch.add_argument("--parts", help="comma-separated parts (default: all)")
+    p_watch.add_argument("--export", metavar="FOLDER", help="also export changed parts to FOLDER")
+    p_watch.add_argument("--port", type=int, default=3939, help="ocp_vscode port (default: 3939)")
+    p_watch.add_argument("--interval", type=float, default=0.5, help="seconds between file checks (default: 0.5)")
+    p_watch.add_argument("--detail", choices=rack_lod.DETAILS, help="board models: ghost (one solid per board) or detailed (default: RACK_BOARD_DETAIL or ghost)")
+
+    p_deps = commands.add_parser("deps", help="show which parameters each part depends on")
+    p_deps.add_argument("design", choices=list(DESIGNS))
+    p_deps.add_argument("--changed", metavar="NAMES", help="comma-separated parameters: print the parts and exports to rebuild")
+    p_deps.add_argument("--check", action="store_true", help="report parameters assigned more than once (exit 1)")
+
+    p_check = commands.add_parser("check", help="check a design's assembly for colliding parts")
+    p_check.add_argument("design", choices=list(DESIGNS))
+    p_check.add_argument("--detail", choices=rack_lod.DETAILS, help="board models: ghost (one solid per board) or detailed (default: RACK_BOARD_DETAIL or ghost)")
+
+    p_infill = commands.add_parser("infill", help="search the lightest honeycomb for a design's plates")
+    p_infill.add_argument("design", choices=list(DESIGNS))
+    p_infill.add_argument("--plate", help="comma-separated plates (default: all)")
+    p_infill.add_argument("--min-wall", type=float, default=MIN_WALL, help="mm between cells (default: RACK_INFILL_MIN_WALL or 1.2)")
+    p_infill.add_argument("--max-cell", type=float, help="largest cell circumradius in mm (default: the plate's current cell)")
+    p_infill.add_argument("--min-rim", type=float, default=MIN_RIM, help="mm of solid border (default: RACK_INFILL_MIN_RIM or 3)")
+    p_infill.add_argument("--material", default="PLA", choices=list(MATERIALS), help="material for the mass (default: PLA)")
+    p_infill.add_argument("--params", metavar="FILE", help="write the winners as {parameter: value} overrides")
+
+    p_layout = commands.add_parser("layout", help="top view and gaps of a design's boards from its layout math (no OCC)")
+    p_layout.add_argument("design", choices=list(DESIGNS))
+    p_layout.add_argument("--set", action="append", metavar="NAME=VALUE", help="parameter override (repeatable)")
+    p_layout.add_argument("--params", metavar="FILE", help="JSON file of {parameter: value} overrides")
+    p_layout.add_argument("--out", default=".", help="folder for <design>_layout.svg / .json (default: current folder)")
+    p_layout.add_argument("--gaps", type=int, default=10, help="smallest gaps and wall clearances printed (default: 10, overlaps always)")
+
+    p_pack = commands.add_parser("pack", help="search component positions for the smallest box (no OCC)")
+    p_pack.add_argument("design", choices=list(DESIGNS))
+    p_pack.add_argument("--gap", type=float, help="mm between components (default: the design's PACKING gap)")
+    p_pack.add_argument("--wall-gap", type=float, help="mm from components to the walls (default: the design's PACKING wall_gap)")
+    p_pack.add_argument("--step", type=float, default=1.0, help="box size increment in mm (default: 1)")
+    p_pack.add_argument("--params", metavar="FILE", help="write the box size and positions as {parameter: value} overrides")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "detail", None):
+        # Before any design is imported, build workers inherit the environment
+        os.environ["RACK_BOARD_DETAIL"] = rack_lod.BOARD_DETAIL = args.detail
+    if args.command == "list":
+        unknown = [name for name in args.designs if name not in DESIGNS]
+        if unknown:
+            p_list.error(f"unknown design(s): {', '.join(unknown)} (choose from {', '.join(DESIGNS)})")
+        cmd_list(args)
+    elif args.command == "sweep":
+        return cmd_sweep(args, p_sweep)
+    elif args.command == "watch":
+        cmd_watch(args, p_watch)
+    elif args.command == "deps":
+        return cmd_deps(args, p_deps)
+    elif args.command == "check":
+        return cmd_check(args, p_check)
+    elif args.command == "infill":
+        return cmd_infill(args, p_infill)
+    elif args.command == "layout":
+        return cmd_layout(args, p_layout)
+    elif args.command == "pack":
+        return cmd_pack(args, p_pack)
+    else:
+        return cmd_build(args, p_build)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# ==============================================================================
+# Benchmark Harness
+# Times every generator stage over several runs and flags regressions
+# against a stored baseline.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack_bench.py                       # all generators, 3 repeats
+#     python rack_bench.py rack_v106 --repeat 5  # one module
+#     python rack_bench.py --set-baseline        # make this run the new baseline
+#
+# Stages come from the `with stage(...)` blocks in the generators (floor hex
+# sketch, extrude, walls, ears, slopes, subtractions, ...). Every part is then
+# tessellated and written to STEP and STL in a temporary folder, timed as the
+# "<part>.tessellate", "<part>.step" and "<part>.stl" stages.
+#
+# The part cache is switched off so every repeat really builds.
+#
+# Each run is appended to the history file (rack_bench.json). The first run,
+# or one made with --set-baseline, is the baseline. A stage whose median is
+# more than --threshold slower than its baseline median is flagged and the
+# exit code is 1.
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+
+import rack_cache
+from rack_export import STL_PROFILE, export_shape, tessellate
+from rack_profile import recording, stage
+
+# Generators per module. Modules are imported, nothing is exported at import time.
+BENCHMARKS = {
+    "rack_v106": ["make_tray", "make_shelf", "make_spacers"],
+    "rack_v2": ["make_bridge", "make_tray", "make_spacers"],
+    "rack_v3": ["make_box"],
+}
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rack_bench.json")
+
+# Stages faster than this are too noisy to flag
+MIN_TIME = 0.01
+
+
+# --- Running ---
+
+def run_part(func, folder):
+    """Builds one part and exports it, returning [(stage, seconds), ...]."""
+    from build123d import Compound
+
+    name = func.__name__.removeprefix("make_")
+    with recording() as records:
+        with stage(f"{name}.build"):
+            shape = func()
+        if isinstance(shape, tuple):
+            shape = Compound(list(shape)) # make_box returns (box, text)
+
+        # Meshed once up front, like rack_export.export_parts does
+        with stage(f"{name}.tessellate"):
+            tessellate(shape, STL_PROFILE)
+        with stage(f"{name}.step"):
+            export_shape(shape, os.path.join(folder, f"{name}.step"))
+        with stage(f"{name}.stl"):
+            export_shape(shape, os.path.join(folder, f"{name}.stl"), STL_PROFILE, tessellated=True)
+    return records
+
+
+def run_module(module_name, repeat, folder):
+    """Returns {stage: [seconds per repeat]} for all generators of a module."""
+    module = importlib.import_module(module_name)
+    timings = {}
+    for func_name in BENCHMARKS[module_name]:
+        func = getattr(module, func_name)
+        for _ in range(repeat):
+            # Sum repeated stages within one run (e.g. a stage inside a loop)
+            run = {}
+            for name, seconds in run_part(func, folder):
+                run[name] = run.get(name, 0.0) + seconds
+            for name, seconds in run.items():
+                timings.setdefault(name, []).append(seconds)
+        print(f"  {module_name}.{func_name} done")
+    return timings
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "runs": len(samples),
+    }
+
+
+# --- History ---
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {"baseline": None, "runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+
+
+def find_regressions(results, baseline, threshold, min_time=MIN_TIME):
+    """Returns [(module, stage, baseline median, median)] for stages slower than threshold."""
+    regressions = []
+    for module_name, stages in results.items():
+        for name, summary in stages.items():
+            base = (baseline or {}).get(module_name, {}).get(name)
+            if base is None or summary["median"] < min_time:
+                continue
+            if summary["median"] > base["median"] * (1 + threshold):
+                regressions.append((module_name, name, base["median"], summary["median"]))
+    return regressions
+
+
+def print_report(results, baseline, regressions):
+    flagged = {(m, s) for m, s, _, _ in regressions}
+    for module_name, stages in results.items():
+        print(f"\n{module_name}")
+        for name, summary in stages.items():
+            base = (baseline or {}).get(module_name, {}).get(name)
+            delta = f"{(summary['median'] / base['median'] - 1) * 100:+6.1f}%" if base and base["median"] > 0 else "      -"
+            flag = "  REGRESSION" if (module_name, name) in flagged else ""
+            print(f"  {name:<24} median {summary['median']:7.3f}s  min {summary['min']:7.3f}s  {delta}{flag}")
+
+
+# --- Main ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage timing benchmark for the rack generators.")
+    parser.add_argument("modules", nargs="*", default=list(BENCHMARKS), help="modules to benchmark (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per generator (default: 3)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs. baseline (default: 0.2 = 20%%)")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON history file")
+    parser.add_argument("--set-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    unknown = [m for m in args.modules if m not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown module(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+
+    rack_cache.ENABLED = False # Time the real build, not a cache hit
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for module_name in args.modules:
+            print(f"Benchmarking {module_name} ({args.repeat} runs)...")
+            timings = run_module(module_name, args.repeat, folder)
+            results[module_name] = {name: summarize(samples) for name, samples in timings.items()}
+
+    history = load_history(args.history)
+    baseline = history["baseline"]["results"] if history["baseline"] else None
+    regressions = find_regressions(results, baseline, args.threshold)
+    print_report(results, baseline, regressions)
+
+    run = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "versions": rack_cache.library_versions(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    history["runs"].append(run)
+    # Modules without a baseline yet get this run as theirs
+    new = [m for m in results if args.set_baseline or m not in (baseline or {})]
+    if new:
+        merged = dict(baseline or {}, **{m: results[m] for m in new})
+        history["baseline"] = dict(run, results=merged)
+        print(f"\nStored as baseline: {', '.join(new)}")
+    save_history(args.history, history)
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) more than {args.threshold:.0%} slower than the baseline.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
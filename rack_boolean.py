@@ -0,0 +1,76 @@
+# ==============================================================================
+# Hole / Slot Subtraction
+# Sequential or batched cutting of tool solids from a BuildPart.
+# ==============================================================================
+#
+# Generators collect their cutters (rack slots, jack holes, screw holes, ...)
+# into a list and hand them to subtract():
+#
+#     with BuildPart() as floor:
+#         ...
+#         subtract(floor, tray_cutters(), "tray")
+#
+# Environment:
+#   RACK_BATCH_CUT=0        classic nested BuildPart(mode=Mode.SUBTRACT): the tools are
+#                           fused into the cutter one after another, then cut (default)
+#   RACK_BATCH_CUT=1        all tools in a single multi-argument cut
+#   RACK_BATCH_CUT=compare  run both, report the speedup and check the volumes match
+#
+# The batched cut goes through Shape.cut(*tools), i.e. one BRepAlgoAPI_Cut with
+# every tool in its tool list and SetRunParallel(True).
+
+import os
+import time
+
+MODE = os.environ.get("RACK_BATCH_CUT", "0")
+
+# Relative volume difference still counted as a match
+VOLUME_TOLERANCE = 1e-6
+
+
+def sequential_cut(shape, tools):
+    """Fuses the tools one after another, then cuts (what a nested BuildPart(mode=Mode.SUBTRACT) does)."""
+    cutter = tools[0]
+    for tool in tools[1:]:
+        cutter = cutter.fuse(tool)
+    return shape.cut(cutter)
+
+
+def batched_cut(shape, tools):
+    return shape.cut(*tools)
+
+
+def compare_cuts(shape, tools, name="cut"):
+    """Runs both cut strategies on shape and prints timings and volumes. Returns the batched result."""
+    start = time.perf_counter()
+    sequential = sequential_cut(shape, tools)
+    t_sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = batched_cut(shape, tools)
+    t_batched = time.perf_counter() - start
+
+    v_sequential, v_batched = sequential.volume, batched.volume
+    match = abs(v_sequential - v_batched) <= VOLUME_TOLERANCE * max(abs(v_sequential), 1.0)
+    print(
+        f"{name}: {len(tools)} cutters, sequential {t_sequential:.3f}s, batched {t_batched:.3f}s "
+        f"({t_sequential / max(t_batched, 1e-9):.1f}x), volume {v_sequential:.3f} vs {v_batched:.3f} "
+        f"{'OK' if match else 'MISMATCH'}"
+    )
+    if not match:
+        raise RuntimeError(f"{name}: batched cut changed the volume ({v_sequential} -> {v_batched})")
+    return batched
+
+
+def subtract(builder, tools, name="cut"):
+    """Subtracts tools from the part of an active BuildPart, using the RACK_BATCH_CUT mode."""
+    from build123d import Mode, add
+
+    if MODE == "compare":
+        add(compare_cuts(builder.part, tools, name), mode=Mode.REPLACE)
+    elif MODE == "1":
+        add(tools, mode=Mode.SUBTRACT) # Single cut with all tools
+    else:
+        # A nested BuildPart here would not attach to the caller's builder
+        # (build123d only nests builders opened in the same function)
+        add(sequential_cut(builder.part, tools), mode=Mode.REPLACE)
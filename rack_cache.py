@@ -0,0 +1,272 @@
+# ==============================================================================
+# Part Cache
+# Content-addressed on-disk BREP cache for the part generators
+# (make_tray, make_shelf, make_spacers, make_bridge, make_box).
+# ==============================================================================
+#
+# Usage (in a generator module):
+#
+#     @cached_part("rack_inner_width", "tray_depth", ...)
+#     def make_tray():
+#         ...
+#
+# The key is a hash of:
+#   - the module globals the generator reads (the names passed to cached_part,
+#     plus the parameters rack_deps finds in its bytecode)
+#   - the generator source code and the helpers it calls, in its own module
+#     or in the rack_* helper modules (rack_pattern, rack_boolean, ...)
+#     (so editing the geometry invalidates it)
+#   - the build123d / OCP versions
+#
+# Results are stored as BREP files in .rack_cache/ next to this file.
+# Compound trees (labels, colors, shared instances) go through
+# rack_parallel.pack, with the tree kept in the entry's metadata.
+# Least recently used entries are evicted once the cache grows too big.
+# A miss returns the result as read back from its entry, so a part is the
+# same shape (and exports the same bytes) whether it was built or loaded.
+#
+# Environment:
+#   RACK_CACHE=0                 disable the cache
+#   RACK_CACHE_DIR=path          cache location
+#   RACK_CACHE_MAX_ENTRIES=64    entry limit
+#   RACK_CACHE_MAX_MB=512        size limit
+
+import functools
+import glob
+import hashlib
+import inspect
+import io
+import json
+import os
+import tempfile
+import time
+from importlib import metadata
+
+# --- Settings ---
+ENABLED = os.environ.get("RACK_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get(
+    "RACK_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rack_cache"),
+)
+MAX_ENTRIES = int(os.environ.get("RACK_CACHE_MAX_ENTRIES", "64"))
+MAX_BYTES = int(os.environ.get("RACK_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_versions = None
+
+
+def library_versions():
+    """Returns the build123d / OCP versions that go into every cache key."""
+    global _versions
+    if _versions is None:
+        _versions = {}
+        try:
+            _versions["build123d"] = metadata.version("build123d")
+        except metadata.PackageNotFoundError:
+            _versions["build123d"] = None
+        try:
+            import OCP
+            _versions["OCP"] = getattr(OCP, "__version__", None)
+        except ImportError:
+            _versions["OCP"] = None
+    return _versions
+
+
+# --- BREP I/O ---
+# build123d is imported lazily so that importing this module stays cheap.
+
+def write_brep(shape, path):
+    from build123d import export_brep
+    if not export_brep(shape, path):
+        raise IOError(f"Could not write {path}")
+
+
+def read_brep(path):
+    from build123d import import_brep
+    return import_brep(path)
+
+
+def brep_bytes(shape):
+    """Serializes a shape to BREP bytes (for shipping between processes)."""
+    buffer = io.BytesIO()
+    write_brep(shape, buffer)
+    return buffer.getvalue()
+
+
+def from_brep_bytes(data):
+    # import_brep only reads from a path
+    fd, path = tempfile.mkstemp(suffix=".brep")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return read_brep(path)
+    finally:
+        os.remove(path)
+
+
+# --- Keys ---
+
+def part_params(func):
+    """Returns the current values of the globals a cached generator reads.
+
+    The declared names plus every parameter the generator (or a helper in its
+    module) reads, so a name missing from the declaration still counts.
+    """
+    from rack_deps import generator_reads
+
+    module_globals = inspect.unwrap(func).__globals__
+    names = set(func.cache_params) | generator_reads(func)
+    return {name: module_globals.get(name) for name in sorted(names)}
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def source_digest(func):
+    """Hashes a generator's source plus the helper functions it calls (same module or rack_*)."""
+    seen = []
+
+    def visit(f):
+        f = inspect.unwrap(f)
+        if f in seen:
+            return
+        seen.append(f)
+        for name in sorted(_code_names(f.__code__)):
+            obj = f.__globals__.get(name)
+            if inspect.isfunction(obj) and (obj.__module__ == f.__module__ or obj.__module__.startswith("rack_")):
+                visit(obj)
+
+    visit(func)
+    return hashlib.sha256("".join(inspect.getsource(f) for f in seen).encode()).hexdigest()
+
+
+def part_key(func):
+    """Returns the cache key of a @cached_part generator for the current globals."""
+    payload = json.dumps({
+        "generator": f"{func.__module__}.{func.__qualname__}",
+        "params": part_params(func),
+        "source": source_digest(func),
+        "versions": library_versions(),
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# --- Storage ---
+# Each entry is <key>.json (metadata) plus <key>-<n>.brep per returned shape.
+# The mtime of the .json file is the LRU timestamp.
+
+def _entry_files(key):
+    return [os.path.join(CACHE_DIR, f"{key}.json")] + sorted(glob.glob(os.path.join(CACHE_DIR, f"{key}-*.brep")))
+
+
+def _remove(key):
+    for path in _entry_files(key):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def load(key):
+    """Returns the cached result for key, or None on a miss."""
+    meta_path = os.path.join(CACHE_DIR, f"{key}.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        shapes = [_read_entry_shape(key, i, meta) for i in range(meta["count"])]
+    except (OSError, ValueError, KeyError):
+        # Half-written or corrupt entry: drop it and rebuild
+        _remove(key)
+        return None
+    os.utime(meta_path)
+    return tuple(shapes) if meta["tuple"] else shapes[0]
+
+
+def _read_entry_shape(key, i, meta):
+    from rack_parallel import unpack
+
+    path = os.path.join(CACHE_DIR, f"{key}-{i}.brep")
+    tree = meta.get("trees", {}).get(str(i))
+    if tree is None:
+        return read_brep(path)
+    with open(path, "rb") as f:
+        return unpack(dict(tree, brep=f.read()))
+
+
+def store(key, result, info=None):
+    """Writes a generator result (one shape or a tuple of shapes) to the cache."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    from rack_parallel import pack
+
+    shapes = list(result) if isinstance(result, tuple) else [result]
+    trees = {}
+    for i, shape in enumerate(shapes):
+        path = os.path.join(CACHE_DIR, f"{key}-{i}.brep")
+        if getattr(shape, "children", ()):
+            # Compound tree (labels, colors, shared instances): leaves in the BREP, tree in the metadata
+            tree = pack(shape)
+            with open(path, "wb") as f:
+                f.write(tree.pop("brep"))
+            trees[str(i)] = tree
+        else:
+            write_brep(shape, path)
+    # Metadata last: an entry only counts once its .json exists
+    meta = dict(info or {}, count=len(shapes), tuple=isinstance(result, tuple), trees=trees, created=time.time())
+    with open(os.path.join(CACHE_DIR, f"{key}.json"), "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True, default=repr)
+    evict()
+
+
+def evict(max_entries=None, max_bytes=None):
+    """Removes least recently used entries until the cache fits its limits."""
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+
+    metas = glob.glob(os.path.join(CACHE_DIR, "*.json"))
+    metas.sort(key=os.path.getmtime, reverse=True) # Newest first
+    total = 0
+    for n, meta_path in enumerate(metas):
+        key = os.path.splitext(os.path.basename(meta_path))[0]
+        total += sum(os.path.getsize(p) for p in _entry_files(key) if os.path.exists(p))
+        if n >= max_entries or total > max_bytes:
+            _remove(key)
+
+
+def clear():
+    for meta_path in glob.glob(os.path.join(CACHE_DIR, "*.json")):
+        _remove(os.path.splitext(os.path.basename(meta_path))[0])
+
+
+# --- Decorator ---
+
+def cached_part(*params):
+    """Caches a generator's result on disk, keyed on the module globals it reads."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Only argument-free calls are cached; everything else reads globals we can't see
+            if not ENABLED or args or kwargs:
+                return func(*args, **kwargs)
+
+            key = part_key(wrapper)
+            result = load(key)
+            if result is not None:
+                print(f"Loaded {func.__name__}() from cache ({key[:12]})")
+                return result
+
+            result = func()
+            store(key, result, {"generator": func.__qualname__, "params": part_params(wrapper)})
+            # Returned as read back, like a hit: a BREP round trip moves some
+            # coordinates by an ulp, which is enough to change the mesh
+            loaded = load(key)
+            return result if loaded is None else loaded
+
+        wrapper.cache_params = params
+        return wrapper
+    return decorator
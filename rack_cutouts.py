@@ -0,0 +1,94 @@
+# ==============================================================================
+# Connector Wall Cutouts
+# Wall openings derived from the boards' connector envelopes.
+# ==============================================================================
+#
+# Usage:
+#
+#     SATA_CONNECTORS = [("connector 1", 48, 25, 10, 25, 12), ...]   # (label, u, v, w, d, height) on the board
+#
+#     openings = wall_openings([
+#         ("SATA", connector_boxes(SATA_CONNECTORS, sata_x, sata_y, 58, 78, board_top)),
+#         ("DC-DC", connector_boxes(DCDC_TERMINALS, dcdc_x, dcdc_y, 100.3, 68, board_top, rotation=180)),
+#     ], box_inner_w, box_inner_d, margin=3, reach=10)
+#
+#     walls = batched_cut(walls, wall_cutters(openings, box_inner_w, box_inner_d, wall_thickness))
+#     cutout(o["name"], o["wall"], *opening_rect(o, box_inner_w, box_inner_d, wall_thickness), o["z"], o["group"])
+#
+# Connectors are the same (label, u, v, w, d, height) tuples rack_layout.board
+# takes: their positions on the PCB, rotation=180 turning them about the
+# board's center. A connector within reach of a wall of the box (the
+# distance from its outline to the wall's inside) faces that wall; the
+# connectors of one board facing one wall make one opening, their extent
+# along the wall and in z grown by the margin. Connectors further in (a DC
+# jack with room for its plug) get none.
+#
+# Every opening is a box reaching 5mm past both faces of its wall, so all of
+# them go into one cut (rack_boolean.batched_cut) instead of one boolean each.
+# This module is plain math (build123d only inside wall_cutters), so the
+# layout preview runs it too.
+
+OVERSHOOT = 5 # mm the cutters reach past each face of the wall
+
+
+def connector_boxes(connectors, x, y, w, d, z, rotation=0):
+    """(x0, y0, z0, x1, y1, z1) of each connector of a w x d board with its corner at (x, y), on top at z."""
+    if rotation not in (0, 180):
+        raise ValueError("only 0 and 180 degree board rotations are supported")
+    boxes = []
+    for label, u, v, cw, cd, height in connectors:
+        if rotation == 180:
+            u, v = w - u - cw, d - v - cd
+        boxes.append((x + u, y + v, z, x + u + cw, y + v + cd, z + height))
+    return boxes
+
+
+def facing_wall(box, inner_w, inner_d, reach):
+    """The wall a connector box faces (nearest, within reach of its inside), or None."""
+    x0, y0, _, x1, y1, _ = box
+    distances = {"front": y0, "back": inner_d - y1, "left": x0, "right": inner_w - x1}
+    wall = min(distances, key=distances.get)
+    return wall if distances[wall] <= reach else None
+
+
+def wall_openings(boards, inner_w, inner_d, margin, reach):
+    """[{"name", "group", "wall", "along", "z"}] for [(board name, connector boxes)]: one per board and wall."""
+    openings = []
+    for name, boxes in boards:
+        facing = {}
+        for box in boxes:
+            wall = facing_wall(box, inner_w, inner_d, reach)
+            if wall is not None:
+                facing.setdefault(wall, []).append(box)
+        for wall, group in facing.items():
+            axis = 0 if wall in ("front", "back") else 1 # Along the wall: x for front/back, y for left/right
+            openings.append({
+                "name": f"{name} cutout" if len(facing) == 1 else f"{name} {wall} cutout",
+                "group": name,
+                "wall": wall,
+                "along": (min(b[axis] for b in group) - margin, max(b[axis + 3] for b in group) + margin),
+                "z": (min(b[2] for b in group) - margin, max(b[5] for b in group) + margin),
+            })
+    return openings
+
+
+def opening_rect(opening, inner_w, inner_d, thickness):
+    """(x, y, w, d): the top view of an opening's cutter, through its wall."""
+    a0, a1 = opening["along"]
+    across = {"front": -thickness, "back": inner_d, "left": -thickness, "right": inner_w}[opening["wall"]] - OVERSHOOT
+    depth = thickness + 2 * OVERSHOOT
+    if opening["wall"] in ("front", "back"):
+        return a0, across, a1 - a0, depth
+    return across, a0, depth, a1 - a0
+
+
+def wall_cutters(openings, inner_w, inner_d, thickness):
+    """A box solid per opening, for one batched cut of the walls (private: safe inside a BuildPart)."""
+    from build123d import Align, Box, Location, Mode
+
+    cutters = []
+    for opening in openings:
+        x, y, w, d = opening_rect(opening, inner_w, inner_d, thickness)
+        z0, z1 = opening["z"]
+        cutters.append(Location((x, y, z0)) * Box(w, d, z1 - z0, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE))
+    return cutters
@@ -0,0 +1,179 @@
+# ==============================================================================
+# Preview Mesh Decimation
+# Coarse levels of detail of a part's mesh for viewers and review tools.
+# ==============================================================================
+#
+# Usage:
+#
+#     vertices, triangles = decimate(vertices, triangles, 2000)    # at most ~2000 triangles
+#     preview_exports(EXPORTS, "rack_v2")    # [(part, "preview/rack_v2_tray_lod10.stl", 0.1), ...]
+#
+# export_parts() (rack_export.py) writes a preview STL per level for every
+# exported part, assemblies included, from the same cached tessellation
+# (rack_meshcache.py) as the print STLs: preview/<design>_<part>_lod10.stl
+# with 10% of the triangles, preview/<design>_<part>_lod1.stl with 1%, the
+# design being the generator module's name (rack_v106_shelf_lod10.stl).
+# They go through the manifest like any other file.
+# A level that comes out the same as the finer one before it (a small mesh,
+# budgets the grid can't tell apart) isn't written again: its manifest entry
+# points at that file instead ("same_as").
+#
+# The decimator is quadric-error vertex clustering (Lindstrom 2000), which
+# is a handful of NumPy passes instead of a collapse-by-collapse priority
+# queue:
+#   1. every triangle's plane quadric (area-weighted) is added to its corners
+#   2. vertices are snapped to a grid, the vertices of a cell merge into one
+#      placed where the cell's summed quadric is smallest (regularized
+#      towards the cell's mean, kept inside the cell's vertices' bounds)
+#   3. triangles are renumbered, the collapsed and duplicate ones dropped
+# The cell size is bisected until the mesh fits the triangle budget, then a
+# few shifted grids around that size are tried for a fuller fit. Flat
+# regions lose their triangles first, edges and corners keep their place,
+# thin walls narrower than a cell may close up (fine for a preview).
+#
+# Environment:
+#   RACK_PREVIEW_LODS=10,1     triangle budgets in percent (empty or 0: no previews)
+
+import os
+
+PREVIEW_LODS = [float(p) / 100 for p in os.environ.get("RACK_PREVIEW_LODS", "10,1").split(",") if p.strip() and float(p) > 0]
+PREVIEW_FOLDER = "preview"
+SEARCH_STEPS = 24 # Bisection steps on the cell size
+SHIFTS, SHIFT_SIZES, SHIFT_RANGE = 4, 6, 1.5 # Grid offsets tried at 6 cell sizes down to 1/1.5 of the bisected one
+
+# Quadric components kept per vertex: the upper triangle of p p^T for the plane p = (a, b, c, d)
+_UPPER = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (3, 3)]
+
+
+def lod_name(fraction):
+    return f"lod{fraction * 100:g}"
+
+
+def preview_exports(exports, design=None, lods=None):
+    """[(part, file name, fraction)]: one preview STL per level for every part in exports, named <design>_<part>."""
+    lods = PREVIEW_LODS if lods is None else lods
+    names = list(dict.fromkeys(name for name, _ in exports))
+    prefix = f"{design}_" if design else ""
+    return [
+        (name, os.path.join(PREVIEW_FOLDER, f"{prefix}{name}_{lod_name(fraction)}.stl"), fraction)
+        for name in names for fraction in lods
+    ]
+
+
+def budget(triangle_count, fraction):
+    """Triangles a level keeps: fraction of them, at least one (never more than there are)."""
+    return min(triangle_count, max(1, round(triangle_count * fraction)))
+
+
+# --- Clustering ---
+
+def _plane_quadrics(vertices, triangles):
+    """(M, 10) area-weighted plane quadric of every triangle, _UPPER components."""
+    import numpy as np
+
+    v = vertices[triangles]
+    cross = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    area = np.linalg.norm(cross, axis=1)
+    normal = np.divide(cross, area[:, None], out=np.zeros_like(cross), where=area[:, None] > 0)
+    plane = np.concatenate([normal, -np.einsum("ij,ij->i", normal, v[:, 0])[:, None]], axis=1)
+    return np.stack([plane[:, i] * plane[:, j] for i, j in _UPPER], axis=1) * (area / 2)[:, None]
+
+
+def _clusters(vertices, origin, cell):
+    """Cluster index of every vertex and the cluster count, for grid cells of size cell."""
+    import numpy as np
+
+    keys = np.floor((vertices - origin) / cell).astype(np.int64)
+    size = keys.max(axis=0) + 1
+    if float(size[0]) * float(size[1]) * float(size[2]) < 2.0 ** 62: # One int64 per cell, much faster to sort than rows
+        _, inverse = np.unique((keys[:, 0] * size[1] + keys[:, 1]) * size[2] + keys[:, 2], return_inverse=True)
+    else:
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return inverse, int(inverse.max()) + 1 if len(inverse) else 0
+
+
+def _collapse(triangles, cluster, count):
+    """Triangles renumbered to clusters, without the collapsed ones and duplicates (first winding kept)."""
+    import numpy as np
+
+    t = cluster[triangles]
+    t = t[(t[:, 0] != t[:, 1]) & (t[:, 1] != t[:, 2]) & (t[:, 0] != t[:, 2])]
+    ordered = np.sort(t, axis=1)
+    if count < 1 << 21: # Three indices fit one int64
+        _, first = np.unique((ordered[:, 0] * count + ordered[:, 1]) * count + ordered[:, 2], return_index=True)
+    else:
+        _, first = np.unique(ordered, axis=0, return_index=True)
+    return t[np.sort(first)]
+
+
+def _positions(vertices, triangles, cluster, count, quadrics):
+    """Each cluster's vertex: the minimum of its quadric, pulled towards its mean where that is flat."""
+    import numpy as np
+
+    q = np.zeros((count, 10))
+    for corner in range(3):
+        owner = cluster[triangles[:, corner]]
+        for k in range(10):
+            q[:, k] += np.bincount(owner, quadrics[:, k], count)
+    members = np.bincount(cluster, minlength=count)[:, None]
+    mean = np.stack([np.bincount(cluster, vertices[:, k], count) for k in range(3)], axis=1) / members
+
+    a = np.empty((count, 3, 3))
+    for k, (i, j) in enumerate(_UPPER):
+        if i < 3 and j < 3:
+            a[:, i, j] = a[:, j, i] = q[:, k]
+    b = q[:, [3, 6, 8]] # (ad, bd, cd)
+    # (A + eI) x = e mean - b: the quadric's minimum along its constrained
+    # directions (edges, corners), the mean along the free ones (flat regions)
+    eps = 1e-3 * np.trace(a, axis1=1, axis2=2) / 3 + 1e-12
+    position = np.linalg.solve(a + eps[:, None, None] * np.eye(3), (eps[:, None] * mean - b)[:, :, None])[:, :, 0]
+
+    low = np.full((count, 3), np.inf)
+    high = np.full((count, 3), -np.inf)
+    np.minimum.at(low, cluster, vertices)
+    np.maximum.at(high, cluster, vertices)
+    return np.clip(position, low, high)
+
+
+def decimate(vertices, triangles, target):
+    """(vertices, triangles) with at most target triangles (or as close as the grid allows), winding kept."""
+    import numpy as np
+
+    if len(triangles) <= target or len(vertices) == 0:
+        return vertices, triangles
+    origin = vertices.min(axis=0)
+    diagonal = float(np.linalg.norm(vertices.max(axis=0) - origin)) or 1.0
+
+    # Bisect the cell size (on a log scale) towards the budget. The count
+    # doesn't fall strictly with the cell size: it drops in steps where the
+    # cells outgrow a feature (a wall, a slot) and depends on where the grid
+    # lands on them. So the grid is also shifted around the final size, and
+    # the fullest mesh that fits wins.
+    low, high, best = diagonal * 1e-6, diagonal, (-1, None)
+
+    def attempt(cell, shift=0.0):
+        nonlocal best
+        cluster, count = _clusters(vertices, origin - shift * cell, cell)
+        kept = len(_collapse(triangles, cluster, count))
+        if kept <= target and kept > best[0]:
+            best = (kept, (cluster, count))
+        return kept
+
+    for _ in range(SEARCH_STEPS):
+        cell = (low * high) ** 0.5
+        if attempt(cell) <= target:
+            high = cell
+        else:
+            low = cell
+    for cell in np.geomspace(high, high / SHIFT_RANGE, SHIFT_SIZES):
+        for shift in np.arange(1, SHIFTS) / SHIFTS:
+            attempt(cell, shift)
+    cluster, count = best[1] if best[1] is not None else _clusters(vertices, origin, high)
+
+    kept = _collapse(triangles, cluster, count)
+    position = _positions(vertices, triangles, cluster, count, _plane_quadrics(vertices, triangles))
+    used = np.unique(kept)
+    renumber = np.zeros(count, np.int64)
+    renumber[used] = np.arange(len(used))
+    return position[used], renumber[kept]
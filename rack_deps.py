@@ -0,0 +1,152 @@
+# ==============================================================================
+# Parameter Dependencies
+# Which generator reads which parameter, and what a change has to rebuild.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py deps v106                                 # parameters per part
+#     python rack.py deps v106 --changed leg_inset,pcie_x       # affected parts and exports
+#     python rack.py deps v106 --check                         # duplicate assignments etc.
+#
+# Parameters are the names a design module assigns at top level (except the
+# PARTS / EXPORTS style TABLES), lists and tuples included. Two kinds of edges are found without running
+# anything:
+#   - parameter -> parameter: the names on the right of each assignment
+#     (lx_left = sh_off_x + leg_inset, dcdc_loc = shelf_assembly_loc * ...)
+#   - part -> parameter: the global names in the bytecode of the part's
+#     generator and of the same-module helpers it calls, plus the globals
+#     passed as arguments (PARTS entries like ("make_dcdc_board", "dcdc_loc"))
+#
+# A part depends on everything upstream of what it reads. "assembly" depends
+# on all of PARTS plus make_assembly. Designs without PARTS build every part
+# with build().
+#
+# rack_cache keys use the same reads (plus cached_part's declared names), so a
+# parameter a generator reads can't be left out of its key.
+
+import ast
+import inspect
+import os
+
+from rack_cache import _code_names
+from rack_params import module_path
+
+# Structural tables of a design module, not parameters (list-valued
+# parameters like rack_v3's connector tables are)
+TABLES = {"PARTS", "EXPORTS", "PART_NAMES", "PACKING", "STL_PROFILES", "HONEYCOMBS"}
+
+_parsed = {} # path -> (mtime, assignments)
+
+
+# --- Parameters ---
+
+def assignments(module_name):
+    """{name: [(line, names read on the right)]} for every top-level assignment."""
+    path = module_path(module_name)
+    mtime = os.stat(path).st_mtime_ns
+    if path in _parsed and _parsed[path][0] == mtime:
+        return _parsed[path][1]
+
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    found = {}
+    for node in tree.body:
+        if not isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)) or node.value is None:
+            continue
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        reads = {sub.id for sub in ast.walk(node.value) if isinstance(sub, ast.Name)}
+        if isinstance(node, ast.AugAssign):
+            reads.add(node.target.id)
+        for target in targets:
+            for sub in ast.walk(target):
+                if isinstance(sub, ast.Name):
+                    found.setdefault(sub.id, []).append((node.lineno, reads))
+    _parsed[path] = (mtime, found)
+    return found
+
+
+def parameters(namespace):
+    """Names of a design module's parameters (top-level values, TABLES excluded), given its globals."""
+    return {
+        name for name in assignments(namespace["__name__"])
+        if name not in TABLES and not callable(namespace.get(name))
+    }
+
+
+def parameter_graph(module):
+    """{parameter: parameters its value is computed from}."""
+    names = parameters(vars(module))
+    return {
+        name: {read for _, reads in assignments(module.__name__)[name] for read in reads if read in names and read != name}
+        for name in names
+    }
+
+
+def duplicates(module):
+    """{parameter: [lines]} for parameters assigned more than once."""
+    return {name: [line for line, _ in found] for name, found in assignments(module.__name__).items() if len(found) > 1}
+
+
+# --- Generators ---
+
+def generator_reads(func):
+    """Parameters a generator reads, directly or through same-module helpers."""
+    func = inspect.unwrap(func)
+    names = parameters(func.__globals__)
+    reads, seen = set(), []
+
+    def visit(f):
+        f = inspect.unwrap(f)
+        if f in seen:
+            return
+        seen.append(f)
+        for name in _code_names(f.__code__):
+            obj = f.__globals__.get(name)
+            if name in names:
+                reads.add(name)
+            elif inspect.isfunction(obj) and obj.__module__ == f.__module__:
+                visit(obj)
+
+    visit(func)
+    return reads
+
+
+def part_reads(module):
+    """{part: parameters its generator reads directly}."""
+    specs = getattr(module, "PARTS", None)
+    if not specs:
+        reads = generator_reads(module.build)
+        return {name: set(reads) for name in module.PART_NAMES}
+
+    parts = {}
+    for name, (func_name, *arg_names) in specs.items():
+        parts[name] = generator_reads(getattr(module, func_name)) | set(arg_names)
+    if "assembly" in module.PART_NAMES:
+        parts["assembly"] = set().union(*parts.values(), generator_reads(module.make_assembly))
+    return parts
+
+
+def upstream(module, names):
+    """names plus every parameter they are computed from."""
+    graph = parameter_graph(module)
+    found, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in found:
+            found.add(name)
+            todo.extend(graph.get(name, ()))
+    return found
+
+
+def part_dependencies(module):
+    """{part: every parameter that can change it}."""
+    return {name: upstream(module, reads) for name, reads in part_reads(module).items()}
+
+
+def affected(module, changed):
+    """Parts and export files that have to be rebuilt when the changed parameters change."""
+    changed = set(changed)
+    parts = [name for name, deps in part_dependencies(module).items() if deps & changed]
+    files = [filename for name, filename in module.EXPORTS if name in parts]
+    return parts, files
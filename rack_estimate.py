@@ -0,0 +1,55 @@
+# ==============================================================================
+# Print Estimate
+# Material and time for the printable parts, without a slicer.
+# ==============================================================================
+#
+# Every part with an STL export gets a line after the export:
+#
+#     Estimate tray          81.23 cm3   PLA  100.7 g  PETG  103.2 g   27.2 m   2.8 h
+#
+# The volume is the mesh volume (rack_mesh.mesh_volume on the tessellation
+# made for the STL, within ~0.05% of the BREP on rack_v106), recorded in
+# rack_manifest.json with the file, so an unchanged part reuses it. OCC's
+# mass properties stand in when the mesh isn't closed (rack_v3's box has a
+# few faces without triangulation) or the manifest has no volume yet.
+#
+# The numbers assume the part is printed solid (PRINT_FILL = 1): mass from
+# the material density, filament length from its cross section, print time
+# from an average volumetric flow. Good enough to compare variants (hex
+# floor vs. solid, wall_thickness) against each other, not to plan a print.
+#
+# Environment:
+#   RACK_FILAMENT_DIAMETER=1.75   mm
+#   RACK_PRINT_FLOW=8             mm^3/s average (0.4 mm nozzle, 0.2 mm layers, ~100 mm/s)
+#   RACK_PRINT_FILL=1             fraction of the volume extruded (e.g. 0.6 for sparse infill)
+
+import math
+import os
+
+# Density in g/cm^3
+MATERIALS = {
+    "PLA": 1.24,
+    "PETG": 1.27,
+}
+FILAMENT_DIAMETER = float(os.environ.get("RACK_FILAMENT_DIAMETER", "1.75"))
+PRINT_FLOW = float(os.environ.get("RACK_PRINT_FLOW", "8"))
+PRINT_FILL = float(os.environ.get("RACK_PRINT_FILL", "1"))
+
+
+def estimate(volume):
+    """{volume_cm3, mass_<material>_g..., filament_m, print_h} for a part volume in mm^3."""
+    extruded = volume * PRINT_FILL
+    result = {"volume_cm3": volume / 1000}
+    for material, density in MATERIALS.items():
+        result[f"mass_{material.lower()}_g"] = extruded / 1000 * density
+    result["filament_m"] = extruded / (math.pi * (FILAMENT_DIAMETER / 2) ** 2) / 1000
+    result["print_h"] = extruded / PRINT_FLOW / 3600
+    return result
+
+
+def print_estimates(volumes):
+    """One line per {part: volume in mm^3}."""
+    for name, volume in volumes.items():
+        values = estimate(volume)
+        masses = "  ".join(f"{material} {values[f'mass_{material.lower()}_g']:6.1f} g" for material in MATERIALS)
+        print(f"Estimate {name:<12} {values['volume_cm3']:8.2f} cm3   {masses}  {values['filament_m']:6.1f} m  {values['print_h']:5.1f} h")
@@ -0,0 +1,494 @@
+# ==============================================================================
+# Part Export
+# Writes the export list of a generator module (STEP / STL).
+# ==============================================================================
+#
+# Each generator module lists its files as (part name, file name) pairs:
+#
+#     EXPORTS = [
+#         ("tray", "rack_v106_tray.step"),
+#         ("tray", "rack_v106_tray.stl"),
+#     ]
+#
+# The format comes from the file extension. Only parts that were actually
+# built are written, so a partial build exports a partial list.
+#
+# Files whose part geometry and export settings haven't changed since they
+# were written are skipped, see rack_manifest.py.
+#
+# STL files are meshed with a named profile from rack_mesh.py ("preview",
+# "print", "archive"). export_parts() takes a default profile plus per-part
+# overrides; a design module can set its own overrides:
+#
+#     STL_PROFILES = {"text": "archive"}
+#
+# The remaining files are written in four steps:
+#   1. every part with an STL file gets its mesh from the tessellation cache
+#      (rack_meshcache.py): each solid is meshed once per profile, so all STL
+#      files of a part, a compound reusing its solids (rack_v3's "combined")
+#      and later runs reuse it.
+#   2. the files are written in a process pool, one job per part. STL jobs
+#      get the mesh arrays, parts with a STEP file are shipped as BREP.
+#   3. each file's write time and size is reported and recorded in the
+#      manifest, STL files also with triangle count and max deviation from
+#      the BREP.
+#   4. every part with an STL file gets a print estimate (volume, mass,
+#      filament, time), see rack_estimate.py. The volume (of the mesh, or
+#      OCC's if the mesh isn't closed) is recorded with the STL file, so
+#      skipped parts report it too.
+#
+# Every exported part, assemblies included, also gets decimated preview
+# STLs (preview/<design>_<part>_lod10.stl and _lod1.stl, see
+# rack_decimate.py) from the same mesh, written in-process after it; they
+# load near-instantly in viewers and review tools. A level with the same
+# mesh as a finer one is recorded in the manifest ("same_as") but not
+# written twice.
+#
+# Exports are deterministic by default: an unchanged part gives a
+# byte-identical file, so its hash (recorded in the manifest as "sha256")
+# can be used for caching, dedup or a quick "did it change?". STEP files get
+# a fixed header timestamp (SOURCE_DATE_EPOCH, else 1970-01-01) and the faces
+# of every shell in a geometric order (canonical_shape(), leaf by leaf for
+# assemblies), so the entity order doesn't depend on how a boolean happened
+# to order them. OCC writes the colors of assembly components from a map
+# hashed on memory addresses, so that section of the file comes out in a
+# different order every run: canonical_step_styles() rewrites it in a fixed
+# order (by content, each style group depth first). Coordinates of -0.
+# (fresh shapes have some, BREP round trips don't) are written as 0. STL
+# files get their triangles sorted (rack_mesh.canonical_mesh), the header is
+# fixed anyway. A rewritten file with the same bytes as before is reported
+# as identical.
+#
+# Environment:
+#   RACK_JOBS=n              export workers (default: CPU count, 1 = write in-process)
+#   RACK_STL_PROFILE=name    default mesh profile (default: print)
+#   RACK_STL_WELD=mm         merge STL vertices closer than this (default: off)
+#   RACK_STL_NORMALS=0       write zero facet normals (default: computed)
+#   RACK_DETERMINISTIC=0     STEP with the current time and OCC's face order, STL in mesh order
+#   SOURCE_DATE_EPOCH=secs   STEP header timestamp of deterministic exports (default: 0)
+
+import concurrent.futures
+import datetime
+import hashlib
+import os
+import re
+import time
+
+from rack_decimate import budget, decimate, preview_exports
+from rack_estimate import print_estimates
+from rack_manifest import FORCE, geometry_hash, is_current, load_manifest, make_entry, record, save_manifest
+from rack_mesh import DEFAULT_PROFILE, arrays_volume, profile_settings, tessellate, write_stl, write_stl_arrays
+from rack_meshcache import counts, shape_mesh
+from rack_parallel import pack, unpack
+
+FORMATS = ["step", "stl"]
+STL_PROFILE = os.environ.get("RACK_STL_PROFILE", DEFAULT_PROFILE)
+STL_WELD = float(os.environ.get("RACK_STL_WELD", "0"))
+STL_NORMALS = os.environ.get("RACK_STL_NORMALS", "1") != "0"
+DETERMINISTIC = os.environ.get("RACK_DETERMINISTIC", "1") != "0"
+STEP_TIMESTAMP = datetime.datetime.fromtimestamp(int(os.environ.get("SOURCE_DATE_EPOCH", "0")), datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def export_format(filename):
+    return os.path.splitext(filename)[1].lstrip(".").lower()
+
+
+def export_settings(fmt, profile=STL_PROFILE):
+    """Everything besides the geometry that changes the file contents."""
+    if fmt == "stl":
+        return {"format": fmt, "profile": profile, **profile_settings(profile), "weld": STL_WELD, "normals": STL_NORMALS,
+                "deterministic": DETERMINISTIC}
+    if DETERMINISTIC:
+        return {"format": fmt, "deterministic": True, "timestamp": STEP_TIMESTAMP}
+    return {"format": fmt, "deterministic": False}
+
+
+def canonical_shape(shape):
+    """shape with the faces of every shell sorted by type, centroid and area (same geometry, stable STEP entity order).
+
+    A sub-shape placed several times is rebuilt once, so it stays shared
+    (across the leaves of an assembly too). Assemblies (shapes with
+    children, rack_instance) are rebuilt as the same tree of labels, colors
+    and locations around their canonical leaves.
+    """
+    from OCP.BRep import BRep_Builder
+    from OCP.BRepAdaptor import BRepAdaptor_Surface
+    from OCP.BRepGProp import BRepGProp
+    from OCP.GProp import GProp_GProps
+    from OCP.TopAbs import TopAbs_COMPOUND, TopAbs_COMPSOLID, TopAbs_SHELL, TopAbs_SOLID
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS, TopoDS_Compound, TopoDS_CompSolid, TopoDS_Iterator, TopoDS_Shell, TopoDS_Solid
+    from build123d import Color, Compound, Shape
+
+    builder = BRep_Builder()
+    rebuilt = {} # hash -> [(original, rebuilt)], both unplaced
+    makers = {
+        TopAbs_COMPOUND: (TopoDS_Compound, builder.MakeCompound),
+        TopAbs_COMPSOLID: (TopoDS_CompSolid, builder.MakeCompSolid),
+        TopAbs_SOLID: (TopoDS_Solid, builder.MakeSolid),
+        TopAbs_SHELL: (TopoDS_Shell, builder.MakeShell),
+    }
+
+    def face_key(face):
+        face = TopoDS.Face(face)
+        props = GProp_GProps()
+        BRepGProp.SurfaceProperties_s(face, props)
+        center = props.CentreOfMass()
+        values = (center.X(), center.Y(), center.Z(), props.Mass())
+        return (int(BRepAdaptor_Surface(face).GetType()), *[round(value, 6) + 0.0 for value in values])
+
+    def rebuild(topo):
+        if topo.ShapeType() not in makers:
+            return topo
+        bare = topo.Located(TopLoc_Location())
+        for original, result in rebuilt.get(hash(bare), []):
+            if original.IsSame(bare):
+                return result.Located(topo.Location()).Oriented(topo.Orientation())
+        children = []
+        iterator = TopoDS_Iterator(topo, False, False) # Children relative to topo, topo's own placement reapplied below
+        while iterator.More():
+            children.append(iterator.Value())
+            iterator.Next()
+        if topo.ShapeType() == TopAbs_SHELL:
+            children.sort(key=face_key) # Stable: ties keep their order
+        else:
+            children = [rebuild(child) for child in children]
+        kind, make = makers[topo.ShapeType()]
+        result = kind()
+        make(result)
+        for child in children:
+            builder.Add(result, child)
+        result.Closed(topo.Closed())
+        rebuilt.setdefault(hash(bare), []).append((bare, result))
+        return result.Located(topo.Location()).Oriented(topo.Orientation())
+
+    def node(shape):
+        if getattr(shape, "children", None):
+            result = Compound(children=[node(child) for child in shape.children])
+            result.location = shape.location # A parent's own placement, on top of its children's
+        else:
+            result = Shape.cast(rebuild(shape.wrapped))
+        result.label = shape.label
+        # Through a tuple, like rack_parallel.unpack: the same color either way a part was built
+        result.color = Color(*tuple(shape.color)) if shape.color is not None else None
+        return result
+
+    return node(shape)
+
+
+# --- STEP Styles ---
+# DATA entities are "#n = TYPE(...);", strings quoted with '' as escape.
+
+_STATEMENT = re.compile(r"((?:'(?:[^']|'')*'|[^';])*);", re.S)
+_REFERENCE = re.compile(r"'(?:[^']|'')*'|#(\d+)")
+_LINE_BREAK = re.compile(r"'(?:[^']|'')*'|\s*\n\s*")
+STYLE_SECTION = "MECHANICAL_DESIGN_GEOMETRIC_PRESENTATION_REPRESENTATION"
+# A -0. coordinate of a list ("(1.,0.,-0.)"): a freshly built shape has some
+# where the same shape read back from BREP (the part cache, a worker) has 0.
+_NEGATIVE_ZERO = re.compile(r"(?<=[(,])-0\.(?=[,)])")
+
+
+def canonical_step_zeros(path):
+    """Rewrites the -0. coordinates of a STEP file as 0."""
+    with open(path) as f:
+        text = f.read()
+    fixed = _NEGATIVE_ZERO.sub("0.", text)
+    if fixed != text:
+        with open(path, "w") as f:
+            f.write(fixed)
+
+
+def canonical_step_styles(path):
+    """Rewrites the presentation (color) section of a STEP file in a fixed order.
+
+    The section starts at the first MECHANICAL_DESIGN_GEOMETRIC_PRESENTATION_REPRESENTATION.
+    Its root entities (referenced by nothing) are sorted by a hash of their
+    content, references replaced by the content they point to, and each is
+    followed by the section entities it reaches, depth first. The section
+    keeps its entity numbers, only their order changes; its entities are
+    written one per line. Files without one are left alone.
+    """
+    with open(path) as f:
+        text = f.read()
+    start = text.find("\nDATA;\n")
+    end = text.find("ENDSEC;", start)
+    if start < 0 or end < 0:
+        return
+    start += len("\nDATA;\n")
+
+    entities, order = {}, [] # number -> (text, span in the file)
+    for match in _STATEMENT.finditer(text, start, end):
+        number, _, body = match.group(1).strip().partition("=")
+        if number.startswith("#"):
+            entities[int(number[1:])] = (body.strip(), match.span())
+            order.append(int(number[1:]))
+    first = next((i for i, n in enumerate(order) if entities[n][0].startswith(STYLE_SECTION)), None)
+    if first is None:
+        return
+    section = order[first:]
+    in_section = set(section)
+
+    def refs(number):
+        return [int(m.group(1)) for m in _REFERENCE.finditer(entities[number][0]) if m.group(1)]
+
+    keys = {}
+    def key(number, visiting=()):
+        if number not in in_section:
+            return f"#{number}" # Before the section: already in a fixed order
+        if number in visiting:
+            return "#cycle"
+        if number not in keys:
+            inner = [key(ref, visiting + (number,)) for ref in refs(number)]
+            keys[number] = hashlib.sha256("\0".join([entities[number][0].split("(", 1)[0], *inner]).encode()).hexdigest()
+        return keys[number]
+
+    referenced = {ref for number in order for ref in refs(number)}
+    roots = sorted((n for n in section if n not in referenced), key=key)
+    placed, seen = [], set()
+    def visit(number):
+        if number in seen or number not in in_section:
+            return
+        seen.add(number)
+        placed.append(number)
+        for ref in refs(number):
+            visit(ref)
+    for root in roots:
+        visit(root)
+    placed += [n for n in section if n not in seen] # Reached from before the section only
+
+    renumber = dict(zip(placed, sorted(section)))
+    def renumbered(body):
+        return _REFERENCE.sub(lambda m: m.group(0) if m.group(1) is None else f"#{renumber.get(int(m.group(1)), int(m.group(1)))}", body)
+    def one_line(body):
+        return _LINE_BREAK.sub(lambda m: m.group(0) if m.group(0).startswith("'") else "", body)
+
+    head = text[:start] + renumbered(text[start:entities[section[0]][1][0]]) # Unchanged unless it points into the section
+    lines = [f"#{renumber[n]} = {renumbered(one_line(entities[n][0]))};" for n in placed] # placed is in new number order
+    with open(path, "w") as f:
+        f.write(head.rstrip("\n") + "\n" + "\n".join(lines) + "\n" + text[end:])
+
+
+def export_shape(shape, path, profile=STL_PROFILE, tessellated=False, mesh=None):
+    """Writes shape to path.
+
+    STL comes from mesh (vertices, triangles) if given, from the faces' own
+    triangulations with tessellated=True, else from the tessellation cache.
+    """
+    from build123d import export_step
+
+    fmt = export_format(path)
+    if fmt == "step":
+        if DETERMINISTIC:
+            ok = export_step(canonical_shape(shape), path, timestamp=STEP_TIMESTAMP)
+            canonical_step_styles(path)
+            canonical_step_zeros(path)
+        else:
+            ok = export_step(shape, path)
+    elif fmt == "stl":
+        if mesh is None and not tessellated:
+            mesh = shape_mesh(shape, profile)[:2]
+        if mesh is None:
+            write_stl(shape, path, STL_WELD, STL_NORMALS, DETERMINISTIC)
+        else:
+            write_stl_arrays(*mesh, path, STL_WELD, STL_NORMALS, DETERMINISTIC)
+        ok = True
+    else:
+        raise ValueError(f"Unknown export format: {path}")
+    if not ok:
+        raise IOError(f"Could not write {path}")
+
+
+def file_hash(path):
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _same_mesh(a, b):
+    return all(x.shape == y.shape and (x == y).all() for x, y in zip(a, b))
+
+
+def _write_previews(mesh, files):
+    """Writes decimated copies of a part's mesh for [(path, fraction)], finest first.
+
+    Returns [(path, seconds, bytes)] in the order of files, {path: triangles}
+    and {path: earlier path} for the levels that came out the same as the
+    one before them: those aren't written (a stale copy is removed), their
+    bytes are 0.
+    """
+    results, triangle_counts, same = {}, {}, {}
+    previous = None # (path, vertices, triangles) of the last level written
+    for path, fraction in sorted(files, key=lambda file: -file[1]):
+        start = time.perf_counter()
+        vertices, triangles = decimate(*mesh, budget(len(mesh[1]), fraction))
+        triangle_counts[path] = len(triangles)
+        if previous is not None and _same_mesh((vertices, triangles), previous[1:]):
+            same[path] = previous[0]
+            if os.path.exists(path):
+                os.remove(path)
+            results[path] = (path, time.perf_counter() - start, 0)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_stl_arrays(vertices, triangles, path, None, STL_NORMALS, DETERMINISTIC)
+        previous = (path, vertices, triangles)
+        results[path] = (path, time.perf_counter() - start, os.path.getsize(path))
+    return [results[path] for path, _ in files], triangle_counts, same
+
+
+# --- Workers ---
+
+def _write_files(shape, paths, profile=STL_PROFILE, mesh=None):
+    """Writes one part to all its paths (STL from mesh), returning [(path, seconds, bytes)]."""
+    if isinstance(shape, dict):
+        shape = unpack(shape) # Packed for a pool worker
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        export_shape(shape, path, profile, mesh=mesh)
+        results.append((path, time.perf_counter() - start, os.path.getsize(path)))
+    return results
+
+
+def worker_count(max_workers, jobs):
+    if max_workers is None:
+        max_workers = int(os.environ.get("RACK_JOBS", "0")) or os.cpu_count() or 1
+    return min(max_workers, jobs)
+
+
+def write_files(jobs, max_workers=None):
+    """Writes {part: (shape, [paths], profile, mesh)} side by side and returns {part: [(path, seconds, bytes)]}.
+
+    Shapes may already be packed (rack_parallel.pack) or None (STL files
+    only, written from mesh), the rest are packed here.
+    """
+    max_workers = worker_count(max_workers, len(jobs))
+    if max_workers <= 1:
+        return {name: _write_files(*job) for name, job in jobs.items()}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(_write_files, shape if shape is None or isinstance(shape, dict) else pack(shape), paths, profile, mesh)
+            for name, (shape, paths, profile, mesh) in jobs.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+# --- Export ---
+
+def export_parts(parts, exports, formats=None, folder=".", params=None, force=FORCE, max_workers=None,
+                 profile=STL_PROFILE, profiles=None, lods=None, design=None):
+    """Writes every (part, file name) export whose part is in parts and whose format is selected.
+
+    params ({part: generator params}) only goes into the manifest.
+    STL files use mesh profile `profile`, or profiles[part] where given.
+    Each part also gets a preview STL per triangle budget in lods
+    (default: rack_decimate.PREVIEW_LODS, [] for none), named after the
+    design (the generator module, e.g. "rack_v106") and the part.
+    Returns the paths that were actually written.
+    """
+    manifest = load_manifest(folder)
+    part_profile = {name: (profiles or {}).get(name, profile) for name in parts}
+    previews = {filename: fraction for _, filename, fraction in preview_exports(exports, design, lods)}
+    all_exports = list(exports) + [(name, filename) for name, filename, _ in preview_exports(exports, design, lods)]
+
+    # Which files need writing
+    hashes = {}
+    pending = {} # part -> [(file name, path, manifest entry)]
+    volumes = {} # part -> mm^3, for the print estimate of parts with an STL file
+    for name, filename in all_exports:
+        fmt = export_format(filename)
+        if name not in parts or (formats and fmt not in formats):
+            continue
+        if name not in hashes:
+            hashes[name] = geometry_hash(parts[name])
+
+        path = os.path.join(folder, filename)
+        settings = export_settings(fmt, part_profile[name])
+        if filename in previews:
+            settings = dict(settings, lod=previews[filename])
+        entry = make_entry(name, hashes[name], settings, (params or {}).get(name))
+        old = manifest.get(filename) or {}
+        if not force and is_current(entry, old, os.path.join(folder, old["same_as"]) if old.get("same_as") else path):
+            print(f"Unchanged {path}")
+            if fmt == "stl" and filename not in previews:
+                volumes.setdefault(name, manifest[filename].get("volume"))
+            continue
+        pending.setdefault(name, []).append((filename, path, entry))
+    if not pending:
+        print_estimates(_volumes(parts, exports, volumes))
+        return []
+
+    # One mesh per part (and per solid, see rack_meshcache.py), shared by its STL files
+    workers = worker_count(max_workers, len(pending))
+    jobs, results, stats = {}, {}, {}
+    lod_results, lod_triangles, lod_same = {}, {}, {}
+    start = time.perf_counter()
+    for name, files in pending.items():
+        shape, profile, mesh = parts[name], part_profile[name], None
+        files.sort(key=lambda file: file[0] in previews) # Previews last, matching the results below
+        lod_files = [(path, previews[filename]) for filename, path, _ in files if filename in previews]
+        regular = [(filename, path) for filename, path, _ in files if filename not in previews]
+        part_formats = {export_format(filename) for filename, _ in regular}
+        if "stl" in part_formats or lod_files:
+            mesh_start, meshed = time.perf_counter(), counts["meshed"]
+            vertices, triangles, stats[name] = shape_mesh(shape, profile)
+            mesh = (vertices, triangles)
+            how = "Tessellated" if counts["meshed"] > meshed else "Mesh from cache for"
+            print(f"{how} {name} ({profile}) in {time.perf_counter() - mesh_start:.2f}s")
+        if "stl" in part_formats:
+            volume = arrays_volume(*mesh)
+            volumes[name] = shape.volume if volume is None else volume # OCC if the mesh isn't closed
+
+        paths = [path for _, path in regular]
+        if paths and workers > 1:
+            jobs[name] = (pack(shape) if part_formats != {"stl"} else None, paths, profile, mesh)
+        elif paths:
+            results[name] = _write_files(shape, paths, profile, mesh)
+        # Decimating is NumPy on the mesh at hand, not worth shipping it to a worker
+        lod_results[name], counted, same = _write_previews(mesh, lod_files) if lod_files else ([], {}, {})
+        lod_triangles.update(counted)
+        lod_same.update(same)
+    if jobs:
+        results.update(write_files(jobs, workers))
+    results = {name: results.get(name, []) + lod_results[name] for name in pending}
+    wall = time.perf_counter() - start
+
+    written = []
+    for name, files in pending.items():
+        for (filename, path, entry), (_, seconds, size) in zip(files, results[name]):
+            if path in lod_same: # Same mesh as a finer level: recorded, not written
+                entry["same_as"] = os.path.relpath(lod_same[path], folder)
+                entry["sha256"] = file_hash(lod_same[path])
+                print(f"Skipped  {path:<40} {seconds:6.2f}s same mesh as {entry['same_as']}")
+                record(manifest, filename, entry, lod_same[path])
+                continue
+            line = f"Exported {path:<40} {seconds:6.2f}s {size / 1e6:7.2f} MB"
+            if filename in previews:
+                line += f" {lod_triangles[path]:9,d} triangles, {previews[filename] * 100:g}% preview"
+            elif export_format(filename) == "stl":
+                line += f" {stats[name]['triangles']:9,d} triangles, max deviation {stats[name]['max_deviation']:.4f} mm"
+                entry["volume"] = volumes[name]
+            entry["sha256"] = file_hash(path)
+            if (manifest.get(filename) or {}).get("sha256") == entry["sha256"]:
+                line += " (identical to the last export)"
+            print(line)
+            record(manifest, filename, entry, path)
+            written.append(path)
+    save_manifest(manifest, folder)
+
+    total = sum(seconds for files in results.values() for _, seconds, _ in files)
+    size = sum(size for files in results.values() for _, _, size in files)
+    print(f"Wrote {len(written)} files ({size / 1e6:.2f} MB) in {wall:.2f}s wall ({total:.2f}s total)")
+    print_estimates(_volumes(parts, exports, volumes))
+    return written
+
+
+def _volumes(parts, exports, volumes):
+    """volumes in export order, gaps (no volume in an old manifest entry) filled from OCC mass properties."""
+    ordered = {}
+    for name, _ in exports:
+        if name in volumes and name not in ordered:
+            ordered[name] = parts[name].volume if volumes[name] is None else volumes[name]
+    return ordered
@@ -0,0 +1,388 @@
+# ==============================================================================
+# Honeycomb Infill Optimizer
+# Searches hex size, wall width, grid counts and offset for the lightest plate.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py infill v106                          # every honeycomb plate of a design
+#     python rack.py infill v2 --plate bridge_plate --min-wall 1.2 --max-cell 10
+#     python rack.py infill v3 --params best.json         # winner as {parameter: value} overrides
+#
+# A design lists its honeycomb plates like its parts:
+#
+#     HONEYCOMBS = {"tray_floor": "tray_floor_plate"}
+#
+# and each plate function returns a dict:
+#
+#     outer      (x_min, y_min, x_max, y_max) of the plate
+#     safe       rectangle the cells are clipped to (outer minus the rim)
+#     keepouts   solid regions (rack_pattern.rect_keepout / circle_keepout)
+#     center     where the grid is centered (before its shift)
+#     thickness  plate thickness (mm)
+#     hex        (radius, cell_radius, (x_count, y_count), (shift_x, shift_y))
+#     params     the module parameters holding those four values
+#
+# radius is HexLocations' (half the distance between cell centers),
+# cell_radius the hexagon's circumradius, so the wall between two cells is
+# 2 * radius - sqrt(3) * cell_radius.
+#
+# Constraints: wall >= MIN_WALL, cell_radius <= --max-cell (default: the
+# plate's current cell, so holes don't get larger than today) and a rim of
+# at least MIN_RIM (the safe zone is shrunk if the plate's is wider).
+# The objective is the plate mass; keep-outs always stay solid.
+#
+# Candidates are scored analytically: every cell is clipped against the safe
+# zone and the rectangular keep-outs with a vectorized Sutherland-Hodgman
+# clip, and its area inside a circular keep-out summed edge by edge
+# (triangle center-edge against the disc), all candidates sharing a grid at
+# once. Overlapping keep-outs are handled by inclusion-exclusion over pairs
+# (a second circle as an area-matched 24-gon). The winner (and
+# the current grid) are then built with OCC (rack_pattern.honeycomb_face) to
+# compare.
+#
+# Environment:
+#   RACK_INFILL_MIN_WALL=1.2   mm, narrowest wall between cells (3 lines of a 0.4 mm nozzle)
+#   RACK_INFILL_MIN_RIM=3      mm, narrowest solid border around the cells
+
+import itertools
+import math
+import os
+import time
+
+from rack_estimate import MATERIALS
+
+MIN_WALL = float(os.environ.get("RACK_INFILL_MIN_WALL", "1.2"))
+MIN_RIM = float(os.environ.get("RACK_INFILL_MIN_RIM", "3"))
+CIRCLE_SIDES = 24
+SHIFT_STEPS = 6 # Grid offsets tried per period and axis
+
+
+# --- Plates ---
+
+def plates(module):
+    """{plate: spec dict} of a design module."""
+    return {name: getattr(module, func_name)() for name, func_name in getattr(module, "HONEYCOMBS", {}).items()}
+
+
+def wall_width(radius, cell_radius):
+    return 2 * radius - math.sqrt(3) * cell_radius
+
+
+def _safe(plate, min_rim):
+    """The plate's safe zone, shrunk to leave at least min_rim."""
+    outer, safe = plate["outer"], plate["safe"]
+    return (
+        max(safe[0], outer[0] + min_rim), max(safe[1], outer[1] + min_rim),
+        min(safe[2], outer[2] - min_rim), min(safe[3], outer[3] - min_rim),
+    )
+
+
+def plate_face(plate, grid=None, min_rim=0):
+    """The plate outline minus its honeycomb, as one OCC Face."""
+    from rack_pattern import hex_grid, honeycomb_face
+
+    radius, cell_radius, (x_count, y_count), (shift_x, shift_y) = grid or plate["hex"]
+    center = (plate["center"][0] + shift_x, plate["center"][1] + shift_y)
+    return honeycomb_face(
+        outer=plate["outer"],
+        cells=hex_grid(radius, cell_radius, x_count=x_count, y_count=y_count, center=center),
+        safe=_safe(plate, min_rim),
+        keepouts=plate["keepouts"],
+    )
+
+
+# --- Vectorized clipping ---
+# Polygons are (M, K, 2) arrays. Shorter polygons repeat their last vertex,
+# which adds nothing to the area.
+
+def _clip(polys, normal, offset):
+    """Clips every polygon to the half plane normal . p >= offset (one K+1 vertex polygon each)."""
+    import numpy as np
+
+    count, size = polys.shape[:2]
+    side = polys @ normal - offset
+    following = np.roll(polys, -1, axis=1)
+    following_side = np.roll(side, -1, axis=1)
+    inside = side >= 0
+    crossing = inside != (following_side >= 0)
+    t = side / np.where(crossing, side - following_side, 1.0)
+    points = np.stack([polys, polys + t[..., None] * (following - polys)], axis=2).reshape(count, 2 * size, 2)
+    valid = np.stack([inside, crossing], axis=2).reshape(count, 2 * size)
+
+    # Valid points moved to the front (in order), the rest repeats the last valid point
+    position = np.cumsum(valid, axis=1) - 1
+    kept = position[:, -1] + 1
+    rows, columns = np.nonzero(valid)
+    out = np.zeros((count, size + 1, 2))
+    out[rows, position[rows, columns]] = points[rows, columns]
+    last = out[np.arange(count), np.maximum(kept - 1, 0)]
+    tail = np.arange(size + 1) >= kept[:, None]
+    out[tail] = np.broadcast_to(last[:, None, :], out.shape)[tail]
+    return out
+
+
+def _areas(polys):
+    import numpy as np
+
+    x, y = polys[..., 0], polys[..., 1]
+    return 0.5 * (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+
+
+def _half_planes(region):
+    """[(normal, offset)] of a convex region: ("rect", box) or ("circle", (cx, cy, r))."""
+    import numpy as np
+
+    kind, data = region
+    if kind == "rect":
+        x_min, y_min, x_max, y_max = data
+        return [(np.array([1.0, 0.0]), x_min), (np.array([-1.0, 0.0]), -x_max),
+                (np.array([0.0, 1.0]), y_min), (np.array([0.0, -1.0]), -y_max)]
+    cx, cy, r = data
+    # Apothem of the 24-gon with the circle's area
+    apothem = r * math.sqrt(math.pi / (CIRCLE_SIDES * math.tan(math.pi / CIRCLE_SIDES)))
+    planes = []
+    for i in range(CIRCLE_SIDES):
+        angle = 2 * math.pi * (i + 0.5) / CIRCLE_SIDES
+        normal = np.array([-math.cos(angle), -math.sin(angle)])
+        planes.append((normal, normal @ np.array([cx, cy]) - apothem))
+    return planes
+
+
+def _bounds(region):
+    kind, data = region
+    if kind == "rect":
+        return data
+    cx, cy, r = data
+    return (cx - r, cy - r, cx + r, cy + r)
+
+
+def _clip_all(polys, regions):
+    for region in regions:
+        for normal, offset in _half_planes(region):
+            polys = _clip(polys, normal, offset)
+    return polys
+
+
+def _disc_areas(polys, circle):
+    """Exact area of each polygon inside a circle: per edge, the disc part of the triangle center-edge."""
+    import numpy as np
+
+    cx, cy, r = circle
+    a = polys - (cx, cy)
+    b = np.roll(a, -1, axis=1)
+    d = b - a
+    # Where the edge a + t * d crosses the circle (t1 <= t2, clamped to the edge)
+    qa = (d * d).sum(axis=-1)
+    qb = 2 * (a * d).sum(axis=-1)
+    qc = (a * a).sum(axis=-1) - r * r
+    disc = qb * qb - 4 * qa * qc
+    hits = (disc > 0) & (qa > 0)
+    root = np.sqrt(np.where(hits, disc, 0.0))
+    safe_qa = np.where(hits, 2 * qa, 1.0)
+    t1 = np.where(hits, np.clip((-qb - root) / safe_qa, 0, 1), 0.0)
+    t2 = np.where(hits, np.clip((-qb + root) / safe_qa, 0, 1), 0.0)
+    p1 = a + t1[..., None] * d
+    p2 = a + t2[..., None] * d
+
+    def cross(u, v):
+        return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+    def sector(u, v): # Signed circular sector between two directions
+        return 0.5 * r * r * np.arctan2(cross(u, v), (u * v).sum(axis=-1))
+
+    # Outside the circle: sectors; inside: the straight triangle
+    return (sector(a, p1) + 0.5 * cross(p1, p2) + sector(p2, b)).sum(axis=1)
+
+
+def _covered_areas(polys, regions):
+    """Area of each polygon inside all regions (convex; at most the last one used as an exact circle)."""
+    regions = sorted(regions, key=lambda region: region[0] == "circle")
+    *clips, last = regions
+    polys = _clip_all(polys, clips)
+    if last[0] == "circle":
+        return _disc_areas(polys, last[1])
+    return _areas(_clip_all(polys, [last]))
+
+
+# --- Evaluator ---
+
+def open_areas(centers, cell_radius, safe, keepouts):
+    """Open (cut) area per candidate: centers (C, N, 2), cell_radius (C,)."""
+    import numpy as np
+
+    count, cells = centers.shape[:2]
+    angles = 2 * np.pi * np.arange(6) / 6
+    unit = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    polys = (centers[:, :, None, :] + cell_radius[:, None, None, None] * unit).reshape(count * cells, 6, 2)
+    reach = np.repeat(cell_radius, cells)
+    flat = centers.reshape(count * cells, 2)
+
+    def near(box):
+        return (
+            (flat[:, 0] + reach > box[0]) & (flat[:, 0] - reach < box[2])
+            & (flat[:, 1] + reach > box[1]) & (flat[:, 1] - reach < box[3])
+        )
+
+    # Cells inside the safe zone keep their full area, the ones on its edge are clipped
+    inside = (
+        (flat[:, 0] - reach >= safe[0]) & (flat[:, 0] + reach <= safe[2])
+        & (flat[:, 1] - reach >= safe[1]) & (flat[:, 1] + reach <= safe[3])
+    )
+    # Every cell clipped to the safe zone once (4 clips add up to 4 vertices)
+    clipped = np.concatenate([polys, np.repeat(polys[:, -1:], 4, axis=1)], axis=1)
+    edge = near(safe) & ~inside
+    if edge.any():
+        clipped[edge] = _clip_all(polys[edge], [("rect", safe)])
+    clipped[~edge & ~inside] = 0.0
+    area = np.where(inside, 1.5 * math.sqrt(3) * reach ** 2, 0.0)
+    area[edge] = _areas(clipped[edge])
+    opened = area > 0
+
+    # Keep-outs stay solid: subtract what they cover (pairs of overlapping keep-outs added back)
+    def covered(regions):
+        box = _bounds(regions[0])
+        for region in regions[1:]:
+            other = _bounds(region)
+            box = (max(box[0], other[0]), max(box[1], other[1]), min(box[2], other[2]), min(box[3], other[3]))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return
+        rows = near(box) & opened
+        if rows.any():
+            return rows, _covered_areas(clipped[rows], regions)
+
+    for region in keepouts:
+        result = covered([region])
+        if result:
+            area[result[0]] -= result[1]
+    for a, b in itertools.combinations(keepouts, 2):
+        result = covered([a, b])
+        if result:
+            area[result[0]] += result[1]
+    return np.clip(area, 0, None).reshape(count, cells).sum(axis=1)
+
+
+def _centers(radius, counts, center):
+    import numpy as np
+    from rack_pattern import hex_centers
+
+    return np.array(hex_centers(radius, counts[0], counts[1], center))
+
+
+def evaluate(plate, grid=None, min_rim=0):
+    """Open area (mm^2) of a plate with its own or the given hex parameters."""
+    import numpy as np
+
+    radius, cell_radius, counts, shift = grid or plate["hex"]
+    centers = _centers(radius, counts, (plate["center"][0] + shift[0], plate["center"][1] + shift[1]))
+    return float(open_areas(centers[None], np.array([cell_radius]), _safe(plate, min_rim), plate["keepouts"])[0])
+
+
+def plate_mass(plate, open_area, material="PLA"):
+    """Grams of a plate with open_area mm^2 cut out."""
+    x_min, y_min, x_max, y_max = plate["outer"]
+    return ((x_max - x_min) * (y_max - y_min) - open_area) * plate["thickness"] / 1000 * MATERIALS[material]
+
+
+# --- Search ---
+
+def candidates(plate, min_wall=MIN_WALL, max_cell=None, min_rim=MIN_RIM, radii=None, walls=None):
+    """Yields (radius, counts, [(cell_radius, shift)]) groups sharing a grid.
+
+    Grid counts follow from the radius: just enough cells to cover the safe
+    zone wherever the shift puts the grid (cells outside are dropped anyway).
+    """
+    import numpy as np
+
+    current_radius, current_cell = plate["hex"][:2]
+    max_cell = current_cell if max_cell is None else max_cell
+    safe = _safe(plate, min_rim)
+    if radii is None:
+        radii = np.arange(max(2.0, current_radius / 2), current_radius * 1.5 + 1e-9, 0.25)
+    if walls is None:
+        walls = min_wall + np.arange(0, 3.01, 0.2)
+
+    for radius in radii:
+        cells = [(2 * radius - wall) / math.sqrt(3) for wall in walls if wall >= min_wall - 1e-9]
+        cells = [cell for cell in cells if 0 < cell <= max_cell + 1e-9]
+        if not cells:
+            continue
+        # The grid repeats every two columns (odd ones sit half a row higher) and every row
+        x_spacing, y_spacing = math.sqrt(3) * radius, 2 * radius
+        shifts = [
+            (2 * x_spacing * (i / SHIFT_STEPS - 0.5), y_spacing * (j / SHIFT_STEPS - 0.5))
+            for i in range(SHIFT_STEPS) for j in range(SHIFT_STEPS)
+        ]
+        # Fewest columns / rows that still cover the safe zone for every shift
+        reach = 2 * max(cells)
+        counts = (
+            math.ceil((safe[2] - safe[0] + 2 * x_spacing + reach) / x_spacing) + 1,
+            math.ceil((safe[3] - safe[1] + 2 * y_spacing + reach) / y_spacing) + 1,
+        )
+        yield radius, counts, [(cell, shift) for cell in cells for shift in shifts]
+
+
+def optimize(plate, min_wall=MIN_WALL, max_cell=None, min_rim=MIN_RIM, material="PLA"):
+    """Best hex parameters for a plate: {"hex", "open_area", "mass", "wall", "evaluated", "time"}."""
+    import numpy as np
+
+    start = time.perf_counter()
+    safe = _safe(plate, min_rim)
+    best, evaluated = None, 0
+    for radius, counts, options in candidates(plate, min_wall, max_cell, min_rim):
+        base = _centers(radius, counts, plate["center"])
+        shifts = np.array([shift for _, shift in options])
+        cell_radii = np.array([cell for cell, _ in options])
+        areas = open_areas(base[None] + shifts[:, None, :], cell_radii, safe, plate["keepouts"])
+        evaluated += len(options)
+        i = int(np.argmax(areas))
+        if best is None or areas[i] > best[0] + 1e-6:
+            cell, shift = options[i]
+            best = (float(areas[i]), (float(radius), float(cell), counts, (round(float(shift[0]), 4), round(float(shift[1]), 4))))
+
+    open_area, grid = best
+    return {
+        "hex": grid,
+        "open_area": open_area,
+        "mass": plate_mass(plate, open_area, material),
+        "wall": wall_width(grid[0], grid[1]),
+        "evaluated": evaluated,
+        "time": time.perf_counter() - start,
+    }
+
+
+def overrides(plate, grid):
+    """{parameter: value} that gives the plate these hex parameters (for rack_params / --params)."""
+    radius, cell_radius, counts, shift = grid
+    return dict(zip(plate["params"], (radius, cell_radius, tuple(counts), tuple(shift))))
+
+
+# --- Report ---
+
+def occ_open_area(plate, grid=None, min_rim=0):
+    """Open area of the OCC-built plate face (outer rectangle minus the face area)."""
+    x_min, y_min, x_max, y_max = plate["outer"]
+    return (x_max - x_min) * (y_max - y_min) - plate_face(plate, grid, min_rim).area
+
+
+def _hex_text(grid):
+    radius, cell_radius, counts, shift = grid
+    return (
+        f"radius {radius:g}, cell {cell_radius:.3f}, {counts[0]}x{counts[1]}, "
+        f"shift ({shift[0]:g}, {shift[1]:g}), wall {wall_width(radius, cell_radius):.2f} mm"
+    )
+
+
+def print_result(name, plate, result, material="PLA", min_rim=MIN_RIM):
+    """Current plate vs. the optimizer's winner, both checked against OCC."""
+    current_area = evaluate(plate)
+    current_mass = plate_mass(plate, current_area, material)
+    best_occ = occ_open_area(plate, result["hex"], min_rim)
+    print(f"{name} ({plate['thickness']:g} mm, {material})")
+    print(f"  current  {current_mass:7.2f} g  open {current_area:9.1f} mm^2  {_hex_text(plate['hex'])}")
+    print(f"  best     {result['mass']:7.2f} g  open {result['open_area']:9.1f} mm^2  {_hex_text(result['hex'])}")
+    print(
+        f"  saved    {current_mass - result['mass']:7.2f} g ({(1 - result['mass'] / current_mass) * 100:.1f}%), "
+        f"OCC open area {best_occ:.1f} mm^2 ({best_occ - result['open_area']:+.3f}), "
+        f"{result['evaluated']} candidates in {result['time']:.2f}s ({result['evaluated'] / result['time']:.0f}/s)"
+    )
@@ -0,0 +1,42 @@
+# ==============================================================================
+# Feature Instancing
+# Places one prototype shape many times without copying its geometry.
+# ==============================================================================
+#
+# Usage:
+#
+#     spacer = make_one_spacer()
+#     spacers = Compound(children=instances(spacer, [Location((i * 12, 0, 0)) for i in range(8)]))
+#
+# An instance is a new reference to the prototype's TShape with its own
+# Location, so the geometry is built (and booleaned) once. build123d's
+# .moved() and copy.copy() end up sharing the TShape as well, but deep copy
+# the whole shape first and then throw the copy away.
+#
+# The sharing carries through:
+#   - STEP export: one body, placed N times (NEXT_ASSEMBLY_USAGE_OCCURRENCE)
+#   - tessellation: each face of the prototype is meshed once
+#   - BREP (part cache, rack_parallel.pack): written once, with locations
+#
+# A Compound with children is instanced child by child, so the tree with its
+# labels and colors is kept (copy.copy() would deep copy every child).
+
+
+def instance(prototype, location=None):
+    """prototype moved by location (default: in place) as a new shape sharing its geometry."""
+    from build123d import Compound, Shape
+
+    children = list(getattr(prototype, "children", ()))
+    if children:
+        shape = Compound(children=[instance(child, location) for child in children])
+    else:
+        wrapped = prototype.wrapped if location is None else prototype.wrapped.Moved(location.wrapped)
+        shape = Shape.cast(wrapped) # Plain Solid / Compound, whatever object built the prototype
+    shape.label = prototype.label
+    shape.color = prototype.color
+    return shape
+
+
+def instances(prototype, locations):
+    """One instance per location."""
+    return [instance(prototype, location) for location in locations]
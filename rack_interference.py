@@ -0,0 +1,256 @@
+# ==============================================================================
+# Interference Check
+# Finds colliding parts in an assembly: bounding boxes first, exact OCC last.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py check v106                 # build the assembly, report collisions
+#     python rack.py build v106 --check         # same, after the exports
+#
+#     from rack_interference import check, print_report
+#     print_report(check(parts["assembly"]))
+#
+# Each top-level child of the assembly (Tray, Shelf, Spacers, the boards) is
+# one part; its solids are the leaves. Solids of the same part are never
+# compared (a board's connectors sit on its PCB on purpose).
+#
+#   1. Broad phase: axis-aligned boxes of every solid (from the mesh when the
+#      shape is tessellated), grown by NEAR / 2, sweep-and-prune along X.
+#      Pairs of parts whose boxes don't meet are done.
+#   2. The same with the faces of each remaining solid pair: only the faces
+#      whose boxes meet the other solid's box go on.
+#   3. Exact, per remaining solid pair: BRepExtrema distance between those
+#      faces, face pair by face pair, closest boxes first, until the box gap
+#      exceeds the best distance (a point classification when the surfaces
+#      are apart and one box holds the other). Pairs further apart than TOLERANCE only count towards the
+#      clearance; the rest get an exact common() and its volume.
+#
+# BRepExtrema on a whole tray (240+ faces) takes ~0.1s per pair, on the few
+# face pairs that can be closest a few ms.
+#
+# A pair overlapping by more than MIN_VOLUME mm^3 collides, one closer than
+# TOLERANCE touches (a board on its standoffs). The minimum clearance is the
+# smallest distance between parts that don't touch, among pairs closer than
+# NEAR (further pairs are reported as "> NEAR").
+#
+# Environment:
+#   RACK_CHECK_NEAR=1         mm, clearances above this aren't measured
+#                             (larger: more face pairs to measure, slower)
+#   RACK_CHECK_TOLERANCE=0.01 mm, closer is touching
+#   RACK_CHECK_MIN_VOLUME=0.01 mm^3, smaller overlaps are ignored
+
+import os
+import time
+
+NEAR = float(os.environ.get("RACK_CHECK_NEAR", "1"))
+TOLERANCE = float(os.environ.get("RACK_CHECK_TOLERANCE", "0.01"))
+MIN_VOLUME = float(os.environ.get("RACK_CHECK_MIN_VOLUME", "0.01"))
+
+
+# --- Leaves ---
+
+def assembly_parts(assembly):
+    """[(label, [solids])] for each top-level child, solids in assembly coordinates."""
+    from build123d import Shape
+
+    children = list(getattr(assembly, "children", ()))
+    if not children:
+        return [(assembly.label or "part 0", list(assembly.solids()))]
+    location = assembly.wrapped.Location() # Children are relative to the assembly
+    return [
+        (child.label or f"part {i}", list(Shape.cast(child.wrapped.Moved(location)).solids()))
+        for i, child in enumerate(children)
+    ]
+
+
+def _box(solid, grow):
+    """(xmin, ymin, zmin, xmax, ymax, zmax) of a solid, grown by grow on every side."""
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRepBndLib import BRepBndLib
+
+    box = Bnd_Box()
+    BRepBndLib.Add_s(solid.wrapped, box, True) # Triangulation if there is one: cheaper and tight
+    xmin, ymin, zmin = box.CornerMin().Coord()
+    xmax, ymax, zmax = box.CornerMax().Coord()
+    return _grow((xmin, ymin, zmin, xmax, ymax, zmax), grow)
+
+
+def _grow(box, grow):
+    return tuple(value - grow for value in box[:3]) + tuple(value + grow for value in box[3:])
+
+
+def _overlap(a, b):
+    return all(a[i] <= b[i + 3] and b[i] <= a[i + 3] for i in range(3))
+
+
+def _union(boxes):
+    return tuple(min(b[i] for b in boxes) for i in range(3)) + tuple(max(b[i] for b in boxes) for i in range(3, 6))
+
+
+def box_pairs(boxes):
+    """Index pairs (i < j) of overlapping boxes, sweep-and-prune along X."""
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i][0])
+    active, pairs = [], []
+    for i in order:
+        active = [j for j in active if boxes[j][3] >= boxes[i][0]]
+        pairs += [(min(i, j), max(i, j)) for j in active if _overlap(boxes[i], boxes[j])]
+        active.append(i)
+    return pairs
+
+
+# --- Narrow phase ---
+
+def _near_faces(solid, box, grow, face_boxes):
+    """[(face, tight box)] of solid whose boxes, grown, meet box. Face boxes cached in face_boxes."""
+    if not face_boxes:
+        face_boxes.extend((face, _box(face, 0)) for face in solid.faces())
+    return [(face, face_box) for face, face_box in face_boxes if _overlap(_grow(face_box, grow), box)]
+
+
+def _gap(a, b):
+    """Distance between two boxes (0 if they meet): a lower bound for their contents."""
+    return sum(max(0.0, a[i] - b[i + 3], b[i] - a[i + 3]) ** 2 for i in range(3)) ** 0.5
+
+
+def _distance(a_faces, b_faces, limit, tolerance):
+    """Distance between two [(face, box)] lists, or None if above limit.
+
+    Face pairs are measured closest boxes first, stopping once the next box gap
+    can't beat the best distance or the faces touch.
+    """
+    from OCP.BRepExtrema import BRepExtrema_DistShapeShape
+    from OCP.Extrema import Extrema_ExtFlag_MIN
+
+    candidates = sorted(
+        (gap, i, j) for i, (_, a_box) in enumerate(a_faces) for j, (_, b_box) in enumerate(b_faces)
+        if (gap := _gap(a_box, b_box)) <= limit
+    )
+    best = None
+    for gap, i, j in candidates:
+        if best is not None and (gap >= best or best <= tolerance):
+            break
+        dist = BRepExtrema_DistShapeShape(a_faces[i][0].wrapped, b_faces[j][0].wrapped, Extrema_ExtFlag_MIN)
+        value = dist.Value() if dist.IsDone() else 0.0
+        if best is None or value < best:
+            best = value
+    return best if best is not None and best <= limit else None
+
+
+def _inside(solid, other, tolerance, classifiers):
+    """True if a vertex of other lies inside solid (other within solid, surfaces apart)."""
+    from OCP.BRepClass3d import BRepClass3d_SolidClassifier
+    from OCP.TopAbs import TopAbs_IN
+
+    if solid not in classifiers:
+        classifiers[solid] = BRepClass3d_SolidClassifier(solid.wrapped) # Set up once per solid
+    classifier = classifiers[solid]
+    classifier.Perform(other.vertices()[0].center().to_pnt(), tolerance)
+    return classifier.State() == TopAbs_IN
+
+
+def _contains(outer, inner):
+    return all(outer[i] <= inner[i] and inner[i + 3] <= outer[i + 3] for i in range(3))
+
+
+def _common_volume(a, b):
+    from OCP.BRepAlgoAPI import BRepAlgoAPI_Common
+    from OCP.BRepGProp import BRepGProp
+    from OCP.GProp import GProp_GProps
+
+    common = BRepAlgoAPI_Common(a.wrapped, b.wrapped)
+    if not common.IsDone():
+        return None
+    props = GProp_GProps()
+    BRepGProp.VolumeProperties_s(common.Shape(), props)
+    return props.Mass()
+
+
+# --- Check ---
+
+def check(assembly, near=NEAR, tolerance=TOLERANCE, min_volume=MIN_VOLUME):
+    """Checks every pair of parts of an assembly, returns a report dict (see print_report)."""
+    start = time.perf_counter()
+    parts = assembly_parts(assembly)
+    tight = [[_box(solid, 0) for solid in solids] for _, solids in parts]
+    boxes = [[_grow(box, near / 2) for box in solid_boxes] for solid_boxes in tight]
+    part_boxes = [_union(b) if b else None for b in boxes]
+
+    face_boxes = {} # (part, solid) -> [(face, box)], only for solids that get that far
+    classifiers = {}
+    pairs, stats = {}, {"solids": sum(len(solids) for _, solids in parts), "solid_pairs": 0, "commons": 0}
+    present = [i for i, box in enumerate(part_boxes) if box is not None]
+    for a, b in box_pairs([part_boxes[i] for i in present]):
+        i, j = present[a], present[b]
+        leaves = [(i, k) for k in range(len(boxes[i]))] + [(j, k) for k in range(len(boxes[j]))]
+        result = {"overlap": 0.0, "clearance": None}
+        for x, y in box_pairs([boxes[p][k] for p, k in leaves]):
+            (p, k), (q, m) = leaves[x], leaves[y]
+            if p == q:
+                continue
+            stats["solid_pairs"] += 1
+            a_solid, b_solid = parts[p][1][k], parts[q][1][m]
+            a_box, b_box = boxes[p][k], boxes[q][m]
+            a_faces = _near_faces(a_solid, b_box, near / 2, face_boxes.setdefault((p, k), []))
+            b_faces = _near_faces(b_solid, a_box, near / 2, face_boxes.setdefault((q, m), []))
+            distance = _distance(a_faces, b_faces, near, tolerance) # None: surfaces further apart than near
+            if distance is None or distance > tolerance:
+                # Apart, unless one solid is entirely inside the other
+                a_tight, b_tight = tight[p][k], tight[q][m]
+                if _contains(a_tight, b_tight) and _inside(a_solid, b_solid, tolerance, classifiers) or \
+                        _contains(b_tight, a_tight) and _inside(b_solid, a_solid, tolerance, classifiers):
+                    distance = 0.0
+            if distance is not None and distance <= tolerance:
+                stats["commons"] += 1
+                result["overlap"] += _common_volume(a_solid, b_solid) or 0.0
+                distance = 0.0
+            if distance is not None and (result["clearance"] is None or distance < result["clearance"]):
+                result["clearance"] = distance
+        pairs[(parts[i][0], parts[j][0])] = result
+
+    for result in pairs.values():
+        result["status"] = (
+            "collide" if result["overlap"] > min_volume
+            else "touch" if result["clearance"] is not None and result["clearance"] <= tolerance
+            else "clear"
+        )
+    clear = [
+        (result["clearance"], names) for names, result in pairs.items()
+        if result["status"] == "clear" and result["clearance"] is not None
+    ]
+    return {
+        "parts": [label for label, _ in parts],
+        "pairs": pairs,
+        "min_clearance": min(clear) if clear else None,
+        "near": near,
+        "time": time.perf_counter() - start,
+        **stats,
+    }
+
+
+def collisions(report):
+    return [names for names, result in report["pairs"].items() if result["status"] == "collide"]
+
+
+def print_report(report):
+    print(
+        f"Interference: {len(report['parts'])} parts, {report['solids']} solids, "
+        f"{report['solid_pairs']} box pairs, {report['commons']} exact checks, {report['time']:.2f}s"
+    )
+    for (a, b), result in sorted(report["pairs"].items(), key=lambda item: (item[1]["status"] != "collide", item[0])):
+        if result["status"] == "collide":
+            detail = f"overlap {result['overlap']:.3f} mm^3"
+        elif result["status"] == "touch":
+            detail = "touching"
+        elif result["clearance"] is None:
+            detail = f"clearance > {report['near']:g} mm"
+        else:
+            detail = f"clearance {result['clearance']:.3f} mm"
+        print(f"  {result['status']:<8} {a} <-> {b}: {detail}")
+    if report["min_clearance"]:
+        distance, (a, b) = report["min_clearance"]
+        print(f"Minimum clearance: {distance:.3f} mm ({a} <-> {b})")
+    else:
+        print(f"Minimum clearance: > {report['near']:g} mm")
+    found = collisions(report)
+    print(f"{len(found)} collision(s)" if found else "No collisions")
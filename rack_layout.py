@@ -0,0 +1,356 @@
+# ==============================================================================
+# Layout Preview
+# Top view of a design's boards, standoffs and cutouts from its layout math alone.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py layout v3                          # rack_v3_layout.svg / .json, gaps printed
+#     python rack.py layout v106 --set pcie_x=25 --set leg_inset=8
+#     python rack.py layout v3 --params my_box.json --out build/
+#
+#     def layout():                                     # in a design module
+#         return [
+#             bounds("Box", 0, 0, box_inner_w, box_inner_d, wall_thickness, (0, box_height)),
+#             *board("M.2", m2_x, m2_y, 96, 24, board_z, 2),
+#             *standoffs("M.2 standoff", m2_x + 48, m2_y + 12, 92, 20, standoff_radius, posts, "M.2"),
+#             cutout("M.2 cutout", "left", x, y, w, d, (5, 25), "M.2"),
+#             keepout("SATA jack clearance", x, sata_y - 35, 18, 35, (0, box_height), "SATA"),
+#         ]
+#
+# Placement iterations (dcdc_x, m2_y, pcie_x, lx_left, ...) only need the
+# numbers, not the solids. The design's source is parsed instead of imported:
+# its top-level assignments run one by one with the overrides applied
+# (rack_params.override_body), the ones that need build123d (Location(...),
+# BOARD_DETAIL) fail and are left out, then layout() runs on the rest.
+# build123d is never imported, a preview takes a few ms.
+#
+# Items are rectangles or circles in the top view, each with a z range and a
+# group (the board a standoff or cutout belongs to, "Tray", ...). Every pair
+# of items from different groups whose z ranges overlap gets a gap: the
+# distance between their outlines, negative when they overlap (by the
+# distance that would push them apart). Touching in z (a board on its
+# standoffs) doesn't count as overlapping. Every item also gets its
+# clearance to the walls of the bounds (negative: it sticks out), except
+# the enclosure's own (the bounds' group) and cutouts, which have to cross
+# their wall instead: they get the margin to the wall's ends and whether
+# they reach through it.
+#
+# The layout is a model kept next to the generators it mirrors: a board is
+# its PCB plus the bounding boxes of its components (like the ghosts of
+# rack_lod), so gaps err towards less clearance.
+
+import ast
+import json
+import math
+import os
+import time
+
+from rack_params import _assigned_names, module_path, override_body
+
+WALLS = ("front", "back", "left", "right")
+LIGHT_IMPORTS = {"math", "rack_cutouts", "rack_layout"} # The only imports run from a design's source
+
+# SVG fill per item kind
+COLORS = {
+    "board": "#3c6eb4",
+    "component": "#8fb3e3",
+    "standoff": "#7a7a7a",
+    "bracket": "#a0a0a0",
+    "leg": "#a0a0a0",
+    "shelf": "#d8d8d8",
+    "cutout": "#f0a030",
+    "keepout": "#f4c4c4",
+}
+
+
+# --- Items ---
+
+def rect(kind, name, x, y, w, d, z, group=None):
+    """A rectangle item: corner (x, y), size w x d, z = (bottom, top)."""
+    return {"kind": kind, "name": name, "group": group or name, "shape": "rect", "x": x, "y": y, "w": w, "d": d, "z": list(z)}
+
+
+def circle(kind, name, cx, cy, r, z, group=None):
+    """A round item (standoff, leg, boss) centered at (cx, cy)."""
+    return {"kind": kind, "name": name, "group": group or name, "shape": "circle", "cx": cx, "cy": cy, "r": r, "z": list(z)}
+
+
+def bounds(name, x, y, w, d, wall, z):
+    """The inside of the enclosure, wall the thickness of its walls (what cutouts have to cross)."""
+    item = rect("bounds", name, x, y, w, d, z)
+    item["wall"] = wall
+    return item
+
+
+def cutout(name, wall, x, y, w, d, z, group=None):
+    """A wall opening: the top view of its cutter, on the front, back, left or right wall."""
+    if wall not in WALLS:
+        raise ValueError(f"Unknown wall {wall!r} for {name} (choose from {', '.join(WALLS)})")
+    item = rect("cutout", name, x, y, w, d, z, group)
+    item["wall"] = wall
+    return item
+
+
+def keepout(name, x, y, w, d, z, group=None):
+    """Space that has to stay clear of other groups' items (a plug, a hand reaching for a screw)."""
+    return rect("keepout", name, x, y, w, d, z, group)
+
+
+def board(name, x, y, w, d, z, thickness, components=(), rotation=0, group=None):
+    """A PCB with its corner at (x, y, z) and [(label, u, v, w, d, height)] components on top.
+
+    Component positions are in board coordinates (corner at the PCB's corner),
+    rotation=180 turns them about the board's center like a board model
+    rotated in place.
+    """
+    if rotation not in (0, 180):
+        raise ValueError(f"{name}: only 0 and 180 degree board rotations are supported")
+    group = group or name
+    top = z + thickness
+    items = [rect("board", name, x, y, w, d, (z, top), group)]
+    for label, u, v, cw, cd, height in components:
+        if rotation == 180:
+            u, v = w - u - cw, d - v - cd
+        items.append(rect("component", f"{name} {label}", x + u, y + v, cw, cd, (top, top + height), group))
+    return items
+
+
+def standoffs(name, cx, cy, hole_w, hole_d, r, z, group=None):
+    """Four posts on a hole_w x hole_d pattern centered at (cx, cy)."""
+    corners = [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+    return [
+        circle("standoff", f"{name} {i}", cx + sx * hole_w/2, cy + sy * hole_d/2, r, z, group)
+        for i, (sx, sy) in enumerate(corners, 1)
+    ]
+
+
+# --- Evaluation ---
+
+def layout_namespace(module_name, overrides=None):
+    """(globals, skipped names): the design's top-level values computable without build123d, and layout()."""
+    path = module_path(module_name)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    namespace, skipped = {"__name__": f"{module_name}.layout"}, []
+    for node in override_body(module_name, tree, overrides or {}):
+        if isinstance(node, ast.Import):
+            if any(alias.name not in LIGHT_IMPORTS for alias in node.names):
+                continue
+        elif isinstance(node, ast.ImportFrom):
+            if node.module not in LIGHT_IMPORTS:
+                continue
+        elif isinstance(node, ast.FunctionDef):
+            if node.decorator_list: # Defining the others is harmless: layout() may call helpers like box_openings()
+                continue
+        elif not isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            continue
+        code = compile(ast.fix_missing_locations(ast.Module([node], [])), path, "exec")
+        try:
+            exec(code, namespace)
+        except NameError: # build123d values, and whatever is computed from them
+            skipped.extend(_assigned_names(node))
+    if "layout" not in namespace:
+        raise ValueError(f"{module_name} has no layout() to preview")
+    return namespace, skipped
+
+
+def run(module_name, overrides=None):
+    """The design's layout items measured: {"design", "items", "gaps", "walls", "cutouts", "time", ...}."""
+    start = time.perf_counter()
+    namespace, skipped = layout_namespace(module_name, overrides)
+    try:
+        items = list(namespace["layout"]())
+    except NameError as e:
+        raise ValueError(f"{module_name}.layout() reads a value that needs build123d ({e})") from None
+    report = measure(items)
+    report.update(design=module_name, overrides=dict(overrides or {}), skipped=skipped, time=time.perf_counter() - start)
+    return report
+
+
+# --- Gaps ---
+
+def extent(item):
+    """(x_min, y_min, x_max, y_max) of an item."""
+    if item["shape"] == "circle":
+        return (item["cx"] - item["r"], item["cy"] - item["r"], item["cx"] + item["r"], item["cy"] + item["r"])
+    return (item["x"], item["y"], item["x"] + item["w"], item["y"] + item["d"])
+
+
+def _point_distance(px, py, item):
+    """Signed distance from a point to a rectangle item (negative inside)."""
+    x_min, y_min, x_max, y_max = extent(item)
+    qx = abs(px - (x_min + x_max)/2) - (x_max - x_min)/2
+    qy = abs(py - (y_min + y_max)/2) - (y_max - y_min)/2
+    return math.hypot(max(qx, 0), max(qy, 0)) + min(max(qx, qy), 0)
+
+
+def gap(a, b):
+    """Distance between the outlines of two items in the top view, negative when they overlap."""
+    if a["shape"] == "circle" and b["shape"] == "circle":
+        return math.hypot(a["cx"] - b["cx"], a["cy"] - b["cy"]) - a["r"] - b["r"]
+    if a["shape"] == "circle" or b["shape"] == "circle":
+        round_item, box = (a, b) if a["shape"] == "circle" else (b, a)
+        return _point_distance(round_item["cx"], round_item["cy"], box) - round_item["r"]
+    a_min_x, a_min_y, a_max_x, a_max_y = extent(a)
+    b_min_x, b_min_y, b_max_x, b_max_y = extent(b)
+    dx = max(b_min_x - a_max_x, a_min_x - b_max_x)
+    dy = max(b_min_y - a_max_y, a_min_y - b_max_y)
+    if dx < 0 and dy < 0:
+        return max(dx, dy) # Overlap: the shorter way out
+    return math.hypot(max(dx, 0), max(dy, 0))
+
+
+def _z_overlap(a, b):
+    return a["z"][0] < b["z"][1] - 1e-9 and b["z"][0] < a["z"][1] - 1e-9
+
+
+def wall_slab(box, wall):
+    """The rectangle of one wall of the bounds."""
+    x_min, y_min, x_max, y_max = extent(box)
+    t = box["wall"]
+    return {
+        "front": (x_min, y_min - t, x_max, y_min),
+        "back": (x_min, y_max, x_max, y_max + t),
+        "left": (x_min - t, y_min, x_min, y_max),
+        "right": (x_max, y_min, x_max + t, y_max),
+    }[wall]
+
+
+def measure(items):
+    """Pairwise gaps, wall clearances and cutout checks of a list of layout items."""
+    boxes = [item for item in items if item["kind"] == "bounds"]
+    if len(boxes) != 1:
+        raise ValueError(f"A layout needs exactly one bounds() item, got {len(boxes)}")
+    box = boxes[0]
+    others = [item for item in items if item is not box]
+    seen = set()
+    for item in others:
+        if item["name"] in seen:
+            raise ValueError(f"Layout item {item['name']!r} appears twice")
+        seen.add(item["name"])
+
+    gaps = []
+    for i, a in enumerate(others):
+        for b in others[i + 1:]:
+            if a["group"] != b["group"] and _z_overlap(a, b):
+                gaps.append({"a": a["name"], "b": b["name"], "gap": round(gap(a, b), 3)})
+    gaps.sort(key=lambda row: row["gap"])
+
+    x_min, y_min, x_max, y_max = extent(box)
+    walls, cutouts = [], []
+    for item in others:
+        ix_min, iy_min, ix_max, iy_max = extent(item)
+        if item["kind"] == "cutout":
+            sx_min, sy_min, sx_max, sy_max = wall_slab(box, item["wall"])
+            if item["wall"] in ("front", "back"):
+                through = iy_min < sy_min and iy_max > sy_max
+                margin = min(ix_min - x_min, x_max - ix_max)
+            else:
+                through = ix_min < sx_min and ix_max > sx_max
+                margin = min(iy_min - y_min, y_max - iy_max)
+            cutouts.append({"item": item["name"], "wall": item["wall"], "through": through, "margin": round(margin, 3)})
+            continue
+        if item["group"] == box["group"]:
+            continue # Part of the enclosure itself (a boss merging into its wall)
+        sides = {"left": ix_min - x_min, "right": x_max - ix_max, "front": iy_min - y_min, "back": y_max - iy_max}
+        wall = min(sides, key=sides.get)
+        walls.append({"item": item["name"], "wall": wall, "clearance": round(sides[wall], 3)})
+    walls.sort(key=lambda row: row["clearance"])
+    return {"items": items, "gaps": gaps, "walls": walls, "cutouts": cutouts}
+
+
+def problems(report):
+    """Overlapping pairs, items outside the walls and cutouts that miss their wall."""
+    return (
+        [f"{row['a']} <-> {row['b']}" for row in report["gaps"] if row["gap"] < 0]
+        + [row["item"] for row in report["walls"] if row["clearance"] < 0]
+        + [row["item"] for row in report["cutouts"] if not row["through"] or row["margin"] < 0]
+    )
+
+
+# --- Output ---
+
+def print_report(report, shown=10):
+    """The overlaps and the smallest gaps / wall clearances, then every cutout."""
+    print(
+        f"Layout of {report['design']}: {len(report['items'])} items, {len(report['gaps'])} pairs, "
+        f"{report['time'] * 1000:.1f} ms"
+    )
+    for i, row in enumerate(report["gaps"]):
+        if i >= shown and row["gap"] >= 0:
+            break
+        status = "overlap" if row["gap"] < 0 else "gap"
+        print(f"  {status:<8} {row['a']} <-> {row['b']}: {row['gap']:.3f} mm")
+    print("Walls:")
+    for i, row in enumerate(report["walls"]):
+        if i >= shown and row["clearance"] >= 0:
+            break
+        print(f"  {'outside' if row['clearance'] < 0 else 'inside':<8} {row['item']}: {row['clearance']:.3f} mm to the {row['wall']} wall")
+    if report["cutouts"]:
+        print("Cutouts:")
+    for row in report["cutouts"]:
+        reach = "through" if row["through"] else "misses the wall"
+        print(f"  {row['item']}: {row['wall']} wall, {reach}, {row['margin']:.3f} mm to its ends")
+    found = problems(report)
+    print(f"{len(found)} problem(s)" if found else "No overlaps")
+
+
+def _svg_shape(item, flip, fill, stroke, width):
+    style = f'fill="{fill}" fill-opacity="0.7" stroke="{stroke}" stroke-width="{width}"'
+    if item["shape"] == "circle":
+        return f'<circle cx="{item["cx"]:.3f}" cy="{flip(item["cy"]):.3f}" r="{item["r"]:.3f}" {style}><title>{item["name"]}</title></circle>'
+    return (
+        f'<rect x="{item["x"]:.3f}" y="{flip(item["y"] + item["d"]):.3f}" width="{item["w"]:.3f}" height="{item["d"]:.3f}" '
+        f'{style}><title>{item["name"]}</title></rect>'
+    )
+
+
+def svg(report, scale=4):
+    """Top view as SVG text (mm units, +Y up, the front at the bottom); overlapping items outlined red."""
+    box = next(item for item in report["items"] if item["kind"] == "bounds")
+    t = box["wall"]
+    extents = [extent(item) for item in report["items"]]
+    x_min = min(e[0] for e in extents) - t - 5
+    y_min = min(e[1] for e in extents) - t - 5
+    x_max = max(e[2] for e in extents) + t + 5
+    y_max = max(e[3] for e in extents) + t + 15 # Room for the title
+    width, height = x_max - x_min, y_max - y_min
+
+    def flip(y):
+        return y_max + y_min - y
+
+    overlapping = {name for row in report["gaps"] if row["gap"] < 0 for name in (row["a"], row["b"])}
+    bx_min, by_min, bx_max, by_max = extent(box)
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width * scale:.0f}" height="{height * scale:.0f}" '
+        f'viewBox="{x_min:.3f} {y_min:.3f} {width:.3f} {height:.3f}">',
+        f'<rect x="{bx_min - t:.3f}" y="{flip(by_max + t):.3f}" width="{bx_max - bx_min + 2*t:.3f}" '
+        f'height="{by_max - by_min + 2*t:.3f}" fill="#c8c8c8"/>',
+        f'<rect x="{bx_min:.3f}" y="{flip(by_max):.3f}" width="{bx_max - bx_min:.3f}" height="{by_max - by_min:.3f}" fill="#f7f7f7"/>',
+    ]
+    # Lowest first, so what sits on top is drawn on top
+    for item in sorted((item for item in report["items"] if item is not box), key=lambda item: item["z"][1]):
+        red = item["name"] in overlapping
+        lines.append(_svg_shape(item, flip, COLORS.get(item["kind"], "#cccccc"), "#d01010" if red else "#303030", 0.6 if red else 0.2))
+        if item["kind"] == "board":
+            x0, y0, x1, y1 = extent(item)
+            lines.append(f'<text x="{(x0 + x1)/2:.3f}" y="{flip((y0 + y1)/2):.3f}" font-size="4" text-anchor="middle" fill="#000">{item["name"]}</text>')
+    lines.append(
+        f'<text x="{x_min + 2:.3f}" y="{y_min + 6:.3f}" font-size="4">{report["design"]}: '
+        f'{len(problems(report))} problem(s), smallest gap {report["gaps"][0]["gap"] if report["gaps"] else "-"} mm</text>'
+    )
+    lines.append("</svg>")
+    return "\n".join(lines)
+
+
+def write(report, out="."):
+    """Writes <design>_layout.svg and <design>_layout.json to out, returns their paths."""
+    os.makedirs(out, exist_ok=True)
+    stem = os.path.join(out, f"{report['design']}_layout")
+    with open(f"{stem}.svg", "w") as f:
+        f.write(svg(report))
+    with open(f"{stem}.json", "w") as f:
+        json.dump(report, f, indent=2)
+    return [f"{stem}.svg", f"{stem}.json"]
@@ -0,0 +1,75 @@
+# ==============================================================================
+# Board Level of Detail
+# Board models as a colored component tree, or as one plain ghost solid.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py build v106 --show                      # ghost boards (default)
+#     python rack.py build v106 --show --detail detailed    # every component, colored
+#     RACK_BOARD_DETAIL=detailed python rack_v106.py
+#
+#     def make_dcdc_board(location=Location((0,0,0)), detail=BOARD_DETAIL):
+#         components = [(pcb, Color("black"), Location((0,0,0))), ...]
+#         return board_model(components, location, detail)
+#
+# A board is a PCB plus components, each given as (geometry, color, location
+# on the board). "detailed" keeps one colored sub-compound per component (and
+# the PCB's mounting holes, the generators only drill them at this level).
+# "ghost" fuses the components' bounding boxes into a single solid, without
+# holes or colors. The connectors, terminals and brackets are boxes, so the
+# envelopes the interference check and the enclosure walls care about stay
+# exact; round parts (capacitors) become their bounding box, which only errs
+# towards less clearance. The viewer and the assembly STEP get one body per
+# board instead of a tree of colored sub-compounds (v2 boards: 27 solids,
+# ~1300 triangles detailed, 3 solids, ~420 triangles as ghosts).
+#
+# Designs pass the level to their board generators as a parameter
+# (board_detail, an argument of the PARTS entries), so part cache and watch
+# keys change with it.
+#
+# Environment:
+#   RACK_BOARD_DETAIL=ghost     ghost | detailed
+
+import os
+
+DETAILS = ("ghost", "detailed")
+BOARD_DETAIL = os.environ.get("RACK_BOARD_DETAIL", "ghost")
+if BOARD_DETAIL not in DETAILS:
+    raise ValueError(f"RACK_BOARD_DETAIL must be one of {', '.join(DETAILS)}, got {BOARD_DETAIL!r}")
+
+
+def envelope(shape):
+    """The shape's axis-aligned bounding box as a solid: exact for box components, conservative otherwise."""
+    from build123d import Box, Pos
+
+    box = shape.bounding_box()
+    return Pos(*box.center()) * Box(box.size.X, box.size.Y, box.size.Z)
+
+
+def ghost_solid(shapes):
+    """The shapes fused into one solid (coplanar faces merged), or a compound if they don't touch."""
+    from build123d import Compound
+
+    fused = shapes[0].fuse(*shapes[1:]) if len(shapes) > 1 else shapes[0]
+    fused = fused.clean()
+    solids = fused.solids()
+    return solids[0] if len(solids) == 1 else Compound(children=list(solids))
+
+
+def board_model(components, location=None, detail=BOARD_DETAIL, color="black"):
+    """A board at location from [(geometry, color, local location)] at the given level of detail."""
+    from build123d import Color, Compound, Location
+
+    from rack_instance import instance
+
+    if detail not in DETAILS:
+        raise ValueError(f"Unknown board detail {detail!r} (choose from {', '.join(DETAILS)})")
+    location = Location() if location is None else location
+    if detail == "detailed":
+        return Compound(children=[
+            Compound(children=[instance(geom, location * local)], color=part_color)
+            for geom, part_color, local in components
+        ])
+    ghost = ghost_solid([envelope(instance(geom, local)) for geom, _, local in components])
+    return Compound(children=[instance(ghost, location)], color=Color(color) if isinstance(color, str) else color)
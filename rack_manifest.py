@@ -0,0 +1,138 @@
+# ==============================================================================
+# Build Manifest
+# Remembers what every exported file was made from, so unchanged files
+# are not tessellated / written again.
+# ==============================================================================
+#
+# rack_manifest.json (in the export folder) holds one entry per file:
+#
+#     "rack_v106_tray.stl": {
+#         "part": "tray",
+#         "geometry": "<hash of the shape>",
+#         "params": {"tray_depth": 130, ...},   # globals the generator reads
+#         "settings": {"format": "stl", "tolerance": 0.001, ...},
+#         "versions": {"build123d": "...", "OCP": "..."},
+#         "sha256": "<hash of the file>",         # stable with deterministic exports (rack_export.py)
+#         "size": 1234567, "mtime_ns": ...
+#     }
+#
+# A file is skipped when its geometry hash, export settings and library
+# versions match the entry and the file on disk is still the one that was
+# written (same size and mtime). The params are recorded for reference only:
+# any parameter that matters changes the geometry hash.
+#
+# Environment:
+#   RACK_FORCE=1    export everything regardless of the manifest
+
+import hashlib
+import json
+import os
+import re
+
+from rack_cache import library_versions, part_params
+
+MANIFEST_FILE = "rack_manifest.json"
+FORCE = os.environ.get("RACK_FORCE", "0") == "1"
+
+# Coordinates are rounded to this many decimals (mm) before hashing
+HASH_DIGITS = 9
+
+
+# --- Geometry Hash ---
+# BREP text is exact, but a BREP round trip (e.g. through the part cache)
+# moves direction vectors by an ulp or two, and exporting a shape flips its
+# TShape flags. Numbers are rounded and flags and triangulations left out
+# before hashing, so only real geometry changes change the hash.
+#
+# The numbers are rounded all at once with NumPy and hashed as float64s after
+# the text around them (the per-match Python callback this replaces took 3x
+# as long; the tessellation cache digests every solid it meshes or looks up).
+
+# Captured, so split() alternates text and numbers
+_NUMBER = re.compile(rb"((?<![\w.])-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)")
+# TShape flag lines (free, modified, checked, ...), which exports toggle
+_FLAGS = re.compile(rb"^[01]{7}$", re.MULTILINE)
+
+
+def _brep_digest(shape):
+    import io
+    import numpy as np
+    from OCP.BRepTools import BRepTools
+    from OCP.TopTools import TopTools_FormatVersion
+
+    buffer = io.BytesIO()
+    BRepTools.Write_s(shape.wrapped, buffer, False, False, TopTools_FormatVersion.TopTools_FormatVersion_VERSION_1)
+    pieces = _NUMBER.split(_FLAGS.sub(b"", buffer.getvalue()))
+    numbers = np.array(pieces[1::2], dtype=np.float64)
+    digest = hashlib.sha256(b"#".join(pieces[0::2]))
+    digest.update((np.round(numbers, HASH_DIGITS) + 0.0).tobytes()) # + 0.0 turns -0.0 into 0.0
+    return digest.hexdigest()
+
+
+def geometry_hash(shape):
+    """Hashes a shape's geometry plus the labels and colors of its compound tree."""
+    digest = hashlib.sha256()
+    digest.update(repr((shape.label, tuple(shape.color) if shape.color is not None else None)).encode())
+    children = list(getattr(shape, "children", ()))
+    if children:
+        for child in children:
+            digest.update(geometry_hash(child).encode())
+    else:
+        digest.update(_brep_digest(shape).encode())
+    return digest.hexdigest()
+
+
+# --- Parameters ---
+
+def design_params(namespace):
+    """Returns {part: generator params} for a design module's globals (cached generators only)."""
+    params = {}
+    for name in namespace.get("PART_NAMES", ()):
+        spec = namespace.get("PARTS", {}).get(name)
+        func = namespace.get(spec[0] if spec else f"make_{name}")
+        if getattr(func, "cache_params", None) is not None:
+            params[name] = part_params(func)
+    return params
+
+
+# --- Manifest File ---
+
+def load_manifest(folder="."):
+    path = os.path.join(folder, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        return {} # Corrupt: start over, everything gets exported once
+
+
+def save_manifest(manifest, folder="."):
+    with open(os.path.join(folder, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, default=repr)
+
+
+def make_entry(part, geometry, settings, params=None):
+    return {
+        "part": part,
+        "geometry": geometry,
+        "params": params,
+        "settings": settings,
+        "versions": library_versions(),
+    }
+
+
+def is_current(entry, old, path):
+    """True if the file at path was written from the same geometry and settings."""
+    if not old or not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    if old.get("size") != stat.st_size or old.get("mtime_ns") != stat.st_mtime_ns:
+        return False # Deleted, rewritten or edited outside of the manifest
+    return all(old.get(key) == entry[key] for key in ("geometry", "settings", "versions"))
+
+
+def record(manifest, filename, entry, path):
+    stat = os.stat(path)
+    manifest[filename] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
@@ -0,0 +1,380 @@
+# ==============================================================================
+# Mesh Profiles & Statistics
+# Tessellation settings for STL export and a report of what they produce.
+# ==============================================================================
+#
+# Profiles (angular deflection in radians; the linear deflection is relative
+# to each edge's size, like export_stl does it, so the real deviation is
+# reported separately):
+#   preview   coarse, small files for viewing / sharing (~0.1 mm on rack_v3)
+#   print     well below a 0.1 mm layer (default, ~0.03 mm on rack_v3)
+#   archive   the old export_stl defaults
+#
+# mesh_stats() reports, for a tessellated shape:
+#   triangles       triangle count
+#   max_deviation   largest distance between the mesh and the BREP surface,
+#                   sampled at every triangle centroid of every curved face
+#                   (planar faces are exact)
+#
+# mesh_volume() is the enclosed volume of a closed mesh (signed tetrahedra,
+# see rack_estimate.py for what it is used for).
+#
+# write_stl() writes binary STL straight from the face triangulations with
+# NumPy (what export_stl does triangle by triangle), write_stl_arrays() from
+# a (vertices, triangles) pair like rack_meshcache's, see "Binary STL" below.
+# With canonical=True both write the triangles in a fixed order
+# (canonical_mesh()), so the same mesh always gives the same bytes.
+
+import math
+
+PROFILES = {
+    "preview": {"tolerance": 0.1, "angular_tolerance": 0.5},
+    "print": {"tolerance": 0.01, "angular_tolerance": 0.2},
+    "archive": {"tolerance": 1e-3, "angular_tolerance": 0.1},
+}
+DEFAULT_PROFILE = "print"
+
+
+def profile_settings(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown mesh profile {name!r} (choose from {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def tessellate(shape, profile=DEFAULT_PROFILE):
+    """Meshes shape with a profile's settings (kept on the faces for write_stl / mesh_stats)."""
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+
+    settings = profile_settings(profile)
+    BRepMesh_IncrementalMesh(shape.wrapped, settings["tolerance"], True, settings["angular_tolerance"], True).Perform()
+
+
+def clear_mesh(shape):
+    """Drops existing triangulations, so the next tessellate() can also make a coarser mesh."""
+    from OCP.BRepTools import BRepTools
+    BRepTools.Clean_s(shape.wrapped)
+
+
+def mesh_stats(shape):
+    """Returns {"triangles": n, "max_deviation": mm} of an already tessellated shape.
+
+    Instanced faces (rack_instance) count once per placement, but are measured once.
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepAdaptor import BRepAdaptor_Surface
+    from OCP.GeomAbs import GeomAbs_SurfaceType
+    from build123d import Face
+    from OCP.TopLoc import TopLoc_Location
+
+    triangles = 0
+    deviation = 0.0
+    measured = set() # Faces at the origin (Face compares by TShape + location)
+    for face in _faces(shape):
+        location = TopLoc_Location()
+        mesh = BRep_Tool.Triangulation_s(face, location)
+        if mesh is None:
+            continue
+        triangles += mesh.NbTriangles()
+        prototype = Face(face.Located(TopLoc_Location()))
+        if prototype in measured:
+            continue # Another placement of a face already measured
+        measured.add(prototype)
+
+        surface = BRepAdaptor_Surface(face) # Located like the face
+        if surface.GetType() == GeomAbs_SurfaceType.GeomAbs_Plane or not mesh.HasUVNodes():
+            continue
+        transform = location.Transformation()
+        for i in range(1, mesh.NbTriangles() + 1):
+            nodes = mesh.Triangle(i).Get()
+            points = [mesh.Node(n).Transformed(transform) for n in nodes]
+            uvs = [mesh.UVNode(n) for n in nodes]
+            # Surface point at the centroid's parameters vs. the flat triangle's centroid
+            on_surface = surface.Value(sum(uv.X() for uv in uvs) / 3, sum(uv.Y() for uv in uvs) / 3)
+            deviation = max(deviation, math.dist(
+                (on_surface.X(), on_surface.Y(), on_surface.Z()),
+                (sum(p.X() for p in points) / 3, sum(p.Y() for p in points) / 3, sum(p.Z() for p in points) / 3),
+            ))
+    return {"triangles": triangles, "max_deviation": deviation}
+
+
+def _faces(shape):
+    """Every face occurrence (TopoDS_Face) of shape, shared ones once per placement."""
+    from OCP.TopAbs import TopAbs_FACE
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopoDS import TopoDS
+
+    explorer = TopExp_Explorer(shape.wrapped, TopAbs_FACE)
+    while explorer.More():
+        yield TopoDS.Face(explorer.Current())
+        explorer.Next()
+
+
+# --- Mesh Arrays ---
+# Triangulations pulled out of the faces into NumPy arrays: vertices (N, 3)
+# float64 in world coordinates and triangles (M, 3) vertex indices, wound
+# outwards (reversed faces are flipped).
+
+def location_matrix(location):
+    """The (3, 4) affine matrix of a TopLoc_Location."""
+    import numpy as np
+
+    trsf = location.Transformation()
+    return np.array([[trsf.Value(r, c) for c in range(1, 5)] for r in range(1, 4)])
+
+
+# The bindings give no buffer access to a triangulation's node and triangle
+# arrays, only one call per element. So a face carrying nothing but the
+# triangulation is written in OCC's binary BREP format (version 1), where
+# they are packed little-endian arrays: int32 node and triangle counts, a UV
+# flag, the deflection (float64), the nodes (3 float64 each), the UV nodes
+# (2 float64 each, if flagged), the triangles (3 int32 each, 1-based).
+# Anything else in the file (another OCC version writing another layout)
+# falls back to the element by element read, with a note, instead of failing.
+_BINTOOLS_HEADER = b"\nOpen CASCADE Topology V1 (c)\n"
+_TRIANGULATIONS = b"\nTriangulations 1\n"
+_SHAPES = b"\nTShapes"
+
+_bulk_read = True # Cleared once the binary layout turns out to be another one
+
+
+def _bulk_arrays(mesh):
+    """(nodes, triangles) of a Poly_Triangulation from its binary BREP, or None if the layout isn't the expected one."""
+    import io
+    import numpy as np
+    from OCP.BRep import BRep_Builder
+    from OCP.TopoDS import TopoDS_Face
+
+    try:
+        from OCP.BinTools import BinTools, BinTools_FormatVersion
+
+        carrier = TopoDS_Face()
+        BRep_Builder().MakeFace(carrier, mesh)
+        stream = io.BytesIO()
+        BinTools.Write_s(carrier, stream, True, False, BinTools_FormatVersion.BinTools_FormatVersion_VERSION_1)
+    except (ImportError, AttributeError, TypeError):
+        return None
+    data = stream.getvalue()
+    start = data.find(_TRIANGULATIONS)
+    if not data.startswith(_BINTOOLS_HEADER) or start < 0:
+        return None
+
+    start += len(_TRIANGULATIONS)
+    if len(data) < start + 17:
+        return None
+    node_count, triangle_count = (int(n) for n in np.frombuffer(data, "<i4", 2, start))
+    has_uv = data[start + 8]
+    offset = start + 9 + 8 # Counts, UV flag, deflection
+    end = offset + 8 * (3 + 2 * has_uv) * node_count + 12 * triangle_count
+    if (node_count, triangle_count) != (mesh.NbNodes(), mesh.NbTriangles()) or has_uv > 1 or not data.startswith(_SHAPES, end):
+        return None
+    nodes = np.frombuffer(data, "<f8", 3 * node_count, offset).reshape(-1, 3)
+    offset += 8 * (3 + 2 * has_uv) * node_count
+    triangles = np.frombuffer(data, "<i4", 3 * triangle_count, offset).reshape(-1, 3).astype(np.int64) - 1
+    return nodes, triangles
+
+
+def _element_arrays(mesh):
+    """(nodes, triangles) of a Poly_Triangulation, one call per node and triangle."""
+    import numpy as np
+
+    nodes = (mesh.Node(i) for i in range(1, mesh.NbNodes() + 1))
+    vertices = np.fromiter((c for p in nodes for c in (p.X(), p.Y(), p.Z())), np.float64, 3 * mesh.NbNodes()).reshape(-1, 3)
+    triangles = np.fromiter(
+        (n for i in range(1, mesh.NbTriangles() + 1) for n in mesh.Triangle(i).Get()), np.int64, 3 * mesh.NbTriangles()
+    ).reshape(-1, 3) - 1
+    return vertices, triangles
+
+
+def _triangulation_arrays(mesh):
+    """(nodes, triangles) of a Poly_Triangulation, triangles 0-based: in bulk where the binary layout allows."""
+    global _bulk_read
+    if _bulk_read:
+        arrays = _bulk_arrays(mesh)
+        if arrays is not None:
+            return arrays
+        _bulk_read = False
+        print("Note: unexpected triangulation layout in OCC's binary BREP, reading meshes element by element")
+    return _element_arrays(mesh)
+
+
+def _face_arrays(face, location):
+    """Vertices and triangles of one face's triangulation, or None."""
+    from OCP.BRep import BRep_Tool
+    from OCP.TopAbs import TopAbs_REVERSED
+
+    mesh = BRep_Tool.Triangulation_s(face, location)
+    if mesh is None or mesh.NbTriangles() == 0:
+        return None
+
+    vertices, triangles = _triangulation_arrays(mesh)
+    if not location.IsIdentity():
+        matrix = location_matrix(location)
+        vertices = vertices @ matrix[:, :3].T + matrix[:, 3]
+    if face.Orientation() == TopAbs_REVERSED:
+        triangles = triangles[:, ::-1]
+    return vertices, triangles
+
+
+def iter_face_arrays(shape):
+    """Yields (vertices, triangles) per meshed face, every occurrence of shared solids included."""
+    from OCP.TopLoc import TopLoc_Location
+
+    for face in _faces(shape):
+        arrays = _face_arrays(face, TopLoc_Location())
+        if arrays is not None:
+            yield arrays
+
+
+def mesh_arrays(shape):
+    """All faces as one (vertices, triangles) pair."""
+    import numpy as np
+
+    vertices, triangles, offset = [], [], 0
+    for v, t in iter_face_arrays(shape):
+        vertices.append(v)
+        triangles.append(t + offset)
+        offset += len(v)
+    if not vertices:
+        return np.zeros((0, 3)), np.zeros((0, 3), np.int64)
+    return np.concatenate(vertices), np.concatenate(triangles)
+
+
+def weld(vertices, triangles, tolerance=1e-6):
+    """Merges vertices closer than tolerance (on a grid) and drops triangles that collapse."""
+    import numpy as np
+
+    keys = np.round(vertices / tolerance).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1)[triangles]
+    keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])
+    return vertices[first], triangles[keep]
+
+
+def face_normals(vertices, triangles):
+    """Unit normals (M, 3) from the winding; zero for degenerate triangles."""
+    import numpy as np
+
+    v = vertices[triangles]
+    normals = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def mesh_volume(shape):
+    """Volume (mm^3) enclosed by a tessellated shape: sum of the signed tetrahedra origin-triangle.
+
+    None if the mesh isn't closed (a face without triangulation, say): the sum
+    would then depend on where the origin is.
+    """
+    return arrays_volume(*mesh_arrays(shape))
+
+
+def arrays_volume(vertices, triangles):
+    """mesh_volume() of a (vertices, triangles) pair."""
+    import numpy as np
+
+    vertices, triangles = weld(vertices, triangles, tolerance=1e-4)
+    edges = np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    if len(triangles) == 0 or (counts % 2).any():
+        return None # Open edges
+    v = vertices[triangles]
+    return float(np.einsum("ij,ij->i", v[:, 0], np.cross(v[:, 1], v[:, 2])).sum() / 6)
+
+
+# --- Binary STL ---
+# 80 byte header, uint32 triangle count, then 50 bytes per triangle: normal
+# and three vertices as float32, plus an unused uint16.
+
+STL_DTYPE = [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")]
+STL_CHUNK = 1 << 18 # Triangles per write
+
+
+def _stl_records(vertices, triangles, normals):
+    import numpy as np
+
+    records = np.zeros(len(triangles), STL_DTYPE)
+    records["vertices"] = vertices[triangles]
+    if normals:
+        records["normal"] = face_normals(vertices, triangles)
+    return records
+
+
+def canonical_mesh(vertices, triangles):
+    """The mesh in a canonical order: (corners, triangles) with each triangle's own three corners.
+
+    Corners are rounded to float32 (what STL stores), each triangle starts at
+    its smallest corner (winding kept) and the triangles are sorted, so the
+    same triangles in any order give the same file.
+    """
+    import numpy as np
+
+    corners = vertices[triangles].astype(np.float32) + np.float32(0) # (M, 3, 3), -0.0 becomes 0.0
+    flat = corners.reshape(-1, 3)
+    rank = np.empty(len(flat), np.int64)
+    rank[np.lexsort(flat.T[::-1])] = np.arange(len(flat)) # x first, then y, then z
+    first = rank.reshape(-1, 3).argmin(axis=1)
+    corners = np.take_along_axis(corners, ((first[:, None] + np.arange(3)) % 3)[:, :, None], axis=1)
+    corners = corners[np.lexsort(corners.reshape(-1, 9).T[::-1])]
+    return corners.reshape(-1, 3).astype(np.float64), np.arange(3 * len(corners)).reshape(-1, 3)
+
+
+def write_stl_arrays(vertices, triangles, path, weld_tolerance=None, normals=True, canonical=False):
+    """Writes a (vertices, triangles) mesh as binary STL, STL_CHUNK triangles at a time. Returns the triangle count.
+
+    canonical=True writes the triangles in canonical_mesh() order.
+    """
+    import struct
+
+    if weld_tolerance:
+        vertices, triangles = weld(vertices, triangles, weld_tolerance)
+    if canonical:
+        vertices, triangles = canonical_mesh(vertices, triangles)
+    with open(path, "wb") as f:
+        f.write(b"rack binary STL".ljust(80, b"\0"))
+        f.write(struct.pack("<I", len(triangles)))
+        for i in range(0, len(triangles), STL_CHUNK):
+            f.write(_stl_records(vertices, triangles[i:i + STL_CHUNK], normals).tobytes())
+    return len(triangles)
+
+
+def write_stl(shape, path, weld_tolerance=None, normals=True, canonical=False):
+    """Writes the (already tessellated) shape as binary STL.
+
+    Faces are streamed in chunks of STL_CHUNK triangles, so memory stays flat
+    however big the shape. weld_tolerance merges nearby vertices first and
+    canonical=True sorts the triangles, both need the whole mesh at once.
+    normals=False leaves facet normals zero (slicers recompute them anyway).
+    Returns the triangle count.
+    """
+    import struct
+
+    if weld_tolerance or canonical:
+        return write_stl_arrays(*mesh_arrays(shape), path, weld_tolerance, normals, canonical)
+    with open(path, "wb") as f:
+        f.write(b"rack binary STL".ljust(80, b"\0"))
+        f.write(struct.pack("<I", 0)) # Patched below
+
+        count, pending, size = 0, [], 0
+        for arrays in iter_face_arrays(shape):
+            pending.append(arrays)
+            size += len(arrays[1])
+            if size >= STL_CHUNK:
+                f.write(_flush(pending, normals))
+                count, pending, size = count + size, [], 0
+        if pending:
+            f.write(_flush(pending, normals))
+            count += size
+
+        f.seek(80)
+        f.write(struct.pack("<I", count))
+    return count
+
+
+def _flush(faces, normals):
+    import numpy as np
+
+    offsets = np.cumsum([0] + [len(v) for v, _ in faces[:-1]])
+    vertices = np.concatenate([v for v, _ in faces])
+    triangles = np.concatenate([t + offset for (_, t), offset in zip(faces, offsets)])
+    return _stl_records(vertices, triangles, normals).tobytes()
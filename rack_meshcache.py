@@ -0,0 +1,249 @@
+# ==============================================================================
+# Tessellation Cache
+# Meshes each solid once per profile and keeps the mesh as NumPy arrays.
+# ==============================================================================
+#
+# Usage:
+#
+#     vertices, triangles, stats = shape_mesh(parts["combined"], "print")
+#     prime(shape)                          # before show(): cached meshes back on the faces
+#
+# Entries are per solid prototype, the solid at the origin: instances and
+# compounds reusing a part's solids (rack_v3's "combined" holds the box and
+# text solids) share one entry. The key is the solid's geometry digest
+# (rack_manifest, so a BREP round trip through the part cache still hits),
+# the profile's settings and the library versions. An entry holds
+#
+#     vertices        (N, 3) float64 in the prototype's frame
+#     triangles       (M, 3) int32, per face (indices start at 0 for each face), wound outwards
+#     face_vertices   (F + 1,) offsets of each face's vertices, faces in TopExp order
+#     face_triangles  (F + 1,) offsets of each face's triangles
+#     deflections     (F,) each face's Poly_Triangulation deflection
+#     max_deviation   rack_mesh.mesh_stats of the fresh mesh
+#
+# in memory, and as <key>.npz in the mesh/ folder of the part cache.
+#
+# shape_mesh() places the entry of every solid occurrence (and of faces
+# outside solids) and concatenates them: the STL writer and the print
+# estimate in rack_export work on that, so an STL of a part, another STL of
+# a compound reusing it and the next run all skip BRepMesh.
+#
+# prime() writes the cached triangulations back onto faces that have none.
+# The viewer's BRepMesh then finds them already meshed (it keeps a face's
+# triangulation if its deflection is at least as fine as asked for), so a
+# show() after an export, a cache hit or a watch rebuild of an unchanged
+# solid doesn't mesh again.
+#
+# Environment:
+#   RACK_MESH_CACHE=0            memory only, no .npz files (also off with RACK_CACHE=0)
+#   RACK_MESH_CACHE_MAX_MB=256   size limit of the .npz files (least recently used go first)
+#   RACK_VIEW_PROFILE=preview    mesh profile prime() uses for the viewer
+
+import glob
+import hashlib
+import json
+import os
+
+import rack_cache
+from rack_manifest import _brep_digest
+from rack_mesh import _face_arrays, _faces, clear_mesh, location_matrix, mesh_stats, profile_settings, tessellate
+
+ENABLED = rack_cache.ENABLED and os.environ.get("RACK_MESH_CACHE", "1") != "0"
+MESH_DIR = os.path.join(rack_cache.CACHE_DIR, "mesh")
+MAX_BYTES = int(os.environ.get("RACK_MESH_CACHE_MAX_MB", "256")) * 1024 * 1024
+VIEW_PROFILE = os.environ.get("RACK_VIEW_PROFILE", "preview")
+
+_entries = {} # key -> entry
+_digests = {} # prototype -> geometry digest (the prototype is kept alive, so it can't be confused with a new one)
+MAX_MEMORY = 256 # Entries (and digests) kept in memory, oldest dropped first (watch mode keeps making new solids)
+counts = {"meshed": 0, "memory": 0, "disk": 0} # Where entries came from, for reports
+
+
+# --- Entries ---
+
+def _items(shape):
+    """(prototype, location) of every solid occurrence of shape, then of every face outside a solid."""
+    from OCP.TopAbs import TopAbs_FACE, TopAbs_SOLID
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from build123d import Shape
+
+    for explorer in (TopExp_Explorer(shape.wrapped, TopAbs_SOLID), TopExp_Explorer(shape.wrapped, TopAbs_FACE, TopAbs_SOLID)):
+        while explorer.More():
+            occurrence = explorer.Current()
+            yield Shape.cast(occurrence.Located(TopLoc_Location())), occurrence.Location()
+            explorer.Next()
+
+
+def entry_key(prototype, profile):
+    if prototype not in _digests:
+        _digests[prototype] = _brep_digest(prototype)
+        _trim(_digests)
+    payload = json.dumps({
+        "geometry": _digests[prototype],
+        "settings": profile_settings(profile),
+        "versions": rack_cache.library_versions(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _mesh(prototype, profile):
+    """A fresh entry: BRepMesh on the prototype, pulled out of its faces."""
+    import numpy as np
+    from OCP.BRep import BRep_Tool
+    from OCP.TopLoc import TopLoc_Location
+
+    clear_mesh(prototype) # May hold another profile's mesh
+    tessellate(prototype, profile)
+    vertices, triangles, face_vertices, face_triangles, deflections = [], [], [0], [0], []
+    for face in _faces(prototype):
+        arrays = _face_arrays(face, TopLoc_Location())
+        v, t = arrays if arrays is not None else (np.zeros((0, 3)), np.zeros((0, 3), np.int64))
+        vertices.append(v)
+        triangles.append(t)
+        face_vertices.append(face_vertices[-1] + len(v))
+        face_triangles.append(face_triangles[-1] + len(t))
+        mesh = BRep_Tool.Triangulation_s(face, TopLoc_Location())
+        deflections.append(mesh.Deflection() if mesh is not None else 0.0)
+    return {
+        "vertices": np.concatenate(vertices) if vertices else np.zeros((0, 3)),
+        "triangles": (np.concatenate(triangles) if triangles else np.zeros((0, 3))).astype(np.int32),
+        "face_vertices": np.array(face_vertices, np.int64),
+        "face_triangles": np.array(face_triangles, np.int64),
+        "deflections": np.array(deflections),
+        "max_deviation": np.float64(mesh_stats(prototype)["max_deviation"]),
+    }
+
+
+def _path(key):
+    return os.path.join(MESH_DIR, f"{key}.npz")
+
+
+def _load(key):
+    import numpy as np
+
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            entry = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        os.remove(path) # Half-written or corrupt: mesh again
+        return None
+    os.utime(path)
+    return entry
+
+
+def _store(key, entry):
+    import numpy as np
+
+    os.makedirs(MESH_DIR, exist_ok=True)
+    temporary = _path(key) + ".tmp"
+    with open(temporary, "wb") as f:
+        np.savez(f, **entry)
+    os.replace(temporary, _path(key)) # Readers never see a partial file
+    evict()
+
+
+def evict(max_bytes=MAX_BYTES):
+    """Removes least recently used .npz files until the mesh cache fits max_bytes."""
+    paths = sorted(glob.glob(os.path.join(MESH_DIR, "*.npz")), key=os.path.getmtime, reverse=True)
+    total = 0
+    for path in paths:
+        total += os.path.getsize(path)
+        if total > max_bytes:
+            os.remove(path)
+
+
+def solid_mesh(prototype, profile):
+    """The entry of one prototype, from memory, disk or BRepMesh."""
+    key = entry_key(prototype, profile)
+    entry = _entries.get(key)
+    if entry is not None:
+        counts["memory"] += 1
+        return entry
+    entry = _load(key) if ENABLED else None
+    if entry is not None:
+        counts["disk"] += 1
+    else:
+        entry = _mesh(prototype, profile)
+        counts["meshed"] += 1
+        if ENABLED:
+            _store(key, entry)
+    _entries[key] = entry
+    _trim(_entries)
+    return entry
+
+
+def _trim(table):
+    while len(table) > MAX_MEMORY:
+        del table[next(iter(table))]
+
+
+# --- Meshes ---
+
+def shape_mesh(shape, profile):
+    """(vertices, triangles, {"triangles", "max_deviation"}) of a whole shape, every placement included."""
+    import numpy as np
+
+    vertices, triangles, offset, deviation = [], [], 0, 0.0
+    for prototype, location in _items(shape):
+        entry = solid_mesh(prototype, profile)
+        v = entry["vertices"]
+        if not location.IsIdentity():
+            matrix = location_matrix(location)
+            v = v @ matrix[:, :3].T + matrix[:, 3]
+        starts = np.repeat(entry["face_vertices"][:-1], np.diff(entry["face_triangles"]))
+        vertices.append(v)
+        triangles.append(entry["triangles"] + (starts + offset)[:, None])
+        offset += len(v)
+        deviation = max(deviation, float(entry["max_deviation"]))
+    if not vertices:
+        return np.zeros((0, 3)), np.zeros((0, 3), np.int64), {"triangles": 0, "max_deviation": 0.0}
+    triangles = np.concatenate(triangles)
+    return np.concatenate(vertices), triangles, {"triangles": len(triangles), "max_deviation": deviation}
+
+
+def prime(shape, profile=VIEW_PROFILE):
+    """Puts cached triangulations on the faces of shape that have none (for the viewer)."""
+    import numpy as np
+    from OCP.BRep import BRep_Builder, BRep_Tool
+    from OCP.Poly import Poly_Triangle, Poly_Triangulation
+    from OCP.TopAbs import TopAbs_REVERSED
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.gp import gp_Pnt
+
+    builder, done = BRep_Builder(), set()
+    for prototype, _ in _items(shape):
+        if prototype in done:
+            continue
+        done.add(prototype)
+        faces = list(_faces(prototype))
+        if all(BRep_Tool.Triangulation_s(face, TopLoc_Location()) is not None for face in faces):
+            continue # Meshed already, by an export say
+        entry = solid_mesh(prototype, profile) # Meshing it here leaves the triangulations on the faces
+        for i, face in enumerate(faces):
+            first, last = entry["face_triangles"][i:i + 2]
+            if BRep_Tool.Triangulation_s(face, TopLoc_Location()) is not None or first == last:
+                continue
+            v = entry["vertices"][entry["face_vertices"][i]:entry["face_vertices"][i + 1]]
+            t = entry["triangles"][first:last]
+            if not face.Location().IsIdentity(): # Nodes are stored in the prototype's frame
+                matrix = location_matrix(face.Location().Inverted())
+                v = v @ matrix[:, :3].T + matrix[:, 3]
+            if face.Orientation() == TopAbs_REVERSED:
+                t = t[:, ::-1] # Stored wound outwards, the triangulation follows the surface
+            mesh = Poly_Triangulation(len(v), len(t), False)
+            for j, point in enumerate(v.tolist(), 1):
+                mesh.SetNode(j, gp_Pnt(*point))
+            for j, (a, b, c) in enumerate((t + 1).tolist(), 1):
+                mesh.SetTriangle(j, Poly_Triangle(a, b, c))
+            mesh.Deflection(float(entry["deflections"][i]))
+            builder.UpdateFace(face, mesh)
+
+
+def prime_view(objects, profile=VIEW_PROFILE):
+    """prime() for every shape of a view_objects() list."""
+    for _, shape, _, _ in objects:
+        prime(shape, profile)
@@ -0,0 +1,297 @@
+# ==============================================================================
+# Component Packer
+# Searches component positions that fit a design's boards in the smallest box.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py pack v3                            # smallest box found, checked like `rack.py layout`
+#     python rack.py pack v3 --gap 3 --params packed.json
+#     python rack.py build v3 --params packed.json      # make_box with the packed positions
+#     python rack.py layout v3 --params packed.json     # and its top view
+#
+# A design lists what the packer may move:
+#
+#     PACKING = {
+#         "box": ("box_inner_w", "box_inner_d"),    # parameters of the inner box size
+#         "gap": gap, "wall_gap": padding,          # mm between components / to the walls
+#         "components": {
+#             "DC-DC": {"x": "dcdc_x", "y": "dcdc_y", "wall": "back"},
+#             "USB-C": {"x": "usbc_x", "y": "usbc_y", "wall": "back", "wall_gap": 0},
+#         },
+#     }
+#
+# A component is the group of the same name in the design's layout()
+# (rack_layout.py): board, parts on it, standoffs, keep-outs and cutouts,
+# relative to its (x, y) parameters. With a "wall" (the one its connectors
+# face) it is pinned to that wall at its wall_gap and slides along it,
+# without one it moves freely. Cutouts move along their wall with the
+# component and stay on the wall.
+#
+# For a given box size the components go in one at a time, each at the
+# first candidate position from the bottom left: the walls and the edges of
+# what is placed already plus the gap (the corner points of rectangle
+# packing). A candidate fits when its items keep the gap to the items of
+# other components they share a height with (keep-outs and cutouts must
+# only not overlap), stay wall_gap inside the walls (keep-outs inside) and
+# its cutouts stay within their wall. So a board can slide under a socket
+# that sits higher up. Every order is tried until one fits.
+#
+# Box widths go up in --step increments. For each width the smallest depth
+# that fits is bisected, and widths that can't beat the best area are
+# skipped. The winner is checked with the real layout() and its overrides
+# (rack_layout.run), the same as `rack.py layout` does. Orientations stay
+# as the design has them: the connector walls fix them.
+
+import math
+import time
+
+from rack_layout import WALLS, _z_overlap, extent, gap, layout_namespace, problems, run
+
+FREE_KINDS = ("cutout", "keepout") # Items that only must not overlap (no gap)
+
+
+# --- Components ---
+
+def _moved(item, dx, dy):
+    moved = dict(item)
+    if item["shape"] == "circle":
+        moved["cx"], moved["cy"] = item["cx"] + dx, item["cy"] + dy
+    else:
+        moved["x"], moved["y"] = item["x"] + dx, item["y"] + dy
+    return moved
+
+
+def _wall_position(box, wall):
+    x_min, y_min, x_max, y_max = box
+    return {"front": y_min, "back": y_max, "left": x_min, "right": x_max}[wall]
+
+
+def components(namespace, wall_gap):
+    """The design's PACKING components, each with its layout items relative to its (x, y) parameters."""
+    packing = namespace["PACKING"]
+    items = namespace["layout"]()
+    bounds = next(item for item in items if item["kind"] == "bounds")
+    box = extent(bounds)
+    found = []
+    for name, spec in packing["components"].items():
+        wall = spec.get("wall")
+        if wall is not None and wall not in WALLS:
+            raise ValueError(f"PACKING component {name!r}: unknown wall {wall!r} (choose from {', '.join(WALLS)})")
+        group = [item for item in items if item["group"] == name and item is not bounds]
+        if not group:
+            raise ValueError(f"PACKING component {name!r} has no items in layout()")
+        ax, ay = namespace[spec["x"]], namespace[spec["y"]]
+        parts, cutouts = [], []
+        for item in group:
+            if item["kind"] == "cutout":
+                # Along its wall relative to the component, across it relative to the wall
+                across = _wall_position(box, item["wall"])
+                dx, dy = (-ax, -across) if item["wall"] in ("front", "back") else (-across, -ay)
+                cutouts.append(_moved(item, dx, dy))
+            else:
+                parts.append(_moved(item, -ax, -ay))
+        comp = {
+            "name": name, "x": spec["x"], "y": spec["y"], "wall": wall,
+            "wall_gap": spec.get("wall_gap", wall_gap), "items": parts, "cutouts": cutouts,
+        }
+        comp["limits"] = (_limits(comp, 0), _limits(comp, 1))
+        comp["boxes"] = [(extent(item), item) for item in parts]
+        comp["cutout_boxes"] = [(extent(item), item) for item in cutouts]
+        comp["footprint"] = _footprint([b for b, _ in comp["boxes"]])
+        found.append(comp)
+    return found, box
+
+
+def _limits(comp, axis):
+    """(low, high) room the component needs on an axis: placed at p, it spans the walls at p - low .. p + high."""
+    low = high = -math.inf
+    for item in comp["items"]:
+        x_min, y_min, x_max, y_max = extent(item)
+        need = 0 if item["kind"] == "keepout" else comp["wall_gap"]
+        start, end = (x_min, x_max) if axis == 0 else (y_min, y_max)
+        low, high = max(low, need - start), max(high, end + need)
+    for item in comp["cutouts"]:
+        if (item["wall"] in ("front", "back")) == (axis == 0): # Its wall runs along this axis
+            x_min, y_min, x_max, y_max = extent(item)
+            start, end = (x_min, x_max) if axis == 0 else (y_min, y_max)
+            low, high = max(low, -start), max(high, end)
+    return low, high
+
+
+def _footprint(boxes):
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def _box_gap(a, b):
+    """Distance between two (x_min, y_min, x_max, y_max) boxes, negative when they overlap."""
+    dx = max(b[0] - a[2], a[0] - b[2])
+    dy = max(b[1] - a[3], a[1] - b[3])
+    return max(dx, dy) if dx < 0 and dy < 0 else math.hypot(max(dx, 0), max(dy, 0))
+
+
+# --- Placement ---
+
+def _candidates(comp, placed, box, gap_mm):
+    """Anchor positions to try, bottom-left first."""
+    x_min, y_min, x_max, y_max = box
+    (x_low, x_high), (y_low, y_high) = comp["limits"]
+    x_lo, x_hi, y_lo, y_hi = x_min + x_low, x_max - x_high, y_min + y_low, y_max - y_high
+    if x_lo > x_hi + 1e-9 or y_lo > y_hi + 1e-9:
+        return []
+    fx_min, fy_min, fx_max, fy_max = comp["footprint"]
+    xs, ys = {x_lo, x_hi}, {y_lo, y_hi}
+    for _, boxes in placed:
+        for (px_min, py_min, px_max, py_max), item, _ in boxes:
+            if item["kind"] != "cutout":
+                xs.update((px_max + gap_mm - fx_min, px_min - gap_mm - fx_max))
+                ys.update((py_max + gap_mm - fy_min, py_min - gap_mm - fy_max))
+    pinned = {"left": ("x", x_lo), "right": ("x", x_hi), "front": ("y", y_lo), "back": ("y", y_hi)}.get(comp["wall"])
+    if pinned and pinned[0] == "x":
+        xs = {pinned[1]}
+    elif pinned:
+        ys = {pinned[1]}
+    xs = sorted(x for x in xs if x_lo - 1e-9 <= x <= x_hi + 1e-9)
+    ys = sorted(y for y in ys if y_lo - 1e-9 <= y <= y_hi + 1e-9)
+    return [(x, y) for y in ys for x in xs]
+
+
+def _clear(a, b, gap_mm):
+    """Whether two placed (box, item, offset) of different components keep their distance."""
+    (a_box, a, a_offset), (b_box, b, b_offset) = a, b
+    if not _z_overlap(a, b):
+        return True
+    need = 0 if a["kind"] in FREE_KINDS or b["kind"] in FREE_KINDS else gap_mm
+    if _box_gap(a_box, b_box) >= need - 1e-9: # Bounding boxes far enough apart (never closer than the items)
+        return True
+    return gap(_moved(a, *a_offset), _moved(b, *b_offset)) >= need - 1e-9
+
+
+def _place_one(comp, placed, box, gap_mm):
+    """(position, (footprint, boxes)) of comp at its first free candidate next to placed, or None."""
+    for x, y in _candidates(comp, placed, box, gap_mm):
+        # Items stay relative (moved only for an exact gap), with their boxes placed
+        boxes = [((b[0] + x, b[1] + y, b[2] + x, b[3] + y), item, (x, y)) for b, item in comp["boxes"]]
+        for b, item in comp["cutout_boxes"]:
+            across = _wall_position(box, item["wall"])
+            dx, dy = (x, across) if item["wall"] in ("front", "back") else (across, y)
+            boxes.append(((b[0] + dx, b[1] + dy, b[2] + dx, b[3] + dy), item, (dx, dy)))
+        footprint = _footprint([b for b, _, _ in boxes])
+        if all(
+            _box_gap(footprint, other) >= gap_mm - 1e-9 or all(_clear(a, b, gap_mm) for a in boxes for b in other_boxes)
+            for other, other_boxes in placed
+        ):
+            return (x, y), (footprint, boxes)
+    return None
+
+
+def fits(comps, origin, size, gap_mm):
+    """{name: (x, y)} of comps placed in a box of size at origin, or None.
+
+    Orders are searched as a tree, so orders sharing a start share its
+    placements. A component that doesn't fit next to the ones placed so far
+    ends the branch: it won't fit after more of them either.
+    """
+    box = (origin[0], origin[1], origin[0] + size[0], origin[1] + size[1])
+
+    def search(placed, positions, remaining):
+        if not remaining:
+            return positions
+        spots = [_place_one(comp, placed, box, gap_mm) for comp in remaining]
+        if any(spot is None for spot in spots):
+            return None
+        for i, (comp, (position, entry)) in enumerate(zip(remaining, spots)):
+            found = search(placed + [entry], dict(positions, **{comp["name"]: position}), remaining[:i] + remaining[i + 1:])
+            if found is not None:
+                return found
+        return None
+
+    return search([], {}, list(comps))
+
+
+# --- Search ---
+
+def pack(module_name, overrides=None, gap_mm=None, wall_gap=None, step=1.0):
+    """Smallest box (in step increments) the design's PACKING components fit in: sizes, positions, overrides, check."""
+    start = time.perf_counter()
+    namespace, _ = layout_namespace(module_name, overrides)
+    if "PACKING" not in namespace:
+        raise ValueError(f"{module_name} has no PACKING table")
+    packing = namespace["PACKING"]
+    gap_mm = packing["gap"] if gap_mm is None else gap_mm
+    wall_gap = packing["wall_gap"] if wall_gap is None else wall_gap
+    comps, box = components(namespace, wall_gap)
+    origin = box[:2]
+    w_param, d_param = packing["box"]
+    current = (namespace[w_param], namespace[d_param])
+
+    # Each component alone fixes the smallest size, all of them in a row the largest needed
+    sizes = []
+    for axis in (0, 1):
+        needs = [sum(comp["limits"][axis]) for comp in comps]
+        low = math.ceil(max(needs) / step - 1e-9) * step
+        high = math.ceil((sum(needs) + gap_mm * len(comps)) / step) * step
+        sizes.append((low, max(high, low)))
+    (w_min, w_max), (d_min, d_max) = sizes
+    depths = [d_min + i * step for i in range(int(round((d_max - d_min) / step)) + 1)]
+
+    best, evaluated = None, 0
+    width = w_min
+    while width <= w_max + 1e-9:
+        if best is not None and width * d_min >= best["area"] - 1e-9:
+            break # Wider boxes can't be smaller
+        evaluated += 1
+        if fits(comps, origin, (width, depths[-1]), gap_mm) is not None:
+            low, high = 0, len(depths) - 1 # depths[high] fits
+            while low < high:
+                middle = (low + high) // 2
+                evaluated += 1
+                if fits(comps, origin, (width, depths[middle]), gap_mm) is not None:
+                    high = middle
+                else:
+                    low = middle + 1
+            depth = depths[high]
+            if best is None or width * depth < best["area"] - 1e-9:
+                positions = fits(comps, origin, (width, depth), gap_mm)
+                best = {"size": (width, depth), "area": width * depth, "positions": positions}
+        width += step
+    if best is None:
+        raise ValueError(f"{module_name}: the components don't fit any box up to {w_max:g} x {d_max:g} mm")
+
+    found = {w_param: round(best["size"][0], 3), d_param: round(best["size"][1], 3)}
+    for comp in comps:
+        x, y = best["positions"][comp["name"]]
+        found[comp["x"]], found[comp["y"]] = round(x, 3), round(y, 3)
+    check = run(module_name, dict(overrides or {}, **found))
+    return {
+        "design": module_name, "components": comps, "gap": gap_mm, "wall_gap": wall_gap,
+        "current": {"size": current, "area": current[0] * current[1], "problems": problems(run(module_name, overrides))},
+        "best": best, "overrides": found, "check": check, "evaluated": evaluated, "time": time.perf_counter() - start,
+    }
+
+
+def print_result(result):
+    """Current box vs. the packed one, the new positions and the layout check of the winner."""
+    current, best = result["current"], result["best"]
+    print(
+        f"Packing {result['design']}: {len(result['components'])} components, "
+        f"gap {result['gap']:g} mm, walls {result['wall_gap']:g} mm"
+    )
+    print(
+        f"  current  {current['size'][0]:g} x {current['size'][1]:g} mm  {current['area']:8.0f} mm^2  "
+        f"{len(current['problems'])} layout problem(s)"
+    )
+    print(
+        f"  packed   {best['size'][0]:g} x {best['size'][1]:g} mm  {best['area']:8.0f} mm^2  "
+        f"({(best['area'] / current['area'] - 1) * 100:+.1f}%), {result['evaluated']} box sizes in {result['time']:.2f}s"
+    )
+    for comp in result["components"]:
+        x, y = result["overrides"][comp["x"]], result["overrides"][comp["y"]]
+        print(f"  {comp['name']:<8} {comp['x']} = {x:g}, {comp['y']} = {y:g}" + (f"  ({comp['wall']} wall)" if comp["wall"] else ""))
+    check = result["check"]
+    found = problems(check)
+    smallest = check["gaps"][0]["gap"] if check["gaps"] else None
+    print(
+        f"Layout check: {len(found)} problem(s)" if found else
+        f"Layout check: no overlaps, smallest gap {smallest:.3f} mm" if smallest is not None else "Layout check: no overlaps"
+    )
@@ -0,0 +1,126 @@
+# ==============================================================================
+# Parallel Part Builds
+# Runs independent generators in a process pool and ships the results back
+# as serialized BREP (colors and labels included).
+# ==============================================================================
+#
+# Usage:
+#
+#     parts = build_parts("rack_v106", {
+#         "tray": ("make_tray",),
+#         "dcdc_board": ("make_dcdc_board", "dcdc_loc"), # Arguments are module globals
+#     })
+#
+# Workers import the generator module by name, so it must not build anything
+# at import time (keep the build behind `if __name__ == "__main__":`).
+#
+# Environment:
+#   RACK_JOBS=n    worker count (default: CPU count, 1 = build in-process)
+
+import concurrent.futures
+import importlib
+import os
+import time
+
+from rack_cache import brep_bytes, from_brep_bytes
+
+
+# --- Serialization ---
+
+def pack(shape):
+    """Converts a shape into picklable BREP data, keeping its compound tree, labels and colors.
+
+    All leaves go into one BREP compound, so leaves sharing geometry
+    (rack_instance) stay shared after unpack.
+    """
+    from build123d import Compound
+    from OCP.BRep import BRep_Builder
+    from OCP.TopoDS import TopoDS_Compound
+
+    leaves = []
+    node = _pack_tree(shape, leaves)
+    compound, builder = TopoDS_Compound(), BRep_Builder()
+    builder.MakeCompound(compound)
+    for leaf in leaves:
+        builder.Add(compound, leaf.wrapped)
+    node["brep"] = brep_bytes(Compound(compound))
+    return node
+
+
+def _pack_tree(shape, leaves):
+    node = {
+        "label": shape.label,
+        "color": tuple(shape.color) if shape.color is not None else None,
+    }
+    children = list(getattr(shape, "children", ()))
+    if children:
+        node["children"] = [_pack_tree(child, leaves) for child in children]
+    else:
+        node["leaf"] = len(leaves)
+        leaves.append(shape)
+    return node
+
+
+def unpack(node):
+    from build123d import Shape
+    from OCP.TopoDS import TopoDS_Iterator
+
+    leaves, compound = [], from_brep_bytes(node["brep"]) # Keep a reference while iterating
+    iterator = TopoDS_Iterator(compound.wrapped)
+    while iterator.More():
+        leaves.append(Shape.cast(iterator.Value()))
+        iterator.Next()
+    return _unpack_tree(node, leaves)
+
+
+def _unpack_tree(node, leaves):
+    from build123d import Color, Compound
+
+    if "children" in node:
+        shape = Compound(children=[_unpack_tree(child, leaves) for child in node["children"]])
+    else:
+        shape = leaves[node["leaf"]]
+    shape.label = node["label"]
+    if node["color"] is not None:
+        shape.color = Color(*node["color"])
+    return shape
+
+
+# --- Workers ---
+
+def _build(module_name, func_name, arg_names, packed=True):
+    """(shape, seconds) for one generator call, the shape packed for the trip back from a worker."""
+    module = importlib.import_module(module_name)
+    args = [getattr(module, name) for name in arg_names]
+    start = time.perf_counter()
+    shape = getattr(module, func_name)(*args)
+    return pack(shape) if packed else shape, time.perf_counter() - start
+
+
+def build_parts(module_name, jobs, max_workers=None):
+    """Builds {name: (generator, *arg_globals)} from module_name in parallel and returns {name: shape}."""
+    if max_workers is None:
+        max_workers = int(os.environ.get("RACK_JOBS", "0")) or os.cpu_count() or 1
+    max_workers = min(max_workers, len(jobs))
+
+    start = time.perf_counter()
+    results = {}
+    if max_workers <= 1:
+        # Serial fallback: no pool, and no BREP round trip for shapes that stay in this process
+        for name, (func_name, *arg_names) in jobs.items():
+            results[name] = _build(module_name, func_name, arg_names, packed=False)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                name: pool.submit(_build, module_name, func_name, arg_names)
+                for name, (func_name, *arg_names) in jobs.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    wall = time.perf_counter() - start
+
+    parts = {}
+    for name, (shape, elapsed) in results.items():
+        parts[name] = unpack(shape) if isinstance(shape, dict) else shape
+        print(f"  {name:<12} {elapsed:6.2f}s")
+    print(f"Built {len(parts)} parts in {wall:.2f}s wall ({sum(e for _, e in results.values()):.2f}s total, {max_workers} workers)")
+    return parts
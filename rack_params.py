@@ -0,0 +1,96 @@
+# ==============================================================================
+# Parameter Overrides
+# Loads a generator module with some of its top-level parameters replaced.
+# ==============================================================================
+#
+# Usage:
+#
+#     module = load_variant("rack_v106", {"rack_inner_width": 190, "wall_thickness": 2.0})
+#     parts = module.build(["tray"])
+#
+# Overriding after import would leave derived globals (sh_off_x, lx_left, ...)
+# at their old values, so the module source is run again with every top-level
+# assignment of an overridden name followed by `name = <override>`. Anything
+# computed further down sees the new value, duplicate assignments included.
+#
+# Only names the module assigns at top level can be overridden.
+
+import ast
+import importlib.util
+import sys
+import types
+
+
+def parse_value(text):
+    """Parses a command line value: numbers, strings, tuples, True/False."""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text # Bare word: a string
+
+
+def module_path(module_name):
+    loaded = sys.modules.get(module_name)
+    if getattr(loaded, "__file__", None):
+        return loaded.__file__ # Also covers variants (no __spec__)
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        raise ImportError(f"No module named {module_name!r}")
+    return spec.origin
+
+
+def _assigned_names(node):
+    """Names a top-level statement assigns (plain and tuple targets)."""
+    if isinstance(node, ast.Assign):
+        targets = node.targets
+    elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+        targets = [node.target]
+    else:
+        return []
+    names = []
+    for target in targets:
+        for sub in ast.walk(target):
+            if isinstance(sub, ast.Name):
+                names.append(sub.id)
+    return names
+
+
+def override_body(module_name, tree, overrides):
+    """tree's top-level statements with `name = <override>` after each assignment of an overridden name."""
+    body, assigned = [], set()
+    for node in tree.body:
+        body.append(node)
+        for name in _assigned_names(node):
+            assigned.add(name)
+            if name in overrides:
+                value = ast.parse(repr(overrides[name]), mode="eval").body
+                body.append(ast.copy_location(ast.Assign([ast.Name(name, ast.Store())], value), node))
+    unknown = sorted(set(overrides) - assigned)
+    if unknown:
+        raise ValueError(f"{module_name} has no parameter(s) {', '.join(unknown)}")
+    return body
+
+
+def variant_code(module_name, overrides):
+    """Compiles module_name's source with overrides applied (ValueError for unknown names)."""
+    path = module_path(module_name)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    tree.body = override_body(module_name, tree, overrides)
+    ast.fix_missing_locations(tree)
+    return compile(tree, path, "exec"), path
+
+
+def load_variant(module_name, overrides, register=False):
+    """Runs module_name's source with overrides applied and returns the new module object.
+
+    register=True also puts it in sys.modules (so workers importing the module
+    by name, like rack_parallel.build_parts in-process, get the variant).
+    """
+    code, path = variant_code(module_name, overrides)
+    module = types.ModuleType(module_name)
+    module.__file__ = path
+    if register:
+        sys.modules[module_name] = module
+    exec(code, module.__dict__)
+    return module
@@ -0,0 +1,235 @@
+# ==============================================================================
+# Honeycomb Pattern Engine
+# Clips hex floor cutouts in pure Python before anything reaches OCC.
+# ==============================================================================
+#
+# The floors used to be built as nested sketch booleans:
+#
+#     Floor = Rect - ((HexGrid & SafeZone) - SolidZones)
+#
+# Every hex went through every boolean. Here each cell is classified first:
+#   - outside the safe zone or covered by a solid zone -> dropped
+#   - clear of all solid zones                        -> clipped to the safe zone
+#                                                        analytically, kept as a polygon
+#   - touching a solid zone (leg circle, PCIe island) -> handed to OCC on its own
+#
+# The floor is then one Face (outer rectangle + hole wires) and one extrude.
+#
+# Polygons are lists of (x, y) tuples, counter-clockwise.
+# Rectangles are (x_min, y_min, x_max, y_max).
+# Solid zones ("keep-outs") are ("rect", (x_min, y_min, x_max, y_max)) or ("circle", (cx, cy, r)).
+
+from math import cos, hypot, pi, sin, sqrt
+
+EPS = 1e-9
+
+
+# --- Keep-outs ---
+
+def rect_keepout(x, y, w, d):
+    """Solid rectangle with its min corner at (x, y) (like Rectangle(..., align=MIN))."""
+    return ("rect", (x, y, x + w, y + d))
+
+
+def circle_keepout(cx, cy, r):
+    return ("circle", (cx, cy, r))
+
+
+# --- Cells ---
+
+def hex_centers(radius, x_count, y_count, center=(0, 0)):
+    """Cell centers of HexLocations(radius, x_count, y_count) placed at center (radius = apothem)."""
+    diagonal = 4 * radius / sqrt(3)
+    x_spacing = 3 * diagonal / 4
+    y_spacing = diagonal * sqrt(3) / 2
+
+    # Same ordering and offsets as build123d: even columns first, then odd
+    points = [(x_spacing * i, y_spacing * j + y_spacing / 2) for i in range(0, x_count, 2) for j in range(y_count)]
+    points += [(x_spacing * i, y_spacing * j + y_spacing) for i in range(1, x_count, 2) for j in range(y_count)]
+
+    # Center the bounding box of the centers on `center`
+    min_x = min(p[0] for p in points)
+    min_y = min(p[1] for p in points)
+    size_x = max(p[0] for p in points) - min_x
+    size_y = max(p[1] for p in points) - min_y
+    dx = center[0] - min_x - size_x / 2
+    dy = center[1] - min_y - size_y / 2
+    return [(x + dx, y + dy) for x, y in points]
+
+
+def regular_polygon(center, radius, side_count=6):
+    """Vertices of RegularPolygon(radius, side_count) (radius = circumradius, first vertex on +X)."""
+    cx, cy = center
+    return [(cx + radius * cos(2 * pi * i / side_count), cy + radius * sin(2 * pi * i / side_count)) for i in range(side_count)]
+
+
+def hex_grid(radius, cell_radius, x_count, y_count, center=(0, 0)):
+    """Hexagon cells of HexLocations(radius, ...) + RegularPolygon(cell_radius, 6)."""
+    if cell_radius * cos(pi / 6) >= radius:
+        raise ValueError(f"Hex cells of radius {cell_radius} overlap on a grid of radius {radius}")
+    return [regular_polygon(c, cell_radius) for c in hex_centers(radius, x_count, y_count, center)]
+
+
+# --- Geometry ---
+
+def polygon_area(poly):
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(poly, poly[1:] + poly[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def clip_to_rect(poly, rect):
+    """Sutherland-Hodgman clip of a convex polygon against a rectangle."""
+    x_min, y_min, x_max, y_max = rect
+    # (inside test, intersection) per rectangle edge
+    edges = [
+        (lambda p: p[0] >= x_min, lambda p, q: _at_x(p, q, x_min)),
+        (lambda p: p[0] <= x_max, lambda p, q: _at_x(p, q, x_max)),
+        (lambda p: p[1] >= y_min, lambda p, q: _at_y(p, q, y_min)),
+        (lambda p: p[1] <= y_max, lambda p, q: _at_y(p, q, y_max)),
+    ]
+    out = poly
+    for inside, intersect in edges:
+        if not out:
+            break
+        src, out = out, []
+        prev = src[-1]
+        for cur in src:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(intersect(prev, cur))
+                out.append(cur)
+            elif inside(prev):
+                out.append(intersect(prev, cur))
+            prev = cur
+    # Drop repeated points left by vertices lying on the rectangle
+    return [p for i, p in enumerate(out) if hypot(p[0] - out[i - 1][0], p[1] - out[i - 1][1]) > EPS]
+
+
+def _at_x(p, q, x):
+    t = (x - p[0]) / (q[0] - p[0])
+    return (x, p[1] + t * (q[1] - p[1]))
+
+
+def _at_y(p, q, y):
+    t = (y - p[1]) / (q[1] - p[1])
+    return (p[0] + t * (q[0] - p[0]), y)
+
+
+def _point_in_polygon(pt, poly):
+    # Convex, counter-clockwise
+    x, y = pt
+    for (x1, y1), (x2, y2) in zip(poly, poly[1:] + poly[:1]):
+        if (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1) < 0:
+            return False
+    return True
+
+
+def _segment_distance(pt, a, b):
+    (x, y), (x1, y1), (x2, y2) = pt, a, b
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length2))
+    return hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+
+
+def classify(poly, keepout):
+    """Returns "outside", "inside" or "partial" for a convex polygon against a keep-out."""
+    kind, data = keepout
+    if kind == "rect":
+        x_min, y_min, x_max, y_max = data
+        xs = [p[0] for p in poly]
+        ys = [p[1] for p in poly]
+        if max(xs) <= x_min + EPS or min(xs) >= x_max - EPS or max(ys) <= y_min + EPS or min(ys) >= y_max - EPS:
+            return "outside"
+        if min(xs) >= x_min and max(xs) <= x_max and min(ys) >= y_min and max(ys) <= y_max:
+            return "inside"
+        # Separating axis test on the polygon edges (the rectangle axes were checked above)
+        corners = [(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]
+        for (x1, y1), (x2, y2) in zip(poly, poly[1:] + poly[:1]):
+            nx, ny = y2 - y1, x1 - x2 # Outward normal for a counter-clockwise polygon
+            if all(nx * (cx - x1) + ny * (cy - y1) >= -EPS for cx, cy in corners):
+                return "outside"
+        return "partial"
+
+    cx, cy, r = data
+    if all(hypot(x - cx, y - cy) <= r for x, y in poly):
+        return "inside"
+    if not _point_in_polygon((cx, cy), poly):
+        if min(_segment_distance((cx, cy), a, b) for a, b in zip(poly, poly[1:] + poly[:1])) >= r - EPS:
+            return "outside"
+    return "partial"
+
+
+# --- Clipping ---
+
+def clip_honeycomb(cells, safe, keepouts=()):
+    """Splits cells into (kept polygons, partial cells) and drops the rest.
+
+    Kept polygons are already clipped to the safe rectangle and need no OCC work.
+    Partial cells are (polygon, [touching keep-outs]) pairs that still need a boolean.
+    """
+    kept, partial = [], []
+    for cell in cells:
+        poly = clip_to_rect(cell, safe)
+        if len(poly) < 3 or polygon_area(poly) < EPS:
+            continue # Outside the safe zone
+
+        touching = []
+        for keepout in keepouts:
+            state = classify(poly, keepout)
+            if state == "inside":
+                break # Entirely solid
+            if state == "partial":
+                touching.append(keepout)
+        else:
+            if touching:
+                partial.append((poly, touching))
+            else:
+                kept.append(poly)
+    return kept, partial
+
+
+# --- OCC Faces ---
+# build123d is imported lazily so the engine stays usable without it.
+
+def _polygon_wire(poly):
+    from build123d import Vector, Wire
+    return Wire.make_polygon([Vector(x, y, 0) for x, y in poly], close=True)
+
+
+def keepout_face(keepout):
+    from build123d import Face, Plane, Wire
+    kind, data = keepout
+    if kind == "rect":
+        x_min, y_min, x_max, y_max = data
+        return Face(_polygon_wire([(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]))
+    cx, cy, r = data
+    return Face(Wire.make_circle(r, Plane((cx, cy, 0))))
+
+
+def honeycomb_face(outer, cells, safe, keepouts=()):
+    """Builds outer rectangle minus the clipped honeycomb as a single Face."""
+    from build123d import Compound, Face
+
+    kept, partial = clip_honeycomb(cells, safe, keepouts)
+    holes = [_polygon_wire(poly) for poly in kept]
+
+    # Only cells that touch a solid zone need a boolean, each on its own
+    islands = []
+    for poly, touching in partial:
+        cut = Face(_polygon_wire(poly))
+        for keepout in touching:
+            cut = cut - keepout_face(keepout)
+        for face in cut.faces():
+            if face.inner_wires():
+                islands.append(face) # A solid zone sits fully inside this cell
+            else:
+                holes.append(face.outer_wire())
+
+    x_min, y_min, x_max, y_max = outer
+    floor = Face(_polygon_wire([(x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max)]), holes)
+    if islands:
+        floor = (floor - Compound(islands)).faces()[0]
+    return floor
@@ -0,0 +1,153 @@
+# ==============================================================================
+# Stage Timing & Profiling
+# Named timing blocks inside the generators, collected on demand.
+# ==============================================================================
+#
+# Usage (in a generator):
+#
+#     with stage("tray.floor.hex"):
+#         floor_face = honeycomb_face(...)
+#
+# Outside of recording() and with profiling off a stage costs a couple of
+# global lookups, so the blocks stay in the generators permanently.
+#
+# rack_bench.py records them:
+#
+#     with recording() as records:
+#         make_tray()
+#     # records == [("tray.floor.hex", 0.41), ("tray.floor.extrude", 0.12), ...]
+#
+# Profiling (environment):
+#   RACK_PROFILE=1                       trace every stage
+#   RACK_PROFILE=tray.*,box.walls.*      trace matching stages only (fnmatch patterns)
+#   RACK_PROFILE_FILE=rack_trace.json    output file
+#
+# A traced stage records wall time, the peak RSS growth during the block and
+# the face/edge/solid count of the active builder's object when it ends.
+# The output is Chrome trace JSON (chrome://tracing, https://ui.perfetto.dev):
+# one slice per stage, nested like the code, plus a "topology" counter track
+# showing how the part grows as features are added.
+#
+# Events are appended to the file whenever an outermost traced stage ends
+# and then dropped, so a long `rack watch` session neither slows down nor
+# grows in memory. The file uses Chrome's JSON array format, which may stay
+# unterminated ("[" and one event per line). Pool workers (rack_parallel)
+# write rack_trace-<pid>.json; use RACK_JOBS=1 for one file.
+
+import fnmatch
+import json
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# --- Settings ---
+_profile = os.environ.get("RACK_PROFILE", "")
+PATTERNS = ["*"] if _profile in ("1", "all") else [p for p in _profile.split(",") if p and p != "0"]
+PROFILE_FILE = os.environ.get("RACK_PROFILE_FILE", "rack_trace.json")
+
+# (name, seconds) list of the active recording, None when not recording
+_records = None
+
+# Chrome trace events not written yet, the nesting depth of traced stages
+# and the file this process started (a forked worker starts its own)
+_events = []
+_depth = 0
+_started = None
+_T0 = time.perf_counter()
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as stage `name` (recorded and/or traced)."""
+    global _depth
+    traced = bool(PATTERNS) and any(fnmatch.fnmatchcase(name, p) for p in PATTERNS)
+    if _records is None and not traced:
+        yield
+        return
+
+    records = _records
+    if traced:
+        _depth += 1
+        rss = _peak_rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if records is not None:
+            records.append((name, elapsed))
+        if traced:
+            _depth -= 1
+            _trace(name, start, elapsed, _peak_rss() - rss)
+            if _depth == 0:
+                write_trace()
+
+
+@contextmanager
+def recording():
+    """Collects the stages run inside the block into a list of (name, seconds)."""
+    global _records
+    previous, _records = _records, []
+    try:
+        yield _records
+    finally:
+        _records = previous
+
+
+# --- Tracing ---
+
+def _peak_rss():
+    """Peak resident set size of this process in kB (0 where unavailable)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS reports bytes
+
+
+def _topology():
+    """Face/edge/solid count of the object of the innermost active builder."""
+    if "build123d" not in sys.modules:
+        return None
+    from build123d.build_common import Builder
+
+    builder = Builder._get_context(log=False)
+    shape = getattr(builder, "_obj", None)
+    if shape is None:
+        return None
+    return {"faces": len(shape.faces()), "edges": len(shape.edges()), "solids": len(shape.solids())}
+
+
+def _trace(name, start, elapsed, rss_delta):
+    pid, ts = os.getpid(), (start - _T0) * 1e6
+    args = {"rss_delta_kb": rss_delta}
+    topology = _topology()
+    if topology:
+        args.update(topology)
+        _events.append({"name": "topology", "ph": "C", "pid": pid, "tid": 0, "ts": ts + elapsed * 1e6, "args": topology})
+    _events.append({"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": 0, "ts": ts, "dur": elapsed * 1e6, "args": args})
+
+
+def trace_path():
+    if multiprocessing.parent_process() is None:
+        return PROFILE_FILE
+    base, ext = os.path.splitext(PROFILE_FILE)
+    return f"{base}-{os.getpid()}{ext}"
+
+
+def write_trace():
+    """Appends the traced stages since the last call to the trace file."""
+    global _started
+    path = trace_path()
+    with open(path, "a" if _started == path else "w") as f:
+        if _started != path:
+            f.write("[\n")
+        f.writelines(json.dumps(event) + ",\n" for event in _events)
+    _events.clear()
+    _started = path
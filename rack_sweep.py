@@ -0,0 +1,196 @@
+# ==============================================================================
+# Parameter Sweeps
+# Builds many variants of a design side by side and tabulates the results.
+# ==============================================================================
+#
+# Usage (see also `python rack.py sweep --help`):
+#
+#     python rack.py sweep v106 --grid rack_inner_width=190:200:5 --grid pcie_standoff_height=6,10
+#     python rack.py sweep v106 --variants variants.json --parts tray --formats stl --timeout 300
+#
+# --grid name=values builds every combination; values are a comma list
+# (6,10) or an inclusive range start:stop:step (190:200:5). --variants reads
+# a JSON list of {name: value} dicts, combined with the grid.
+#
+# Each variant runs in its own process (rack_params.load_variant, builds
+# in-process) and is killed when it exceeds --timeout. Output:
+#
+#     <out>/<name>=<value>__.../    the variant's exports (+ rack_manifest.json,
+#                                   sweep.log with its output)
+#     <out>/sweep.csv, sweep.json   one row per variant and part: parameters,
+#                                   status, volume, bounding box, validity,
+#                                   print estimate of parts with an STL
+#                                   (rack_estimate), total / build / export time
+#
+# Environment:
+#   RACK_JOBS=n    variants built at the same time (default: CPU count)
+
+import csv
+import itertools
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+from rack_params import parse_value, variant_code
+
+RESULT_FILE = "sweep_result.json"
+LOG_FILE = "sweep.log"
+
+
+# --- Variants ---
+
+def parse_values(text):
+    """"6,10" -> [6, 10]; "190:200:5" -> [190, 195, 200] (stop included)."""
+    if ":" in text and "," not in text:
+        start, stop, *step = (parse_value(v) for v in text.split(":"))
+        step = step[0] if step else 1
+        values, n = [], 0
+        while start + n * step <= stop + abs(step) * 1e-9:
+            values.append(round(start + n * step, 9))
+            n += 1
+        return values
+    return [parse_value(v) for v in text.split(",")]
+
+
+def grid_variants(grid, base=None):
+    """Every combination of {name: [values]}, on top of each dict in base (default: [{}])."""
+    names = list(grid)
+    return [
+        dict(overrides, **dict(zip(names, combination)))
+        for overrides in (base or [{}])
+        for combination in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def variant_name(overrides):
+    return "__".join(f"{name}={value}" for name, value in overrides.items()) or "default"
+
+
+# --- Worker ---
+
+def _run_variant(module_name, overrides, names, formats, folder):
+    """Builds and exports one variant, writing its results to folder/RESULT_FILE."""
+    os.environ["RACK_JOBS"] = "1" # One process per variant
+    sys.stdout = sys.stderr = open(os.path.join(folder, LOG_FILE), "w", buffering=1)
+    from rack_estimate import estimate
+    from rack_export import export_format, export_parts
+    from rack_manifest import design_params
+    from rack_params import load_variant
+
+    result = {"status": "ok"}
+    try:
+        module = load_variant(module_name, overrides, register=True)
+        start = time.perf_counter()
+        parts = module.build(names)
+        result["build_time"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        export_parts(parts, module.EXPORTS, formats, folder, design_params(vars(module)), max_workers=1, design=module_name)
+        result["export_time"] = time.perf_counter() - start
+
+        result["parts"] = {}
+        for name, shape in parts.items():
+            size = shape.bounding_box().size
+            result["parts"][name] = {
+                "volume": shape.volume,
+                "size_x": size.X, "size_y": size.Y, "size_z": size.Z,
+                "valid": shape.is_valid,
+            }
+            if any(part == name and export_format(filename) == "stl" for part, filename in module.EXPORTS):
+                result["parts"][name].update(estimate(shape.volume))
+    except Exception as e:
+        traceback.print_exc()
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    with open(os.path.join(folder, RESULT_FILE), "w") as f:
+        json.dump(result, f, indent=2)
+
+
+# --- Runner ---
+
+def run_sweep(module_name, variants, names=None, formats=None, out="sweeps", timeout=None, max_workers=None):
+    """Builds every variant (list of overrides) in a process pool and returns the table rows."""
+    for overrides in variants:
+        variant_code(module_name, overrides) # Unknown names fail here, not in every worker
+    if max_workers is None:
+        max_workers = int(os.environ.get("RACK_JOBS", "0")) or os.cpu_count() or 1
+
+    pending = list(variants)
+    running = {} # sentinel -> (process, start, overrides, folder)
+    results = {}
+    start_all = time.perf_counter()
+    while pending or running:
+        while pending and len(running) < max_workers:
+            overrides = pending.pop(0)
+            folder = os.path.join(out, variant_name(overrides))
+            os.makedirs(folder, exist_ok=True)
+            if os.path.exists(os.path.join(folder, RESULT_FILE)):
+                os.remove(os.path.join(folder, RESULT_FILE))
+            process = multiprocessing.Process(target=_run_variant, args=(module_name, overrides, names, formats, folder))
+            process.start()
+            running[process.sentinel] = (process, time.perf_counter(), overrides, folder)
+
+        # Wait for a variant to finish or the earliest deadline
+        now = time.perf_counter()
+        wait = None if timeout is None else max(0, min(start + timeout for _, start, _, _ in running.values()) - now)
+        multiprocessing.connection.wait(list(running), wait)
+
+        for sentinel, (process, start, overrides, folder) in list(running.items()):
+            elapsed = time.perf_counter() - start
+            if process.is_alive():
+                if timeout is None or elapsed < timeout:
+                    continue
+                process.terminate()
+                process.join()
+                result = {"status": "timeout", "error": f"killed after {elapsed:.0f}s"}
+            else:
+                process.join()
+                try:
+                    with open(os.path.join(folder, RESULT_FILE)) as f:
+                        result = json.load(f)
+                except (OSError, ValueError):
+                    result = {"status": "error", "error": f"worker exited with code {process.exitcode}"}
+            result["time"] = elapsed
+            results[variant_name(overrides)] = (overrides, result)
+            del running[sentinel]
+            print(f"{result['status']:<8} {elapsed:7.1f}s  {variant_name(overrides)}")
+
+    rows = table_rows([results[variant_name(overrides)] for overrides in variants])
+    write_table(rows, out)
+    failed = sum(1 for _, result in results.values() if result["status"] != "ok")
+    print(f"Swept {len(variants)} variants in {time.perf_counter() - start_all:.1f}s ({failed} failed), table in {out}/sweep.csv")
+    return rows
+
+
+# --- Table ---
+
+def table_rows(results):
+    """One row per variant and part (one row with part None for failed variants)."""
+    rows = []
+    for overrides, result in results:
+        common = {
+            "variant": variant_name(overrides),
+            **overrides,
+            "status": result["status"],
+            "time": result.get("time"),
+            "build_time": result.get("build_time"),
+            "export_time": result.get("export_time"),
+        }
+        for part, values in (result.get("parts") or {None: {}}).items():
+            rows.append(dict(common, part=part, **values, error=result.get("error")))
+    return rows
+
+
+def write_table(rows, out):
+    columns = []
+    for row in rows:
+        columns += [key for key in row if key not in columns]
+    with open(os.path.join(out, "sweep.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+    with open(os.path.join(out, "sweep.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -1,4 +1,16 @@
 from build123d import *
+from rack_boolean import subtract
+from rack_cache import cached_part
+from rack_export import export_parts
+from rack_infill import plate_face
+from rack_instance import instance, instances
+from rack_layout import board, bounds, circle, cutout, rect, standoffs
+from rack_lod import BOARD_DETAIL, board_model
+from rack_manifest import design_params
+from rack_meshcache import prime_view
+from rack_parallel import build_parts
+from rack_pattern import circle_keepout, rect_keepout
+from rack_profile import stage
 
 # ==============================================================================
 # 10" Rack - V106 (Python / Build123d Edition)
@@ -6,8 +18,7 @@ from build123d import *
 # ==============================================================================
 
 # --- Parameters ---
-wall_thickness = 2
-floor_thickness = 2
+# (Each name is assigned once: `python rack.py deps v106 --check` reports duplicates)
 shelf_height = 35
 shelf_width = 190
 shelf_depth_len = 115
@@ -22,11 +33,12 @@ screw_pilot_dia = 2.8
 # Dimensions (mm)
 rack_width = 10 * 25.4 # 254.0 mm
 rack_inner_width = 195 # Increased to 195mm to give 2.5mm clearance for legs
-tray_height = 1.75 * 25.4 # 1U = 44.45 mm
+tray_height = 44.45 # 1.75 * 25.4 (1.75U)
 tray_depth = 130
+tray_wall_height = 10 # Reduced from 22mm as requested
 floor_thickness = 2
 wall_thickness = 1.6 # Optimized for 0.4mm nozzle (4 perimeters)
-ear_thickness = 3.2 # Optimized for 0.4mm nozzle (8 perimeters)
+ear_thickness = 3 # 3.2 would be 8 perimeters of a 0.4mm nozzle, but all exports so far use 3
 # For 10" rack, the opening is usually ~220mm?
 # 19" rack opening is ~450mm.
 # 10" rack is ~254mm total. Rails are usually ~220mm apart.
@@ -48,13 +60,12 @@ ear_thickness = 3.2 # Optimized for 0.4mm nozzle (8 perimeters)
 
 # Rack Dimensions
 # rack_inner_width = 220 # REMOVED DUPLICATE
-tray_depth = 130
-tray_height = 44.45
-ear_thickness = 3
+# (tray_depth, tray_height and ear_thickness were set here a second time, see above)
 EPS = 0.01
 
 # Positioning Legs
 leg_inset = 6
+leg_diameter = 12 # Shelf legs (the deck's corners are rounded to match)
 sh_off_x = (rack_inner_width - shelf_width) / 2
 lx_left = sh_off_x + leg_inset
 lx_right = sh_off_x + shelf_width - leg_inset
@@ -82,8 +93,19 @@ leg_boss_height = 2.5
 screw_head_dia = 6.0 # Clearance for 5.5mm head
 screw_head_height = 3.5 # Clearance for 3.0mm head
 
+# Floor Honeycomb (see rack_infill.py: `python rack.py infill v106` searches these)
+floor_hex_radius = 16 # HexLocations radius: half the distance between cell centers (SCAD hole_r)
+floor_hex_cell = 14 # Hexagon circumradius, 7.75mm walls (2 * 16 - sqrt(3) * 14)
+floor_hex_counts = (10, 8)
+floor_hex_shift = (0, 0) # Grid offset from the floor center
+
 # --- Generators ---
 
+@cached_part(
+    "leg_inset", "leg_diameter", "leg_boss_height", "shelf_width", "shelf_depth_len", "shelf_height",
+    "shelf_thickness", "screw_pilot_dia",
+    "dcdc_x", "dcdc_y", "dcdc_w", "dcdc_d", "sata_x", "sata_y", "sata_real_w", "sata_real_d",
+)
 def make_shelf():
     """Generates the removable shelf."""
     leg_locs = [
@@ -100,14 +122,14 @@ def make_shelf():
         # 1. Deck
         with BuildSketch(Plane.XY.offset(leg_height)):
             with Locations(leg_locs):
-                Circle(radius=leg_diameter/2 if 'leg_diameter' in globals() else 6) # 12mm dia -> 6 radius
+                Circle(radius=leg_diameter/2)
             make_hull()
         extrude(amount=shelf_thickness)
 
         # 2. Legs
         with BuildSketch(Plane.XY):
             with Locations(leg_locs):
-                Circle(radius=6)
+                Circle(radius=leg_diameter/2)
         extrude(amount=leg_height)
 
         # 3. Ribs (Hulls between legs)
@@ -121,7 +143,7 @@ def make_shelf():
             with BuildPart() as rib:
                 with BuildSketch(Plane.XY.offset(shelf_height)):
                     with Locations([p1, p2]):
-                        Circle(6)
+                        Circle(leg_diameter/2)
                     make_hull()
                 extrude(amount=shelf_thickness)
             return rib.part
@@ -207,100 +229,136 @@ def make_shelf():
 
     return shelf.part
 
+def tray_floor_keepouts():
+    """Floor regions the hex pattern must leave solid."""
+    return [
+        # PCIe Mount Island
+        # Island is on the Right side (where holes are), aligned with the holes.
+        rect_keepout(pcie_x + pcie_w - 20 - 5, pcie_y - 5, 20, pcie_d + 10),
+        # PCIe Support Beam
+        # Beam is on the Left side (connector side)
+        rect_keepout(pcie_x, pcie_y, 10, pcie_d),
+        # Leg Bases
+        *[circle_keepout(x, y, 11) for x, y in [(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]],
+    ]
+
+def tray_floor_plate():
+    """Tray floor honeycomb: outline, hex grid and solid regions (see rack_infill.py)."""
+    return {
+        # Outer Frame
+        "outer": (0, 0, rack_inner_width, tray_depth),
+        # Safe Area (Rectangle - Safe Border)
+        # SCAD: translate([safe_border, safe_border]) square([rack_inner_width - 2*safe_border, tray_depth - 2*safe_border])
+        "safe": (safe_border, safe_border, rack_inner_width - safe_border, tray_depth - safe_border),
+        # Solid Regions (Unions in SCAD become subtractions from the cutout mask)
+        "keepouts": tray_floor_keepouts(),
+        # Hex Grid
+        # SCAD: hole_r=16. apothem is distance to flat side.
+        # HexLocations radius (16) is the apothem, RegularPolygon radius (14) the circumradius.
+        # Centered horizontally and vertically
+        "center": (rack_inner_width/2, tray_depth/2),
+        "thickness": floor_thickness,
+        "hex": (floor_hex_radius, floor_hex_cell, floor_hex_counts, floor_hex_shift),
+        "params": ("floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift"),
+    }
+
+def tray_cutters():
+    """Hole and slot solids subtracted from the tray."""
+    cutters = []
+
+    # Rack Slots (Horizontal, Rounded)
+    # Standard 10" rack hole spacing is approx 236.5mm center-to-center
+    # (Derived from previous values: 220 + 8.25 - (-8.25) = 236.5)
+    hole_spacing = 236.5
+    center_x = rack_inner_width / 2
+    
+    x_left = center_x - hole_spacing / 2
+    x_right = center_x + hole_spacing / 2
+    
+    # Z positions
+    z_bottom = 7.225
+    z_top = 37.225
+
+    # Rounded slot: 12mm wide, 7mm high
+    # Use Box + Fillet for robustness
+    slot = Box(12, 20, 7, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+    # Fillet the edges along Y axis (the cutting direction)
+    # Radius 3.5mm makes the 7mm height fully rounded (semicircle ends)
+    slot = fillet(slot.edges().filter_by(Axis.Y), radius=3.49) # Use slightly less than 3.5 to avoid geometric singularities
+    for x in [x_left, x_right]:
+        for z in [z_bottom, z_top]:
+            cutters.append(Location((x, ear_thickness/2, z)) * slot)
+
+    # DC Jack
+    cutters.append(Location((15, tray_depth + 5, 8)) * Rotation(90, 0, 0) * Cylinder(radius=dc_jack_dia/2, height=10))
+
+    # PCIe Holes (Right side)
+    for dy in [0, pcie_hole_dist]:
+        cutters.append(Location((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y + dy, -10)) * Cylinder(radius=1.4, height=50))
+
+    # Shelf Mounting Holes (Countersunk)
+    for x, y in [(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]:
+        # Through hole
+        cutters.append(Location((x, y, -10)) * Cylinder(radius=screw_hole_dia/2, height=50))
+        # Countersink (from bottom)
+        # Align.MIN means cylinder starts at Z=0 and goes up.
+        cutters.append(Location((x, y, 0)) * Cylinder(radius=screw_head_dia/2, height=screw_head_height, align=(Align.CENTER, Align.CENTER, Align.MIN)))
+
+    return cutters
+
+@cached_part(
+    "rack_inner_width", "tray_depth", "tray_height", "tray_wall_height", "safe_border", "floor_thickness", "wall_thickness",
+    "ear_thickness", "EPS", "dc_jack_dia", "screw_hole_dia", "screw_head_dia", "screw_head_height",
+    "pcie_x", "pcie_y", "pcie_w", "pcie_d", "pcie_offset_y", "pcie_hole_dist", "pcie_standoff_height",
+    "lx_left", "lx_right", "ly_front", "ly_back", "leg_boss_height",
+    "floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift",
+)
 def make_tray():
     """Generates the main rack tray."""
     
     # 1. Floor Skeleton
     ear_w_total = (254 - rack_inner_width) / 2 # ~17mm
-    tray_wall_height = 10 # Reduced from 22mm as requested
+
+    # Hole/slot cutters, created before BuildPart so they aren't added to the tray
+    with stage("tray.cutters"):
+        cutters = tray_cutters()
     
     with BuildPart() as floor:
-        # Outer Frame
-        with BuildSketch() as sk_floor:
-            Rectangle(rack_inner_width, tray_depth, align=(Align.MIN, Align.MIN))
-            
-            # Hex Pattern Cutout
-            with BuildSketch(mode=Mode.SUBTRACT) as sk_hex:
-                # Intersection of Hex Grid and Safe Area
-                with BuildSketch() as sk_grid:
-                    # Hex Grid
-                    # SCAD: hole_r=16. apothem is distance to flat side.
-                    # build123d HexLocations uses circumradius by default.
-                    # If apothem=14, radius = 14 / cos(30) = 16.16
-                    # Align grid to center of tray depth (tray_depth/2 = 80)
-                    with Locations((rack_inner_width/2, tray_depth/2)): # Centered horizontally and vertically
-                        with HexLocations(radius=16, x_count=10, y_count=8):
-                            # Use RegularPolygon for Honeycomb (Hexagon)
-                            # radius=14 gives 2mm wall thickness (16-14=2)
-                            RegularPolygon(radius=14, side_count=6)
-                
-                with BuildSketch(mode=Mode.INTERSECT) as sk_safe:
-                    # Safe Area (Rectangle - Safe Border)
-                    # SCAD: translate([safe_border, safe_border]) square([rack_inner_width - 2*safe_border, tray_depth - 2*safe_border])
-                    # We need to center this rectangle relative to the floor sketch origin?
-                    # No, let's check floor sketch.
-                    # with BuildSketch() as sk_floor:
-                    #    Rectangle(rack_inner_width, tray_depth, align=(Align.CENTER, Align.MIN))
-                    # So X=0 is center, Y=0 is front.
-                    
-                    # Safe area should be inset by safe_border.
-                    # Rectangle centered at (rack_inner_width/2, tray_depth/2).
-                    with Locations((rack_inner_width/2, tray_depth/2)):
-                        Rectangle(rack_inner_width - 2*safe_border, tray_depth - 2*safe_border)
-                
-                # Subtract Solid Regions (Unions in SCAD become subtractions from the cutout mask)
-                # Wait, boolean logic: Floor = Rect - (HexGrid INTERSECT SafeZone MINUS SolidZones)
-                # Easier: Floor = Rect - HexGrid_Clipped.
-                # HexGrid_Clipped = (HexGrid & SafeZone) - SolidZones.
-                
-                with BuildSketch(mode=Mode.SUBTRACT) as sk_solids:
-                    # PCIe Mount Island
-                    with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5)):
-                         # Island is now on the Right side (where holes are)
-                         # Holes are at pcie_w - 7.4.
-                         # Island width 20.
-                         # Let's position island at pcie_w - 25 relative to pcie_x?
-                         # Holes X rel: 146.9.
-                         # Island X rel: 135?
-                         # Let's align with holes.
-                         Rectangle(20, pcie_d + 10, align=(Align.MIN, Align.MIN))
-                    
-                    # PCIe Support Beam
-                    # Beam is now on the Left side (connector side)
-                    with Locations((pcie_x, pcie_y)):
-                        Rectangle(10, pcie_d, align=(Align.MIN, Align.MIN))
-                    # Leg Bases
-                    with Locations([(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]):
-                        Circle(radius=11)
-
-        extrude(amount=floor_thickness)
+        # Floor = Rect - ((HexGrid & SafeZone) - SolidZones)
+        # Clipped in rack_pattern first: only hexes touching a solid zone go through OCC,
+        # the result is a single face with the cells as holes.
+        with stage("tray.floor.hex"):
+            floor_face = plate_face(tray_floor_plate())
+        with stage("tray.floor.extrude"):
+            extrude(floor_face, amount=floor_thickness)
         
-        # Floor beneath ears (outside the main floor area)
-        # Left ear floor
-        with Locations((-ear_w_total, 0, 0)):
-            Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
-        # Right ear floor  
-        with Locations((rack_inner_width, 0, 0)):
-            Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
-
-        # 2. Frame Structure (Walls & Ears)
+        with stage("tray.walls"):
+            # Floor beneath ears (outside the main floor area)
+            # Left ear floor
+            with Locations((-ear_w_total, 0, 0)):
+                Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Right ear floor  
+            with Locations((rack_inner_width, 0, 0)):
+                Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+
+            # 2. Frame Structure (Walls & Ears)
         
-        # Faceplate - only inner width (ears have their own front)
-        with Locations((0, 0, 0)):
-            Box(rack_inner_width, ear_thickness, tray_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Faceplate - only inner width (ears have their own front)
+            with Locations((0, 0, 0)):
+                Box(rack_inner_width, ear_thickness, tray_height, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # Back Wall
-        with Locations((0, tray_depth - wall_thickness, 0)):
-            Box(rack_inner_width, wall_thickness, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
-
-        # Side Walls (Explicitly defined for symmetry)
-        # Left Wall
-        with Locations((-wall_thickness, 0, 0)):
-            Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Back Wall
+            with Locations((0, tray_depth - wall_thickness, 0)):
+                Box(rack_inner_width, wall_thickness, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+
+            # Side Walls (Explicitly defined for symmetry)
+            # Left Wall
+            with Locations((-wall_thickness, 0, 0)):
+                Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # Right Wall
-        with Locations((rack_inner_width, 0, 0)):
-            Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Right Wall
+            with Locations((rack_inner_width, 0, 0)):
+                Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
 
 
 
@@ -371,79 +429,40 @@ def make_tray():
 
 
         # Add Ears
-        add(Location((0, 0, 0)) * make_ear(mirror_x=False))
-        add(Location((rack_inner_width, 0, 0)) * make_ear(mirror_x=True))
+        with stage("tray.ears"):
+            add(Location((0, 0, 0)) * make_ear(mirror_x=False))
+            add(Location((rack_inner_width, 0, 0)) * make_ear(mirror_x=True))
         
 
 
         # Add Slopes (Explicit)
-        add(make_slope(is_right=False))
-        add(make_slope(is_right=True))
+        with stage("tray.slopes"):
+            add(make_slope(is_right=False))
+            add(make_slope(is_right=True))
 
         # 3. Additions (Mounts)
-        # PCIe Mount Island (Right side)
-        with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5, 0)):
-            Box(20, pcie_d + 10, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+        with stage("tray.mounts"):
+            # PCIe Mount Island (Right side)
+            with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5, 0)):
+                Box(20, pcie_d + 10, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # PCIe Support Beam (Left side)
-        with Locations((pcie_x, pcie_y, 0)):
-            Box(10, pcie_d, floor_thickness + pcie_standoff_height, align=(Align.MIN, Align.MIN, Align.MIN))
-        # Leg Bases (Bosses for shelf legs)
-        with Locations([(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]):
-            # Height = floor_thickness + leg_boss_height
-            Cylinder(radius=9, height=floor_thickness + leg_boss_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
-        # PCIe Standoffs
-        # Holes on Right side: pcie_x + pcie_w - 7.4
-        with Locations((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y, floor_thickness - EPS)):
-            Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
-            with Locations((0, pcie_hole_dist, 0)):
+            # PCIe Support Beam (Left side)
+            with Locations((pcie_x, pcie_y, 0)):
+                Box(10, pcie_d, floor_thickness + pcie_standoff_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Leg Bases (Bosses for shelf legs)
+            with Locations([(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]):
+                # Height = floor_thickness + leg_boss_height
+                Cylinder(radius=9, height=floor_thickness + leg_boss_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+            # PCIe Standoffs
+            # Holes on Right side: pcie_x + pcie_w - 7.4
+            with Locations((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y, floor_thickness - EPS)):
                 Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
-
-        # 4. Subtractions (Holes)
-        with BuildPart(mode=Mode.SUBTRACT):
-            # Rack Slots (Horizontal, Rounded)
-            # Standard 10" rack hole spacing is approx 236.5mm center-to-center
-            # (Derived from previous values: 220 + 8.25 - (-8.25) = 236.5)
-            hole_spacing = 236.5
-            center_x = rack_inner_width / 2
-            
-            x_left = center_x - hole_spacing / 2
-            x_right = center_x + hole_spacing / 2
-            
-            # Z positions
-            z_bottom = 7.225
-            z_top = 37.225
-            
-            for x in [x_left, x_right]:
-                for z in [z_bottom, z_top]:
-                    # Rounded slot: 12mm wide, 7mm high
-                    # Use Box + Fillet for robustness
-                    with Locations((x, ear_thickness/2, z)):
-                        # Create box centered at location
-                        b = Box(12, 20, 7, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-                        # Fillet the edges along Y axis (the cutting direction)
-                        # Radius 3.5mm makes the 7mm height fully rounded (semicircle ends)
-                        fillet(b.edges().filter_by(Axis.Y), radius=3.49) # Use slightly less than 3.5 to avoid geometric singularities
-
-            # DC Jack
-            with Locations((15, tray_depth + 5, 8)):
-                with Locations(Rotation(90, 0, 0)):
-                    Cylinder(radius=dc_jack_dia/2, height=10)
-
-            # PCIe Holes (Right side)
-            with Locations((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y, -10)):
-                Cylinder(radius=1.4, height=50)
                 with Locations((0, pcie_hole_dist, 0)):
-                    Cylinder(radius=1.4, height=50)
+                    Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
 
-            # Shelf Mounting Holes (Countersunk)
-            with Locations([(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]):
-                # Through hole
-                with Locations((0,0,-10)):
-                    Cylinder(radius=screw_hole_dia/2, height=50)
-                # Countersink (from bottom)
-                # Align.MIN means cylinder starts at Z=0 and goes up.
-                Cylinder(radius=screw_head_dia/2, height=screw_head_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+        # 4. Subtractions (Holes)
+        with stage("tray.subtract.slots"):
+            subtract(floor, cutters, "tray")
 
     # 3. Combine Floor and Walls
     # The floor part currently only has the floor.
@@ -499,59 +518,31 @@ def make_tray():
     
     return floor.part
 
+@cached_part()
 def make_spacers():
-    with BuildPart() as spacers:
-        with Locations([ (i*12, 0, 0) for i in range(8) ]):
-            Cylinder(radius=3.5, height=4, align=(Align.CENTER, Align.CENTER, Align.MIN))
-        
-        with BuildPart(mode=Mode.SUBTRACT):
-             with Locations([ (i*12, 0, 0) for i in range(8) ]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-    return spacers.part
+    # One spacer, placed 8 times (instances share its geometry, see rack_instance.py)
+    with BuildPart() as spacer:
+        Cylinder(radius=3.5, height=4, align=(Align.CENTER, Align.CENTER, Align.MIN))
+        Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+    return Compound(children=instances(spacer.part, [Location((i*12, 0, 0)) for i in range(8)]))
 
-# --- Build Everything ---
-
-print("Generating Shelf...")
-shelf_part = make_shelf()
-
-print("Generating Tray...")
-tray_part = make_tray()
-
-print("Generating Spacers...")
-spacers_part = make_spacers()
-
-# --- Visualization Objects ---
-
-# --- Detailed Board Models ---
+# --- Board Models ---
 
-# --- Detailed Board Models ---
-
-def make_dcdc_board(location=Location((0,0,0))):
-    """Generates the DC-DC board with colors at a specific location."""
-    parts = []
-    
-    # Helper to add colored part
-    def add_part(geom, color, loc):
-        # Apply the board's global location to the component's local location
-        final_loc = location * loc
-        parts.append(Compound(children=[geom], color=color).moved(final_loc))
-        # Note: We move the Compound after creation? 
-        # If .moved() strips color, this is bad.
-        # We should move the geometry, THEN wrap.
-        # geom.moved(final_loc) -> Wrapped in Compound(color).
+def make_dcdc_board(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the DC-DC board at a specific location, ghost or detailed (see rack_lod.py)."""
+    parts = [] # (geometry, color, location on the board)
     
-    # Re-defining helper to be safe
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
 
     # PCB (Black)
     with BuildPart() as pcb:
         Box(dcdc_w, dcdc_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
-        with Locations((dcdc_w/2, dcdc_d/2, 0)):
-            # Holes at 60x91.5 spacing
-            with Locations([(x, y) for x in [-30, 30] for y in [-45.75, 45.75]]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+        if detail == "detailed": # Mounting holes, the ghost is just the PCB box
+            with Locations((dcdc_w/2, dcdc_d/2, 0)):
+                # Holes at 60x91.5 spacing
+                with Locations([(x, y) for x in [-30, 30] for y in [-45.75, 45.75]]):
+                    Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
     
     add_colored(pcb.part, Color("black"), Location((0,0,0)))
     
@@ -573,23 +564,23 @@ def make_dcdc_board(location=Location((0,0,0))):
     for i in range(4):
         add_colored(term_geom, Color("green"), Location((10 + i*15, 5, z_top)))
                 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
-def make_sata_board(location=Location((0,0,0))):
-    """Generates the SATA/Power board with colors at a specific location."""
-    parts = []
+def make_sata_board(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the SATA/Power board at a specific location, ghost or detailed."""
+    parts = [] # (geometry, color, location on the board)
     
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
     
     # PCB (Black)
     with BuildPart() as pcb:
         Box(sata_real_w, sata_real_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
-        with Locations((sata_real_w/2, sata_real_d/2, 0)):
-            # Holes at 50x70 spacing
-            with Locations([(x, y) for x in [-25, 25] for y in [-35, 35]]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+        if detail == "detailed": # Mounting holes, the ghost is just the PCB box
+            with Locations((sata_real_w/2, sata_real_d/2, 0)):
+                # Holes at 50x70 spacing
+                with Locations([(x, y) for x in [-25, 25] for y in [-35, 35]]):
+                    Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
 
     add_colored(pcb.part, Color("black"), Location((0,0,0)))
     
@@ -609,15 +600,14 @@ def make_sata_board(location=Location((0,0,0))):
     for x in [10, 30]:
         add_colored(cap_geom, Color("silver"), Location((x, 50, z_top)))
 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
-def make_pcie_card(location=Location((0,0,0))):
-    """Generates the PCIe to SATA card with colors at a specific location."""
-    parts = []
+def make_pcie_card(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the PCIe to SATA card at a specific location, ghost or detailed."""
+    parts = [] # (geometry, color, location on the board)
     
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
     
     # PCB (Black)
     pcb_geom = Box(pcie_w, pcie_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
@@ -649,7 +639,7 @@ def make_pcie_card(location=Location((0,0,0))):
     bracket_geom = Box(2, pcie_d + 20, 12, align=(Align.MIN, Align.CENTER, Align.CENTER))
     add_colored(bracket_geom, Color("white"), Location((0, pcie_d/2, 0)))
 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
 # --- Visualization Objects ---
 
@@ -661,90 +651,180 @@ dcdc_loc = shelf_assembly_loc * Location((dcdc_x, dcdc_y, shelf_height + shelf_t
 sata_loc = shelf_assembly_loc * Location((sata_x, sata_y, shelf_height + shelf_thickness + 2))
 pcie_loc = Location((pcie_x, pcie_y, floor_thickness + pcie_standoff_height))
 
-# Create boards at their FINAL locations
-dcdc_board = make_dcdc_board(dcdc_loc)
-sata_board = make_sata_board(sata_loc)
-pcie_card = make_pcie_card(pcie_loc)
-pcie_bracket = Part() # Included in make_pcie_card now
-
-
-# --- Export / Visualize ---
-
-# Export Shelf (Primary Artifact)
-export_step(shelf_part, "rack_v106.step")
-print("Exported rack_v106.step")
-
-# Export Tray
-export_step(tray_part, "rack_v106_tray.step")
-print("Exported rack_v106_tray.step")
-
-# Export to STL
-export_stl(tray_part, "rack_v106_tray.stl")
-print("Exported rack_v106_tray.stl")
-
-export_stl(shelf_part, "rack_v106_shelf.stl")
-print("Exported rack_v106_shelf.stl")
-
-export_stl(spacers_part, "rack_v106_spacers.stl")
-print("Exported rack_v106_spacers.stl")
-
-# Export Full Assembly (STEP)
-# Combine all parts into one compound for export
-
-# Wrap main parts in colored Compounds AFTER moving them
-# Tray is at (0,0,0)
-tray_colored = Compound(children=[tray_part], color=Color("dimgray"))
-tray_colored.label = "Tray"
-
-# Shelf needs to be moved, THEN colored
-shelf_moved = shelf_part.moved(shelf_assembly_loc)
-shelf_colored = Compound(children=[shelf_moved], color=Color("lightgray"))
-shelf_colored.label = "Shelf"
-
-# Spacers need to be moved, THEN colored
-spacers_moved = spacers_part.moved(Location((0, -20, 0)))
-spacers_colored = Compound(children=[spacers_moved], color=Color("white"))
-spacers_colored.label = "Spacers"
-
-# Assign labels to boards
-dcdc_board.label = "DC-DC Board"
-sata_board.label = "SATA Board"
-pcie_card.label = "PCIe Card"
-
-assembly = Compound(children=[
-    tray_colored,
-    shelf_colored,
-    spacers_colored,
-    dcdc_board, # Already colored and at final location
-    sata_board, # Already colored and at final location
-    pcie_card   # Already colored and at final location
-])
-assembly.label = "Rack Assembly"
-export_step(assembly, "rack_v106_assembly.step")
-print("Exported rack_v106_assembly.step")
-
-try:
-    from ocp_vscode import show, show_object, set_port, set_defaults
-    set_port(3939)
-    
+# Board models: "ghost" (one solid per board) or "detailed" (colored components), see rack_lod.py
+board_detail = BOARD_DETAIL
+
+# --- Layout Preview ---
+
+def layout():
+    """Top view of the tray for `python rack.py layout v106`, mirroring the generators above (rack_layout.py)."""
+    shelf_z = floor_thickness + leg_boss_height # Shelf origin, see shelf_assembly_loc
+    deck_z = shelf_z + shelf_height - leg_boss_height # leg_height in make_shelf
+    board_z = shelf_z + shelf_height + shelf_thickness + 2 # dcdc_loc / sata_loc
+    pcie_z = floor_thickness + pcie_standoff_height
+    legs = [(lx_left, ly_front), (lx_left, ly_back), (lx_right, ly_front), (lx_right, ly_back)]
+    return [
+        bounds("Tray", 0, ear_thickness, rack_inner_width, tray_depth - wall_thickness - ear_thickness, wall_thickness, (0, tray_height)),
+
+        # Tray: leg bosses, PCIe support beam and standoffs, DC jack
+        *[circle("standoff", f"Leg boss {i}", x, y, 9, (0, floor_thickness + leg_boss_height), "Tray") for i, (x, y) in enumerate(legs, 1)],
+        rect("bracket", "PCIe beam", pcie_x, pcie_y, 10, pcie_d, (0, pcie_z), "Tray"),
+        *[circle("standoff", f"PCIe standoff {i}", pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y + dy, 4, (floor_thickness, pcie_z), "Tray")
+          for i, dy in enumerate([0, pcie_hole_dist], 1)],
+        cutout("DC jack", "back", 15 - dc_jack_dia/2, tray_depth, dc_jack_dia, 10, (8 - dc_jack_dia/2, 8 + dc_jack_dia/2), "Tray"),
+
+        # PCIe card: heatsink, SATA ports on the right, bracket on the left
+        *board("PCIe", pcie_x, pcie_y, pcie_w, pcie_d, pcie_z, 1.6, [
+            ("heatsink", pcie_w/2 - 20, pcie_d/2 - 20, 40, 40, 10),
+            *[(f"SATA port {i + 1}", pcie_w - 10 - 15/2, 10 + i*12 - 10/2, 15, 10, 8) for i in range(5)],
+        ]),
+        rect("component", "PCIe bracket", pcie_x, pcie_y - 10, 2, pcie_d + 20, (pcie_z - 6, pcie_z + 6), "PCIe"),
+
+        # Shelf: legs, deck (hull of the leg tops) and the board bosses under it
+        *[circle("leg", f"Shelf leg {i}", x, y, 6, (shelf_z, deck_z), "Shelf") for i, (x, y) in enumerate(legs, 1)],
+        rect("shelf", "Shelf deck", lx_left - 6, ly_front - 6, lx_right - lx_left + 12, ly_back - ly_front + 12,
+             (deck_z, deck_z + shelf_thickness), "Shelf"),
+        *standoffs("DC-DC boss", sh_off_x + dcdc_x + dcdc_w/2, shelf_start_y + dcdc_y + dcdc_d/2, 60, 91.5, 4, (deck_z - 4, deck_z), "Shelf"),
+        *standoffs("SATA boss", sh_off_x + sata_x + sata_real_w/2, shelf_start_y + sata_y + sata_real_d/2, 50, 70, 4, (deck_z - 4, deck_z), "Shelf"),
+
+        # Boards on the shelf
+        *board("DC-DC", sh_off_x + dcdc_x, shelf_start_y + dcdc_y, dcdc_w, dcdc_d, board_z, 1.6, [
+            *[(f"inductor {i + 1}", 15 - 5, 40 + i*15 - 5, 10, 10, 8) for i in range(4)],
+            *[(f"capacitor {i + 1}", 35 - 4, 40 + i*15 - 4, 8, 8, 10) for i in range(4)],
+            *[(f"terminal {i + 1}", 10 + i*15 - 6, 0, 12, 10, 10) for i in range(4)],
+        ]),
+        *board("SATA", sh_off_x + sata_x, shelf_start_y + sata_y, sata_real_w, sata_real_d, board_z, 1.6, [
+            *[(f"connector {i + 1}", x - 15/2, 5, 15, 10, 15) for i, x in enumerate([10, 30])],
+            ("inductor", sata_real_w/2 - 6, sata_real_d/2 - 6, 12, 12, 8),
+            *[(f"capacitor {i + 1}", x - 4, 50 - 4, 8, 8, 10) for i, x in enumerate([10, 30])],
+        ]),
+    ]
+
+# --- Build Everything ---
+
+# Part name -> (generator, *arg globals), see rack_parallel.build_parts.
+# None of the generators depend on each other, so they are built side by side.
+# Boards are created at their FINAL locations.
+PARTS = {
+    "tray": ("make_tray",), # Slowest part, submit first
+    "shelf": ("make_shelf",),
+    "spacers": ("make_spacers",),
+    "dcdc_board": ("make_dcdc_board", "dcdc_loc", "board_detail"),
+    "sata_board": ("make_sata_board", "sata_loc", "board_detail"),
+    "pcie_card": ("make_pcie_card", "pcie_loc", "board_detail"),
+}
+# Honeycomb plate name -> plate function, see rack_infill.py
+HONEYCOMBS = {
+    "tray_floor": "tray_floor_plate",
+}
+
+# "assembly" combines all of PARTS
+PART_NAMES = [*PARTS, "assembly"]
+
+# (part, file name), see rack_export.export_parts
+EXPORTS = [
+    # Export Shelf (Primary Artifact)
+    ("shelf", "rack_v106.step"),
+    # Export Tray
+    ("tray", "rack_v106_tray.step"),
+    # Export to STL
+    ("tray", "rack_v106_tray.stl"),
+    ("shelf", "rack_v106_shelf.stl"),
+    ("spacers", "rack_v106_spacers.stl"),
+    # Export Full Assembly (STEP)
+    ("assembly", "rack_v106_assembly.step"),
+]
+
+def build(names=None):
+    """Builds the named parts (default: all) and returns {name: shape}."""
+    names = PART_NAMES if names is None else names
+    needed = list(PARTS) if "assembly" in names else [name for name in names if name in PARTS]
+    parts = build_parts("rack_v106", {name: PARTS[name] for name in needed})
+    if "assembly" in names:
+        parts["assembly"] = make_assembly(parts)
+    return {name: parts[name] for name in names}
+
+def make_assembly(parts):
+    """Combines all parts into one compound for export."""
+
+    # Wrap main parts in colored Compounds AFTER moving them
+    # Tray is at (0,0,0)
+    # (Instances: a Compound re-parents its children, and a parented shape no longer exports on its own)
+    tray_colored = Compound(children=[instance(parts["tray"])], color=Color("dimgray"))
+    tray_colored.label = "Tray"
+
+    # Shelf needs to be moved, THEN colored
+    shelf_moved = instance(parts["shelf"], shelf_assembly_loc)
+    shelf_colored = Compound(children=[shelf_moved], color=Color("lightgray"))
+    shelf_colored.label = "Shelf"
+
+    # Spacers need to be moved, THEN colored
+    spacers_moved = instance(parts["spacers"], Location((0, -20, 0)))
+    spacers_colored = Compound(children=[spacers_moved], color=Color("white"))
+    spacers_colored.label = "Spacers"
+
+    # Assign labels to boards
+    dcdc_board, sata_board, pcie_card = (instance(parts[name]) for name in ("dcdc_board", "sata_board", "pcie_card"))
+    dcdc_board.label = "DC-DC Board"
+    sata_board.label = "SATA Board"
+    pcie_card.label = "PCIe Card"
+
+    assembly = Compound(children=[
+        tray_colored,
+        shelf_colored,
+        spacers_colored,
+        dcdc_board, # Already colored and at final location
+        sata_board, # Already colored and at final location
+        pcie_card   # Already colored and at final location
+    ])
+    assembly.label = "Rack Assembly"
+    return assembly
+
+def view_objects(parts):
+    """Returns what the viewer shows of the built parts: [(name, shape, color, alpha)]."""
     # Assembly View
     # Tray is at Z=0.
     # Shelf is at Z=floor_thickness + ... wait, SCAD placed shelf at Z=floor_thickness.
     # My make_shelf starts at Z=0 (bottom of legs).
     # So we translate shelf to sit on tray floor.
-    
-    shelf_assembly_loc = Location((sh_off_x, shelf_start_y, floor_thickness + leg_boss_height))
-    
+    placed = {
+        "tray": ("Tray", Location(), "lightgray", 1.0),
+        "shelf": ("Shelf", shelf_assembly_loc, "lightgray", 1.0),
+        "spacers": ("Spacers", Location((0, -20, 0)), "white", 1.0), # Move spacers out of the way
+        "dcdc_board": ("DC-DC", Location(), "red", 0.6), # Already at final location
+        "sata_board": ("SATA", Location(), "blue", 0.6), # Already at final location
+        "pcie_card": ("PCIe", Location(), "green", 0.6),
+    }
+    return [
+        (label, instance(parts[name], loc), color, alpha)
+        for name, (label, loc, color, alpha) in placed.items() if name in parts
+    ]
+
+def show_parts(parts):
+    """Sends the built parts to the ocp_vscode viewer."""
+    from ocp_vscode import show, set_port
+    set_port(3939)
+
+    objects = view_objects(parts)
+    prime_view(objects) # Meshes from the tessellation cache, see rack_meshcache.py
     show(
-        tray_part,
-        shelf_part.moved(shelf_assembly_loc),
-        spacers_part.moved(Location((0, -20, 0))), # Move spacers out of the way
-        dcdc_board, # Already at final location
-        sata_board, # Already at final location
-        pcie_card,
-        names=["Tray", "Shelf", "Spacers", "DC-DC", "SATA", "PCIe"],
-        colors=["lightgray", "lightgray", "white", "red", "blue", "green"],
-        alphas=[1.0, 1.0, 1.0, 0.6, 0.6, 0.6]
+        *[shape for _, shape, _, _ in objects],
+        names=[name for name, _, _, _ in objects],
+        colors=[color for _, _, color, _ in objects],
+        alphas=[alpha for _, _, _, alpha in objects],
     )
-except (ImportError, Exception) as e:
-    print(f"Visualization skipped: {e}")
+
+def main():
+    print("Generating Shelf, Tray, Spacers and Boards...")
+    parts = build()
+
+    # --- Export / Visualize ---
+    export_parts(parts, EXPORTS, params=design_params(globals()), design="rack_v106")
+
+    try:
+        show_parts(parts)
+    except (ImportError, Exception) as e:
+        print(f"Visualization skipped: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,15 @@
 from build123d import *
+from rack_cache import cached_part
+from rack_export import export_parts
+from rack_infill import plate_face
+from rack_instance import instance, instances
+from rack_layout import board, bounds, circle, cutout, rect, standoffs
+from rack_lod import BOARD_DETAIL, board_model
+from rack_manifest import design_params
+from rack_meshcache import prime_view
+from rack_parallel import build_parts
+from rack_pattern import circle_keepout, rect_keepout
+from rack_profile import stage
 
 # ==============================================================================
 # 10" Rack - V106 (Python / Build123d Edition)
@@ -6,8 +17,7 @@ from build123d import *
 # ==============================================================================
 
 # --- Parameters ---
-wall_thickness = 2
-floor_thickness = 2
+# (Each name is assigned once: `python rack.py deps v2 --check` reports duplicates)
 shelf_height = 35
 shelf_width = 190
 shelf_depth_len = 115
@@ -24,6 +34,7 @@ rack_width = 10 * 25.4 # 254.0 mm
 rack_inner_width = 195
 tray_height = 1.75 * 25.4 # 1U = 44.45 mm
 tray_depth = 200  # Reduced from 220 to minimize excess space beyond DC-DC board
+tray_wall_height = 10 # Reduced from 22mm as requested
 
 floor_thickness = 2
 wall_thickness = 1.6
@@ -56,176 +67,180 @@ sata_x, sata_y = dcdc_x + (dcdc_w - sata_real_w)/2, dcdc_y + (dcdc_d - sata_real
 # Bridge Dimensions
 bridge_height = 15  # Reduced to 15mm per user request
 bridge_leg_dia = 6  # Reduced from 8 to avoid crowding DC-DC
+# Bridge sits on DC-DC mounting holes (Rotated: 91.5 x 60), holds SATA board (50x70)
+bridge_dcdc_holes = (91.5, 60)
+bridge_sata_holes = (50, 70)
+
+# Bridge Plate Honeycomb (see rack_infill.py: `python rack.py infill v2` searches these)
+bridge_hex_radius = 9 # HexLocations radius: half the distance between cell centers
+bridge_hex_cell = 8.85 # Hexagon circumradius, 2.67mm walls (2 * 9 - sqrt(3) * 8.85)
+bridge_hex_counts = (8, 6)
+bridge_hex_shift = (0, 0) # Grid offset from the plate center
 
 # Shelf Leg Bosses (Countersunk Screws)
 leg_boss_height = 2.5
 screw_head_dia = 6.0 # Clearance for 5.5mm head
 screw_head_height = 3.5 # Clearance for 3.0mm head
 
+# Floor Honeycomb (see rack_infill.py: `python rack.py infill v2` searches these)
+floor_hex_radius = 16 # HexLocations radius: half the distance between cell centers (SCAD hole_r)
+floor_hex_cell = 14 # Hexagon circumradius, 7.75mm walls (2 * 16 - sqrt(3) * 14)
+floor_hex_counts = (10, 8)
+floor_hex_shift = (0, 0) # Grid offset from the floor center
+
 
 
 
 # --- Generators ---
 
-def make_bridge():
-    """Generates the minimalist bridge for the SATA board."""
-    # Bridge sits on DC-DC mounting holes (Rotated: 91.5 x 60)
-    # Holds SATA board (50x70)
-    
-    dcdc_hole_w = 91.5
-    dcdc_hole_d = 60
-    
-    sata_hole_w = 50
-    sata_hole_d = 70
-    
+def bridge_plate():
+    """Bridge plate honeycomb: outline, hex grid and solid regions (see rack_infill.py)."""
+    dcdc_hole_w, dcdc_hole_d = bridge_dcdc_holes
+    sata_hole_w, sata_hole_d = bridge_sata_holes
+
     # Bridge Plate Size
     plate_w = max(dcdc_hole_w, sata_hole_w) + 10
     plate_d = max(dcdc_hole_d, sata_hole_d) + 10
+    return {
+        # 1. Base Plate
+        "outer": (-plate_w/2, -plate_d/2, plate_w/2, plate_d/2),
+        # 2. Safe Zone (Inner Rectangle where hexes are allowed)
+        "safe": (-plate_w/2 + 6, -plate_d/2 + 6, plate_w/2 - 6, plate_d/2 - 6), # 6mm rim on all sides
+        # 3. Support Areas (must remain solid)
+        "keepouts": [
+            # Leg circles (around DC-DC mounting holes)
+            *[circle_keepout(x, y, 7) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]],
+            # SATA mounting circles (around SATA mounting holes)
+            *[circle_keepout(x, y, 7) for x in [-sata_hole_w/2, sata_hole_w/2] for y in [-sata_hole_d/2, sata_hole_d/2]],
+        ],
+        # 4. Hexagon Pattern (to be subtracted)
+        "center": (0, 0),
+        "thickness": 2, # Frame is 2mm thick
+        "hex": (bridge_hex_radius, bridge_hex_cell, bridge_hex_counts, bridge_hex_shift),
+        "params": ("bridge_hex_radius", "bridge_hex_cell", "bridge_hex_counts", "bridge_hex_shift"),
+    }
+
+@cached_part(
+    "bridge_height", "bridge_leg_dia", "bridge_dcdc_holes", "bridge_sata_holes",
+    "bridge_hex_radius", "bridge_hex_cell", "bridge_hex_counts", "bridge_hex_shift",
+)
+def make_bridge():
+    """Generates the minimalist bridge for the SATA board."""
+    dcdc_hole_w, dcdc_hole_d = bridge_dcdc_holes
+    sata_hole_w, sata_hole_d = bridge_sata_holes
+    plate = bridge_plate()
     
     with BuildPart() as bridge:
         # Build bottom-up: Start with frame at Z=0, legs extend downward
         
         # 1. Top Frame/Plate (at Z=0, this will be the reference point)
-        with BuildSketch(Plane.XY):
-            # 1. Base Plate
-            Rectangle(plate_w, plate_d)
-            
-            # 2. Hexagon Pattern (to be subtracted)
-            with BuildSketch(mode=Mode.PRIVATE) as sk_hex:
-                with HexLocations(radius=9, x_count=8, y_count=6):
-                    RegularPolygon(radius=8.85, side_count=6)  # Larger hexagons, ~0.3mm walls
-            
-            # 3. Safe Zone (Inner Rectangle where hexes are allowed)
-            with BuildSketch(mode=Mode.PRIVATE) as sk_safe:
-                Rectangle(plate_w - 12, plate_d - 12)  # 6mm rim on all sides
-                
-            # 4. Support Areas (must remain solid)
-            with BuildSketch(mode=Mode.PRIVATE) as sk_supports:
-                # Leg circles (around DC-DC mounting holes)
-                with Locations([(x, y) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
-                    Circle(radius=7)
-                # SATA mounting circles (around SATA mounting holes)
-                with Locations([(x, y) for x in [-sata_hole_w/2, sata_hole_w/2] for y in [-sata_hole_d/2, sata_hole_d/2]]):
-                    Circle(radius=7)
-
-            # 5. Combine to create the cutouts
-            # Cutouts = (Hexagons INTERSECT SafeZone) MINUS SupportAreas
-            cutouts = (sk_hex.sketch & sk_safe.sketch) - sk_supports.sketch
-            add(cutouts, mode=Mode.SUBTRACT)
-            
-        extrude(amount=2)  # Frame is 2mm thick
+        # Cutouts = (Hexagons INTERSECT SafeZone) MINUS SupportAreas, clipped in rack_pattern
+        with stage("bridge.hex"):
+            face = plate_face(plate)
+        with stage("bridge.extrude"):
+            extrude(face, amount=plate["thickness"])
         
         # 2. Legs extending DOWN from the frame
-        # Legs are at the DC-DC hole locations, extending down by bridge_height
-        with Locations([(x, y, 0) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
-            Cylinder(radius=bridge_leg_dia/2, height=bridge_height, align=(Align.CENTER, Align.CENTER, Align.MAX))
+        with stage("bridge.legs"):
+            # Legs are at the DC-DC hole locations, extending down by bridge_height
+            with Locations([(x, y, 0) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
+                Cylinder(radius=bridge_leg_dia/2, height=bridge_height, align=(Align.CENTER, Align.CENTER, Align.MAX))
 
         # 3. Holes
-        with BuildPart(mode=Mode.SUBTRACT):
-            # Leg Holes (through-holes for screws - only through LEGS, not frame top)
-            # 2.8mm holes for self-tapping into legs
-            with Locations([(x, y, -1) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
-                Cylinder(radius=2.8/2, height=bridge_height + 1, align=(Align.CENTER, Align.CENTER, Align.MAX))
+        with stage("bridge.holes"):
+            with BuildPart(mode=Mode.SUBTRACT):
+                # Leg Holes (through-holes for screws - only through LEGS, not frame top)
+                # 2.8mm holes for self-tapping into legs
+                with Locations([(x, y, -1) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
+                    Cylinder(radius=2.8/2, height=bridge_height + 1, align=(Align.CENTER, Align.CENTER, Align.MAX))
             
-            # SATA Mounting Holes (top of frame)
-            with Locations([(x, y, 2) for x in [-sata_hole_w/2, sata_hole_w/2] for y in [-sata_hole_d/2, sata_hole_d/2]]):
-                Cylinder(radius=2.8/2, height=5, align=(Align.CENTER, Align.CENTER, Align.MAX))
+                # SATA Mounting Holes (top of frame)
+                with Locations([(x, y, 2) for x in [-sata_hole_w/2, sata_hole_w/2] for y in [-sata_hole_d/2, sata_hole_d/2]]):
+                    Cylinder(radius=2.8/2, height=5, align=(Align.CENTER, Align.CENTER, Align.MAX))
 
     return bridge.part
 
+def tray_floor_keepouts():
+    """Floor regions the hex pattern must leave solid."""
+    return [
+        # PCIe Mount Island
+        # Island is on the Right side (where holes are), aligned with the holes.
+        rect_keepout(pcie_x + pcie_w - 20 - 5, pcie_y - 5, 20, pcie_d + 10),
+        # PCIe Support Beam
+        # Beam is on the Left side (connector side)
+        rect_keepout(pcie_x, pcie_y, 10, pcie_d),
+        # Leg Bases (Removed)
+    ]
+
+def tray_floor_plate():
+    """Tray floor honeycomb: outline, hex grid and solid regions (see rack_infill.py)."""
+    return {
+        # Outer Frame
+        "outer": (0, 0, rack_inner_width, tray_depth),
+        # Safe Area (Rectangle - Safe Border)
+        # SCAD: translate([safe_border, safe_border]) square([rack_inner_width - 2*safe_border, tray_depth - 2*safe_border])
+        "safe": (safe_border, safe_border, rack_inner_width - safe_border, tray_depth - safe_border),
+        # Solid Regions (Unions in SCAD become subtractions from the cutout mask)
+        "keepouts": tray_floor_keepouts(),
+        # Hex Grid
+        # SCAD: hole_r=16. apothem is distance to flat side.
+        # HexLocations radius (16) is the apothem, RegularPolygon radius (14) the circumradius.
+        # Centered horizontally and vertically
+        "center": (rack_inner_width/2, tray_depth/2),
+        "thickness": floor_thickness,
+        "hex": (floor_hex_radius, floor_hex_cell, floor_hex_counts, floor_hex_shift),
+        "params": ("floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift"),
+    }
+
+@cached_part(
+    "rack_inner_width", "tray_depth", "tray_height", "tray_wall_height", "safe_border", "floor_thickness", "wall_thickness",
+    "ear_thickness", "EPS", "dc_jack_dia", "screw_head_dia", "screw_head_height",
+    "pcie_x", "pcie_y", "pcie_w", "pcie_d", "pcie_offset_y", "pcie_hole_dist", "pcie_standoff_height",
+    "dcdc_x", "dcdc_y", "dcdc_w", "dcdc_d",
+    "floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift",
+)
 def make_tray():
     """Generates the main rack tray."""
     
     # 1. Floor Skeleton
     ear_w_total = (254 - rack_inner_width) / 2 # ~17mm
-    tray_wall_height = 10 # Reduced from 22mm as requested
     
     with BuildPart() as floor:
-        # Outer Frame
-        with BuildSketch() as sk_floor:
-            Rectangle(rack_inner_width, tray_depth, align=(Align.MIN, Align.MIN))
-            
-            # Hex Pattern Cutout
-            with BuildSketch(mode=Mode.SUBTRACT) as sk_hex:
-                # Intersection of Hex Grid and Safe Area
-                with BuildSketch() as sk_grid:
-                    # Hex Grid
-                    # SCAD: hole_r=16. apothem is distance to flat side.
-                    # build123d HexLocations uses circumradius by default.
-                    # If apothem=14, radius = 14 / cos(30) = 16.16
-                    # Align grid to center of tray depth (tray_depth/2 = 80)
-                    with Locations((rack_inner_width/2, tray_depth/2)): # Centered horizontally and vertically
-                        with HexLocations(radius=16, x_count=10, y_count=8):
-                            # Use RegularPolygon for Honeycomb (Hexagon)
-                            # radius=14 gives 2mm wall thickness (16-14=2)
-                            RegularPolygon(radius=14, side_count=6)
-                
-                with BuildSketch(mode=Mode.INTERSECT) as sk_safe:
-                    # Safe Area (Rectangle - Safe Border)
-                    # SCAD: translate([safe_border, safe_border]) square([rack_inner_width - 2*safe_border, tray_depth - 2*safe_border])
-                    # We need to center this rectangle relative to the floor sketch origin?
-                    # No, let's check floor sketch.
-                    # with BuildSketch() as sk_floor:
-                    #    Rectangle(rack_inner_width, tray_depth, align=(Align.CENTER, Align.MIN))
-                    # So X=0 is center, Y=0 is front.
-                    
-                    # Safe area should be inset by safe_border.
-                    # Rectangle centered at (rack_inner_width/2, tray_depth/2).
-                    with Locations((rack_inner_width/2, tray_depth/2)):
-                        Rectangle(rack_inner_width - 2*safe_border, tray_depth - 2*safe_border)
-                
-                # Subtract Solid Regions (Unions in SCAD become subtractions from the cutout mask)
-                # Wait, boolean logic: Floor = Rect - (HexGrid INTERSECT SafeZone MINUS SolidZones)
-                # Easier: Floor = Rect - HexGrid_Clipped.
-                # HexGrid_Clipped = (HexGrid & SafeZone) - SolidZones.
-                
-                with BuildSketch(mode=Mode.SUBTRACT) as sk_solids:
-                    # PCIe Mount Island
-                    with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5)):
-                         # Island is now on the Right side (where holes are)
-                         # Holes are at pcie_w - 7.4.
-                         # Island width 20.
-                         # Let's position island at pcie_w - 25 relative to pcie_x?
-                         # Holes X rel: 146.9.
-                         # Island X rel: 135?
-                         # Let's align with holes.
-                         Rectangle(20, pcie_d + 10, align=(Align.MIN, Align.MIN))
-                    
-                    # PCIe Support Beam
-                    # Beam is now on the Left side (connector side)
-                    with Locations((pcie_x, pcie_y)):
-                        Rectangle(10, pcie_d, align=(Align.MIN, Align.MIN))
-                    # Leg Bases (Removed)
-
-
-        extrude(amount=floor_thickness)
+        # Floor = Rect - ((HexGrid & SafeZone) - SolidZones)
+        # Clipped in rack_pattern first: only hexes touching a solid zone go through OCC,
+        # the result is a single face with the cells as holes.
+        with stage("tray.floor.hex"):
+            floor_face = plate_face(tray_floor_plate())
+        with stage("tray.floor.extrude"):
+            extrude(floor_face, amount=floor_thickness)
         
-        # Floor beneath ears (outside the main floor area)
-        # Left ear floor
-        with Locations((-ear_w_total, 0, 0)):
-            Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
-        # Right ear floor  
-        with Locations((rack_inner_width, 0, 0)):
-            Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
-
-        # 2. Frame Structure (Walls & Ears)
+        with stage("tray.walls"):
+            # Floor beneath ears (outside the main floor area)
+            # Left ear floor
+            with Locations((-ear_w_total, 0, 0)):
+                Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Right ear floor  
+            with Locations((rack_inner_width, 0, 0)):
+                Box(ear_w_total, ear_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+
+            # 2. Frame Structure (Walls & Ears)
         
-        # Faceplate - only inner width (ears have their own front)
-        with Locations((0, 0, 0)):
-            Box(rack_inner_width, ear_thickness, tray_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Faceplate - only inner width (ears have their own front)
+            with Locations((0, 0, 0)):
+                Box(rack_inner_width, ear_thickness, tray_height, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # Back Wall
-        with Locations((0, tray_depth - wall_thickness, 0)):
-            Box(rack_inner_width, wall_thickness, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
-
-        # Side Walls (Explicitly defined for symmetry)
-        # Left Wall
-        with Locations((-wall_thickness, 0, 0)):
-            Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Back Wall
+            with Locations((0, tray_depth - wall_thickness, 0)):
+                Box(rack_inner_width, wall_thickness, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+
+            # Side Walls (Explicitly defined for symmetry)
+            # Left Wall
+            with Locations((-wall_thickness, 0, 0)):
+                Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # Right Wall
-        with Locations((rack_inner_width, 0, 0)):
-            Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Right Wall
+            with Locations((rack_inner_width, 0, 0)):
+                Box(wall_thickness, tray_depth, tray_wall_height, align=(Align.MIN, Align.MIN, Align.MIN))
 
 
 
@@ -296,172 +311,176 @@ def make_tray():
 
 
         # Add Ears
-        add(Location((0, 0, 0)) * make_ear(mirror_x=False))
-        add(Location((rack_inner_width, 0, 0)) * make_ear(mirror_x=True))
+        with stage("tray.ears"):
+            add(Location((0, 0, 0)) * make_ear(mirror_x=False))
+            add(Location((rack_inner_width, 0, 0)) * make_ear(mirror_x=True))
         
 
 
         # Add Slopes (Explicit)
-        add(make_slope(is_right=False))
-        add(make_slope(is_right=True))
+        with stage("tray.slopes"):
+            add(make_slope(is_right=False))
+            add(make_slope(is_right=True))
 
         # 3. Additions (Mounts)
-        # PCIe Mount Island (Right side)
-        with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5, 0)):
-            Box(20, pcie_d + 10, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+        with stage("tray.mounts"):
+            # PCIe Mount Island (Right side)
+            with Locations((pcie_x + pcie_w - 20 - 5, pcie_y - 5, 0)):
+                Box(20, pcie_d + 10, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
             
-        # PCIe Support Beam (Left side)
-        with Locations((pcie_x, pcie_y, 0)):
-            Box(10, pcie_d, floor_thickness + pcie_standoff_height, align=(Align.MIN, Align.MIN, Align.MIN))
+            # PCIe Support Beam (Left side)
+            with Locations((pcie_x, pcie_y, 0)):
+                Box(10, pcie_d, floor_thickness + pcie_standoff_height, align=(Align.MIN, Align.MIN, Align.MIN))
         
-        # DC-DC Support Strips (2 strips along X direction for the 4 bosses)
-        # Creates solid floor support under DC-DC bosses to prevent floating in hexagons
-        dcdc_strip_width = 100.3  # Full width of DC-DC board
-        dcdc_strip_thickness = 10  # 10mm wide strips
+            # DC-DC Support Strips (2 strips along X direction for the 4 bosses)
+            # Creates solid floor support under DC-DC bosses to prevent floating in hexagons
+            dcdc_strip_width = 100.3  # Full width of DC-DC board
+            dcdc_strip_thickness = 10  # 10mm wide strips
         
-        # Front strip (for front 2 bosses)
-        with Locations((dcdc_x, dcdc_y + 4.25, 0)):  # 4.25 = offset to DC-DC front holes
-            Box(dcdc_strip_width, dcdc_strip_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Front strip (for front 2 bosses)
+            with Locations((dcdc_x, dcdc_y + 4.25, 0)):  # 4.25 = offset to DC-DC front holes
+                Box(dcdc_strip_width, dcdc_strip_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
         
-        # Rear strip (for rear 2 bosses)
-        with Locations((dcdc_x, dcdc_y + dcdc_d - dcdc_strip_thickness - 4.25, 0)):
-            Box(dcdc_strip_width, dcdc_strip_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
+            # Rear strip (for rear 2 bosses)
+            with Locations((dcdc_x, dcdc_y + dcdc_d - dcdc_strip_thickness - 4.25, 0)):
+                Box(dcdc_strip_width, dcdc_strip_thickness, floor_thickness, align=(Align.MIN, Align.MIN, Align.MIN))
         
-        # USB-C Socket Mount Bracket (Right rear corner) - REINFORCED
-        usbc_bracket_width = 35  # Large width for thick walls around hole
-        usbc_bracket_thickness = 10  # 10mm for socket mounting access
-        usbc_bracket_height = 25  # Height for vertical mount
-        usbc_hole_dia = 17  # 17mm for 15mm socket + 2mm clearance
-        usbc_hole_height = 18  # Center height
+            # USB-C Socket Mount Bracket (Right rear corner) - REINFORCED
+            usbc_bracket_width = 35  # Large width for thick walls around hole
+            usbc_bracket_thickness = 10  # 10mm for socket mounting access
+            usbc_bracket_height = 25  # Height for vertical mount
+            usbc_hole_dia = 17  # 17mm for 15mm socket + 2mm clearance
+            usbc_hole_height = 18  # Center height
         
-        # Bracket position: right edge of tray
-        usbc_x = rack_inner_width - usbc_bracket_width - 2
-        usbc_y = tray_depth - usbc_bracket_thickness
+            # Bracket position: right edge of tray
+            usbc_x = rack_inner_width - usbc_bracket_width - 2
+            usbc_y = tray_depth - usbc_bracket_thickness
         
-        # Main bracket body
-        with Locations((usbc_x, usbc_y, 0)):
-            Box(usbc_bracket_width, usbc_bracket_thickness, usbc_bracket_height, 
-                align=(Align.MIN, Align.MIN, Align.MIN))
+            # Main bracket body
+            with Locations((usbc_x, usbc_y, 0)):
+                Box(usbc_bracket_width, usbc_bracket_thickness, usbc_bracket_height, 
+                    align=(Align.MIN, Align.MIN, Align.MIN))
         
-        # Top cap (thicker for strength)
-        cap_thickness = 5  # 5mm thick cap for strength
-        with Locations((usbc_x, usbc_y, usbc_bracket_height)):
-            Box(usbc_bracket_width, usbc_bracket_thickness, cap_thickness, 
-                align=(Align.MIN, Align.MIN, Align.MIN))
+            # Top cap (thicker for strength)
+            cap_thickness = 5  # 5mm thick cap for strength
+            with Locations((usbc_x, usbc_y, usbc_bracket_height)):
+                Box(usbc_bracket_width, usbc_bracket_thickness, cap_thickness, 
+                    align=(Align.MIN, Align.MIN, Align.MIN))
         
-        # USB-C hole through the bracket
-        with BuildPart(mode=Mode.SUBTRACT):
-            # Hole centered in bracket, long enough to go through completely
-            hole_y_center = usbc_y + usbc_bracket_thickness/2
-            with Locations((usbc_x + usbc_bracket_width/2, hole_y_center, usbc_hole_height)):
-                with Locations(Rotation(90, 0, 0)):  # Horizontal hole facing rear
-                    Cylinder(radius=usbc_hole_dia/2, height=usbc_bracket_thickness + 5, 
-                           align=(Align.CENTER, Align.CENTER, Align.CENTER))
+            # USB-C hole through the bracket
+            with BuildPart(mode=Mode.SUBTRACT):
+                # Hole centered in bracket, long enough to go through completely
+                hole_y_center = usbc_y + usbc_bracket_thickness/2
+                with Locations((usbc_x + usbc_bracket_width/2, hole_y_center, usbc_hole_height)):
+                    with Locations(Rotation(90, 0, 0)):  # Horizontal hole facing rear
+                        Cylinder(radius=usbc_hole_dia/2, height=usbc_bracket_thickness + 5, 
+                               align=(Align.CENTER, Align.CENTER, Align.CENTER))
         
-        # Leg Bases (Removed)
-
-        # Helper: Add Bosses
-        def add_bosses(x, y, w, d, offset):
-            locs = [
-                (x + offset, y + offset),
-                (x + w - offset, y + offset),
-                (x + offset, y + d - offset),
-                (x + w - offset, y + d - offset)
-            ]
-            with BuildSketch(Plane.XY.offset(floor_thickness)) as sk:
-                with Locations(locs):
-                    Circle(radius=4)
-            extrude(sk.sketch, amount=2.5) # 2.5mm boss height
-
-        # DC-DC Bosses (Rotated: 91.5 x 60)
-        dcdc_hole_w = 91.5
-        dcdc_hole_d = 60
-        dcdc_hole_x = dcdc_x + (dcdc_w - dcdc_hole_w) / 2
-        dcdc_hole_y = dcdc_y + (dcdc_d - dcdc_hole_d) / 2
-        add_bosses(dcdc_hole_x, dcdc_hole_y, dcdc_hole_w, dcdc_hole_d, 0)
-        
-        # SATA Bosses (Removed - SATA is on Bridge)
-        # sata_hole_w = 50
-        # sata_hole_d = 70
-        # sata_hole_x = sata_x + (sata_real_w - sata_hole_w) / 2
-        # sata_hole_y = sata_y + (sata_real_d - sata_hole_d) / 2
-        # add_bosses(sata_hole_x, sata_hole_y, sata_hole_w, sata_hole_d, 0)
-
-        # PCIe Standoffs (NOW IN CORRECT SCOPE!)
-        standoff_x = pcie_x + pcie_w - 7.4
-        standoff_y1 = pcie_y + pcie_offset_y
-        standoff_y2 = standoff_y1 + pcie_hole_dist
-        print(f"PCIe Standoffs: X={standoff_x:.2f}, Y1={standoff_y1:.2f}, Y2={standoff_y2:.2f}")
-        
-        with Locations((standoff_x, standoff_y1, floor_thickness - EPS)):
-            Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
-            with Locations((0, pcie_hole_dist, 0)):
-                Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+            # Leg Bases (Removed)
 
-        # 4. Subtractions (Holes)
-        with BuildPart(mode=Mode.SUBTRACT):
-            # Helper: Add Mount Holes
-            def add_mount_holes(x, y, w, d, offset):
+            # Helper: Add Bosses
+            def add_bosses(x, y, w, d, offset):
                 locs = [
                     (x + offset, y + offset),
                     (x + w - offset, y + offset),
                     (x + offset, y + d - offset),
                     (x + w - offset, y + d - offset)
                 ]
-                with Locations(locs):
-                    Cylinder(radius=1.4, height=50, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-            # Rack Slots (Horizontal, Rounded)
-            # Standard 10" rack hole spacing is approx 236.5mm center-to-center
-            # (Derived from previous values: 220 + 8.25 - (-8.25) = 236.5)
-            hole_spacing = 236.5
-            center_x = rack_inner_width / 2
+                with BuildSketch(Plane.XY.offset(floor_thickness)) as sk:
+                    with Locations(locs):
+                        Circle(radius=4)
+                extrude(sk.sketch, amount=2.5) # 2.5mm boss height
+
+            # DC-DC Bosses (Rotated: 91.5 x 60)
+            dcdc_hole_w = 91.5
+            dcdc_hole_d = 60
+            dcdc_hole_x = dcdc_x + (dcdc_w - dcdc_hole_w) / 2
+            dcdc_hole_y = dcdc_y + (dcdc_d - dcdc_hole_d) / 2
+            add_bosses(dcdc_hole_x, dcdc_hole_y, dcdc_hole_w, dcdc_hole_d, 0)
+        
+            # SATA Bosses (Removed - SATA is on Bridge)
+            # sata_hole_w = 50
+            # sata_hole_d = 70
+            # sata_hole_x = sata_x + (sata_real_w - sata_hole_w) / 2
+            # sata_hole_y = sata_y + (sata_real_d - sata_hole_d) / 2
+            # add_bosses(sata_hole_x, sata_hole_y, sata_hole_w, sata_hole_d, 0)
+
+            # PCIe Standoffs (NOW IN CORRECT SCOPE!)
+            standoff_x = pcie_x + pcie_w - 7.4
+            standoff_y1 = pcie_y + pcie_offset_y
+            standoff_y2 = standoff_y1 + pcie_hole_dist
+            print(f"PCIe Standoffs: X={standoff_x:.2f}, Y1={standoff_y1:.2f}, Y2={standoff_y2:.2f}")
+        
+            with Locations((standoff_x, standoff_y1, floor_thickness - EPS)):
+                Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+                with Locations((0, pcie_hole_dist, 0)):
+                    Cylinder(radius=4, height=pcie_standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+
+        # 4. Subtractions (Holes)
+        with stage("tray.subtract.slots"):
+            with BuildPart(mode=Mode.SUBTRACT):
+                # Helper: Add Mount Holes
+                def add_mount_holes(x, y, w, d, offset):
+                    locs = [
+                        (x + offset, y + offset),
+                        (x + w - offset, y + offset),
+                        (x + offset, y + d - offset),
+                        (x + w - offset, y + d - offset)
+                    ]
+                    with Locations(locs):
+                        Cylinder(radius=1.4, height=50, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+                # Rack Slots (Horizontal, Rounded)
+                # Standard 10" rack hole spacing is approx 236.5mm center-to-center
+                # (Derived from previous values: 220 + 8.25 - (-8.25) = 236.5)
+                hole_spacing = 236.5
+                center_x = rack_inner_width / 2
             
-            x_left = center_x - hole_spacing / 2
-            x_right = center_x + hole_spacing / 2
+                x_left = center_x - hole_spacing / 2
+                x_right = center_x + hole_spacing / 2
             
-            # Z positions
-            z_bottom = 7.225
-            z_top = 37.225
+                # Z positions
+                z_bottom = 7.225
+                z_top = 37.225
             
-            for x in [x_left, x_right]:
-                for z in [z_bottom, z_top]:
-                    # Rounded slot: 12mm wide, 7mm high
-                    # Use Box + Fillet for robustness
-                    with Locations((x, ear_thickness/2, z)):
-                        # Create box centered at location
-                        b = Box(12, 20, 7, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-                        # Fillet the edges along Y axis (the cutting direction)
-                        # Radius 3.5mm makes the 7mm height fully rounded (semicircle ends)
-                        fillet(b.edges().filter_by(Axis.Y), radius=3.49) # Use slightly less than 3.5 to avoid geometric singularities
-
-            # DC Jack
-            with Locations((15, tray_depth + 5, 8)):
-                with Locations(Rotation(90, 0, 0)):
-                    Cylinder(radius=dc_jack_dia/2, height=10)
-
-            # PCIe Holes (Right side)
-            with Locations((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y, -10)):
-                Cylinder(radius=1.4, height=50)
-                with Locations((0, pcie_hole_dist, 0)):
+                for x in [x_left, x_right]:
+                    for z in [z_bottom, z_top]:
+                        # Rounded slot: 12mm wide, 7mm high
+                        # Use Box + Fillet for robustness
+                        with Locations((x, ear_thickness/2, z)):
+                            # Create box centered at location
+                            b = Box(12, 20, 7, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+                            # Fillet the edges along Y axis (the cutting direction)
+                            # Radius 3.5mm makes the 7mm height fully rounded (semicircle ends)
+                            fillet(b.edges().filter_by(Axis.Y), radius=3.49) # Use slightly less than 3.5 to avoid geometric singularities
+
+                # DC Jack
+                with Locations((15, tray_depth + 5, 8)):
+                    with Locations(Rotation(90, 0, 0)):
+                        Cylinder(radius=dc_jack_dia/2, height=10)
+
+                # PCIe Holes (Right side)
+                with Locations((pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y, -10)):
                     Cylinder(radius=1.4, height=50)
+                    with Locations((0, pcie_hole_dist, 0)):
+                        Cylinder(radius=1.4, height=50)
 
-            # DC-DC Holes (3mm with countersink for M3 screws, like v106)\n            dcdc_hole_w = 91.5
-            dcdc_hole_d = 60
-            dcdc_hole_x = dcdc_x + (dcdc_w - dcdc_hole_w) / 2
-            dcdc_hole_y = dcdc_y + (dcdc_d - dcdc_hole_d) / 2
+                # DC-DC Holes (3mm with countersink for M3 screws, like v106)\n            dcdc_hole_w = 91.5
+                dcdc_hole_d = 60
+                dcdc_hole_x = dcdc_x + (dcdc_w - dcdc_hole_w) / 2
+                dcdc_hole_y = dcdc_y + (dcdc_d - dcdc_hole_d) / 2
             
-            # 4 corners: countersink from BOTTOM like v106
-            with Locations([(dcdc_hole_x, dcdc_hole_y), 
-                           (dcdc_hole_x + dcdc_hole_w, dcdc_hole_y),
-                           (dcdc_hole_x, dcdc_hole_y + dcdc_hole_d),
-                           (dcdc_hole_x + dcdc_hole_w, dcdc_hole_y + dcdc_hole_d)]):
-                # Through hole (3mm for M3)
-                with Locations((0, 0, -10)):
-                    Cylinder(radius=3.0/2, height=50, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-                # Countersink from bottom (starts at Z=0, goes up)
-                Cylinder(radius=screw_head_dia/2, height=screw_head_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
-            # SATA Holes (Removed - SATA is on Bridge)
-            # add_mount_holes(sata_hole_x, sata_hole_y, sata_hole_w, sata_hole_d, 0)
+                # 4 corners: countersink from BOTTOM like v106
+                with Locations([(dcdc_hole_x, dcdc_hole_y), 
+                               (dcdc_hole_x + dcdc_hole_w, dcdc_hole_y),
+                               (dcdc_hole_x, dcdc_hole_y + dcdc_hole_d),
+                               (dcdc_hole_x + dcdc_hole_w, dcdc_hole_y + dcdc_hole_d)]):
+                    # Through hole (3mm for M3)
+                    with Locations((0, 0, -10)):
+                        Cylinder(radius=3.0/2, height=50, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+                    # Countersink from bottom (starts at Z=0, goes up)
+                    Cylinder(radius=screw_head_dia/2, height=screw_head_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+                # SATA Holes (Removed - SATA is on Bridge)
+                # add_mount_holes(sata_hole_x, sata_hole_y, sata_hole_w, sata_hole_d, 0)
 
 
     # 3. Combine Floor and Walls
@@ -518,60 +537,31 @@ def make_tray():
     
     return floor.part
 
+@cached_part()
 def make_spacers():
-    with BuildPart() as spacers:
-        with Locations([ (i*12, 0, 0) for i in range(8) ]):
-            Cylinder(radius=3.5, height=4, align=(Align.CENTER, Align.CENTER, Align.MIN))
-        
-        with BuildPart(mode=Mode.SUBTRACT):
-             with Locations([ (i*12, 0, 0) for i in range(8) ]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER))
-    return spacers.part
-
-# --- Build Everything ---
-
-print("Generating Bridge...")
-bridge_part = make_bridge()
+    # One spacer, placed 8 times (instances share its geometry, see rack_instance.py)
+    with BuildPart() as spacer:
+        Cylinder(radius=3.5, height=4, align=(Align.CENTER, Align.CENTER, Align.MIN))
+        Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+    return Compound(children=instances(spacer.part, [Location((i*12, 0, 0)) for i in range(8)]))
 
+# --- Board Models ---
 
-print("Generating Tray...")
-tray_part = make_tray()
-
-print("Generating Spacers...")
-spacers_part = make_spacers()
-
-# --- Visualization Objects ---
-
-# --- Detailed Board Models ---
-
-# --- Detailed Board Models ---
-
-def make_dcdc_board(location=Location((0,0,0))):
-    """Generates the DC-DC board with colors at a specific location."""
-    parts = []
-    
-    # Helper to add colored part
-    def add_part(geom, color, loc):
-        # Apply the board's global location to the component's local location
-        final_loc = location * loc
-        parts.append(Compound(children=[geom], color=color).moved(final_loc))
-        # Note: We move the Compound after creation? 
-        # If .moved() strips color, this is bad.
-        # We should move the geometry, THEN wrap.
-        # geom.moved(final_loc) -> Wrapped in Compound(color).
+def make_dcdc_board(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the DC-DC board at a specific location, ghost or detailed (see rack_lod.py)."""
+    parts = [] # (geometry, color, location on the board)
     
-    # Re-defining helper to be safe
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
 
     # PCB (Black)
     with BuildPart() as pcb:
         Box(dcdc_w, dcdc_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
-        with Locations((dcdc_w/2, dcdc_d/2, 0)):
-            # Holes at 60x91.5 spacing
-            with Locations([(x, y) for x in [-30, 30] for y in [-45.75, 45.75]]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+        if detail == "detailed": # Mounting holes, the ghost is just the PCB box
+            with Locations((dcdc_w/2, dcdc_d/2, 0)):
+                # Holes at 60x91.5 spacing
+                with Locations([(x, y) for x in [-30, 30] for y in [-45.75, 45.75]]):
+                    Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
     
     add_colored(pcb.part, Color("black"), Location((0,0,0)))
     
@@ -597,23 +587,23 @@ def make_dcdc_board(location=Location((0,0,0))):
     for i in range(4):
         add_colored(term_geom, Color("green"), Location((20 + i*20, 10, z_top)))
                 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
-def make_sata_board(location=Location((0,0,0))):
-    """Generates the SATA/Power board with colors at a specific location."""
-    parts = []
+def make_sata_board(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the SATA/Power board at a specific location, ghost or detailed."""
+    parts = [] # (geometry, color, location on the board)
     
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
     
     # PCB (Black)
     with BuildPart() as pcb:
         Box(sata_real_w, sata_real_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
-        with Locations((sata_real_w/2, sata_real_d/2, 0)):
-            # Holes at 50x70 spacing
-            with Locations([(x, y) for x in [-25, 25] for y in [-35, 35]]):
-                Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
+        if detail == "detailed": # Mounting holes, the ghost is just the PCB box
+            with Locations((sata_real_w/2, sata_real_d/2, 0)):
+                # Holes at 50x70 spacing
+                with Locations([(x, y) for x in [-25, 25] for y in [-35, 35]]):
+                    Cylinder(radius=1.6, height=10, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.SUBTRACT)
 
     add_colored(pcb.part, Color("black"), Location((0,0,0)))
     
@@ -633,15 +623,14 @@ def make_sata_board(location=Location((0,0,0))):
     for x in [10, 30]:
         add_colored(cap_geom, Color("silver"), Location((x, 50, z_top)))
 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
-def make_pcie_card(location=Location((0,0,0))):
-    """Generates the PCIe to SATA card with colors at a specific location."""
-    parts = []
+def make_pcie_card(location=Location((0,0,0)), detail=BOARD_DETAIL):
+    """Generates the PCIe to SATA card at a specific location, ghost or detailed."""
+    parts = [] # (geometry, color, location on the board)
     
     def add_colored(geom, color, local_loc):
-        final_loc = location * local_loc
-        parts.append(Compound(children=[geom.moved(final_loc)], color=color))
+        parts.append((geom, color, local_loc))
     
     # PCB (Black)
     pcb_geom = Box(pcie_w, pcie_d, 1.6, align=(Align.MIN, Align.MIN, Align.MIN))
@@ -673,7 +662,7 @@ def make_pcie_card(location=Location((0,0,0))):
     bracket_geom = Box(2, pcie_d + 20, 12, align=(Align.MIN, Align.CENTER, Align.CENTER))
     add_colored(bracket_geom, Color("white"), Location((0, pcie_d/2, 0)))
 
-    return Compound(children=parts)
+    return board_model(parts, location, detail)
 
 # --- Visualization Objects ---
 
@@ -701,85 +690,175 @@ dcdc_loc = Location((dcdc_x, dcdc_y, dcdc_z))
 sata_loc = Location((sata_x, sata_y, sata_z))
 pcie_loc = Location((pcie_x, pcie_y, floor_thickness + pcie_standoff_height))
 
+# Board models: "ghost" (one solid per board) or "detailed" (colored components), see rack_lod.py
+board_detail = BOARD_DETAIL
+
+# --- Layout Preview ---
+
+def layout():
+    """Top view of the tray for `python rack.py layout v2`, mirroring the generators above (rack_layout.py)."""
+    pcie_z = floor_thickness + pcie_standoff_height
+    bridge_cx, bridge_cy = dcdc_x + dcdc_w/2, dcdc_y + dcdc_d/2 # bridge_loc
+    bridge_w, bridge_d = max(bridge_dcdc_holes[0], bridge_sata_holes[0]) + 10, max(bridge_dcdc_holes[1], bridge_sata_holes[1]) + 10
+    # USB-C bracket, as placed in make_tray (35 x 10, 25 high plus a 5mm cap, 17mm hole 18mm up)
+    usbc_x, usbc_y = rack_inner_width - 35 - 2, tray_depth - 10
+    return [
+        bounds("Tray", 0, ear_thickness, rack_inner_width, tray_depth - wall_thickness - ear_thickness, wall_thickness, (0, tray_height)),
+
+        # Tray: DC-DC bosses, PCIe support beam and standoffs, USB-C bracket, DC jack
+        *standoffs("DC-DC boss", bridge_cx, bridge_cy, 91.5, 60, 4, (floor_thickness, dcdc_z), "Tray"),
+        rect("bracket", "PCIe beam", pcie_x, pcie_y, 10, pcie_d, (0, pcie_z), "Tray"),
+        *[circle("standoff", f"PCIe standoff {i}", pcie_x + pcie_w - 7.4, pcie_y + pcie_offset_y + dy, 4, (floor_thickness, pcie_z), "Tray")
+          for i, dy in enumerate([0, pcie_hole_dist], 1)],
+        rect("bracket", "USB-C bracket", usbc_x, usbc_y, 35, 10, (0, 25 + 5), "Tray"),
+        cutout("USB-C hole", "back", usbc_x + 35/2 - 17/2, usbc_y + 10/2 - 15/2, 17, 15, (18 - 17/2, 18 + 17/2), "Tray"),
+        cutout("DC jack", "back", 15 - dc_jack_dia/2, tray_depth, dc_jack_dia, 10, (8 - dc_jack_dia/2, 8 + dc_jack_dia/2), "Tray"),
+
+        # PCIe card: heatsink, SATA ports on the right, bracket on the left
+        *board("PCIe", pcie_x, pcie_y, pcie_w, pcie_d, pcie_z, 1.6, [
+            ("heatsink", pcie_w/2 - 20, pcie_d/2 - 20, 40, 40, 10),
+            *[(f"SATA port {i + 1}", pcie_w - 10 - 15/2, 10 + i*12 - 10/2, 15, 10, 8) for i in range(5)],
+        ]),
+        rect("component", "PCIe bracket", pcie_x, pcie_y - 10, 2, pcie_d + 20, (pcie_z - 6, pcie_z + 6), "PCIe"),
+
+        # DC-DC on the tray bosses
+        *board("DC-DC", dcdc_x, dcdc_y, dcdc_w, dcdc_d, dcdc_z, 1.6, [
+            *[(f"inductor {i + 1}", 20 + i*20 - 5, 30 - 5, 10, 10, 8) for i in range(4)],
+            *[(f"capacitor {i + 1}", 20 + i*20 - 4, 50 - 4, 8, 8, 10) for i in range(4)],
+            *[(f"terminal {i + 1}", 20 + i*20 - 6, 10 - 5, 12, 10, 10) for i in range(4)],
+        ]),
+
+        # Bridge over the DC-DC: legs on its mounting holes, plate carrying the SATA board
+        *standoffs("Bridge leg", bridge_cx, bridge_cy, *bridge_dcdc_holes, bridge_leg_dia/2, (bridge_frame_z - bridge_height, bridge_frame_z), "Bridge"),
+        rect("shelf", "Bridge plate", bridge_cx - bridge_w/2, bridge_cy - bridge_d/2, bridge_w, bridge_d, (bridge_frame_z, sata_z), "Bridge"),
+        *board("SATA", sata_x, sata_y, sata_real_w, sata_real_d, sata_z, 1.6, [
+            *[(f"connector {i + 1}", x - 15/2, 5, 15, 10, 15) for i, x in enumerate([10, 30])],
+            ("inductor", sata_real_w/2 - 6, sata_real_d/2 - 6, 12, 12, 8),
+            *[(f"capacitor {i + 1}", x - 4, 50 - 4, 8, 8, 10) for i, x in enumerate([10, 30])],
+        ]),
+    ]
 
-# Create boards at their FINAL locations
-dcdc_board = make_dcdc_board(dcdc_loc)
-sata_board = make_sata_board(sata_loc)
-pcie_card = make_pcie_card(pcie_loc)
-pcie_bracket = Part() # Included in make_pcie_card now
-
-
-# --- Export / Visualize ---
-
-# Export Bridge (Primary Artifact)
-export_step(bridge_part, "rack_v2_bridge.step")
-print("Exported rack_v2_bridge.step")
-
-# Export Tray
-export_step(tray_part, "rack_v2_tray.step")
-print("Exported rack_v2_tray.step")
-
-# Export to STL
-export_stl(tray_part, "rack_v2_tray.stl")
-print("Exported rack_v2_tray.stl")
-
-export_stl(bridge_part, "rack_v2_bridge.stl")
-print("Exported rack_v2_bridge.stl")
-
-
-export_stl(spacers_part, "rack_v106_spacers.stl")
-print("Exported rack_v106_spacers.stl")
-
-# Export Full Assembly (STEP)
-# Combine all parts into one compound for export
-
-# Wrap main parts in colored Compounds AFTER moving them
-# Tray is at (0,0,0)
-tray_colored = Compound(children=[tray_part], color=Color("dimgray"))
-tray_colored.label = "Tray"
+# --- Build Everything ---
 
-# Bridge
-bridge_colored = Compound(children=[bridge_part.moved(bridge_loc)], color=Color("lightgray"))
-bridge_colored.label = "Bridge"
+# Part name -> (generator, *arg globals), see rack_parallel.build_parts.
+# Boards are created at their FINAL locations.
+PARTS = {
+    "tray": ("make_tray",), # Slowest part, submit first
+    "bridge": ("make_bridge",),
+    "spacers": ("make_spacers",),
+    "dcdc_board": ("make_dcdc_board", "dcdc_loc", "board_detail"),
+    "sata_board": ("make_sata_board", "sata_loc", "board_detail"),
+    "pcie_card": ("make_pcie_card", "pcie_loc", "board_detail"),
+}
+# Honeycomb plate name -> plate function, see rack_infill.py
+HONEYCOMBS = {
+    "tray_floor": "tray_floor_plate",
+    "bridge_plate": "bridge_plate",
+}
+
+# "assembly" combines all of PARTS
+PART_NAMES = [*PARTS, "assembly"]
+
+# (part, file name), see rack_export.export_parts
+EXPORTS = [
+    # Export Bridge (Primary Artifact)
+    ("bridge", "rack_v2_bridge.step"),
+    # Export Tray
+    ("tray", "rack_v2_tray.step"),
+    # Export to STL
+    ("tray", "rack_v2_tray.stl"),
+    ("bridge", "rack_v2_bridge.stl"),
+    ("spacers", "rack_v106_spacers.stl"),
+    # Export Full Assembly (STEP)
+    ("assembly", "rack_v2_assembly.step"),
+]
+
+def build(names=None):
+    """Builds the named parts (default: all) and returns {name: shape}."""
+    names = PART_NAMES if names is None else names
+    needed = list(PARTS) if "assembly" in names else [name for name in names if name in PARTS]
+    parts = build_parts("rack_v2", {name: PARTS[name] for name in needed})
+    if "assembly" in names:
+        parts["assembly"] = make_assembly(parts)
+    return {name: parts[name] for name in names}
+
+def make_assembly(parts):
+    """Combines all parts into one compound for export."""
+
+    # Wrap main parts in colored Compounds AFTER moving them
+    # Tray is at (0,0,0)
+    # (Instances: a Compound re-parents its children, and a parented shape no longer exports on its own)
+    tray_colored = Compound(children=[instance(parts["tray"])], color=Color("dimgray"))
+    tray_colored.label = "Tray"
+
+    # Bridge
+    bridge_colored = Compound(children=[instance(parts["bridge"], bridge_loc)], color=Color("lightgray"))
+    bridge_colored.label = "Bridge"
+
+
+    # Spacers need to be moved, THEN colored
+    spacers_moved = instance(parts["spacers"], Location((0, -20, 0)))
+    spacers_colored = Compound(children=[spacers_moved], color=Color("white"))
+    spacers_colored.label = "Spacers"
+
+    # Assign labels to boards
+    dcdc_board, sata_board, pcie_card = (instance(parts[name]) for name in ("dcdc_board", "sata_board", "pcie_card"))
+    dcdc_board.label = "DC-DC Board"
+    sata_board.label = "SATA Board"
+    pcie_card.label = "PCIe Card"
+
+    assembly = Compound(children=[
+        tray_colored,
+        bridge_colored,
+        spacers_colored,
+        dcdc_board, # Already colored and at final location
+        sata_board, # Already colored and at final location
+        pcie_card   # Already colored and at final location
+    ])
+    assembly.label = "Rack Assembly V2"
+    return assembly
+
+def view_objects(parts):
+    """Returns what the viewer shows of the built parts: [(name, shape, color, alpha)]."""
+    # Assembly View
+    placed = {
+        "tray": ("Tray", Location(), "lightgray", 1.0),
+        "bridge": ("Bridge", bridge_loc, "lightgray", 1.0),
+        "spacers": ("Spacers", Location((0, -20, 0)), "white", 1.0), # Move spacers out of the way
+        "dcdc_board": ("DC-DC", Location(), "red", 0.6), # Already at final location
+        "sata_board": ("SATA", Location(), "blue", 0.6), # Already at final location
+        "pcie_card": ("PCIe", Location(), "green", 0.6),
+    }
+    return [
+        (label, instance(parts[name], loc), color, alpha)
+        for name, (label, loc, color, alpha) in placed.items() if name in parts
+    ]
+
+def show_parts(parts):
+    """Sends the built parts to the ocp_vscode viewer."""
+    from ocp_vscode import show, set_port
+    set_port(3939)
 
+    objects = view_objects(parts)
+    prime_view(objects) # Meshes from the tessellation cache, see rack_meshcache.py
+    show(
+        *[shape for _, shape, _, _ in objects],
+        names=[name for name, _, _, _ in objects],
+        colors=[color for _, _, color, _ in objects],
+        alphas=[alpha for _, _, _, alpha in objects],
+    )
 
-# Spacers need to be moved, THEN colored
-spacers_moved = spacers_part.moved(Location((0, -20, 0)))
-spacers_colored = Compound(children=[spacers_moved], color=Color("white"))
-spacers_colored.label = "Spacers"
+def main():
+    print("Generating Bridge, Tray, Spacers and Boards...")
+    parts = build()
 
-# Assign labels to boards
-dcdc_board.label = "DC-DC Board"
-sata_board.label = "SATA Board"
-pcie_card.label = "PCIe Card"
+    # --- Export / Visualize ---
+    export_parts(parts, EXPORTS, params=design_params(globals()), design="rack_v2")
 
-assembly = Compound(children=[
-    tray_colored,
-    bridge_colored,
-    spacers_colored,
-    dcdc_board, # Already colored and at final location
-    sata_board, # Already colored and at final location
-    pcie_card   # Already colored and at final location
-])
-assembly.label = "Rack Assembly V2"
-export_step(assembly, "rack_v2_assembly.step")
-print("Exported rack_v2_assembly.step")
+    try:
+        show_parts(parts)
+    except (ImportError, Exception) as e:
+        print(f"Visualization skipped: {e}")
 
-try:
-    from ocp_vscode import show, show_object, set_port, set_defaults
-    set_port(3939)
-    
-    # Assembly View
-    show(
-        tray_part,
-        bridge_part.moved(bridge_loc),
-        spacers_part.moved(Location((0, -20, 0))), # Move spacers out of the way
-        dcdc_board, # Already at final location
-        sata_board, # Already at final location
-        pcie_card,
-        names=["Tray", "Bridge", "Spacers", "DC-DC", "SATA", "PCIe"],
-        colors=["lightgray", "lightgray", "white", "red", "blue", "green"],
-        alphas=[1.0, 1.0, 1.0, 0.6, 0.6, 0.6]
-    )
-except (ImportError, Exception) as e:
-    print(f"Visualization skipped: {e}")
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import logging
 from build123d import *
-from ocp_vscode import *
-
-# Logging setup
-logging.basicConfig(level=logging.INFO)
+from rack_boolean import batched_cut, subtract
+from rack_cache import cached_part
+from rack_export import export_parts
+from rack_infill import plate_face
+from rack_cutouts import connector_boxes, opening_rect, wall_cutters, wall_openings
+from rack_layout import board, bounds, cutout, keepout, rect, standoffs
+from rack_lod import BOARD_DETAIL, ghost_solid
+from rack_manifest import design_params
+from rack_meshcache import prime_view
+from rack_pattern import circle_keepout, rect_keepout
+from rack_profile import stage
+
+# Logging setup (basicConfig in main(), importing stays quiet)
 logger = logging.getLogger(__name__)
 
 # --- Dimensions & Constants ---
@@ -39,11 +48,34 @@ usbc_bracket_height = 30 # Increased to match hole
 usbc_hole_dia = 17
 usbc_hole_height = 22 # Raised from 18
 
+# Connectors: (label, u, v, w, d, height) on top of each PCB, in board
+# coordinates before rotation. The ghosts are built from these, and so are the
+# wall cutouts: every connector within cutout_reach of a wall gets an opening,
+# cutout_margin larger all round (rack_cutouts.py).
+dcdc_terminals = [(f"terminal {i + 1}", 10 + i*22, 0, 15, 10, 10) for i in range(4)] # Back edge (after rotation)
+sata_connectors = [
+    *[(f"connector {i + 1}", sata_board_w - 10, y, 10, 25, 12) for i, y in enumerate([25, 55])], # Large Molex, right edge
+    ("DC jack", 15, 0, 12, 14, 10), # Front edge, 35mm in from the front wall: no cutout
+]
+m2_connectors = [("plug", 0, 0, 10, m2_pcb_w, 8)] # Cable end of the adapter (approx), left edge
+cutout_margin = 3
+cutout_reach = 10
+
 # Standoffs
 standoff_height = 5
 standoff_radius = 3.5
 screw_hole_radius = 1.4 # M3 pilot
 
+# Floor Honeycomb (see rack_infill.py: `python rack.py infill v3` searches these)
+# Increased radius for larger holes (less plastic), counts adjusted for larger hexes
+floor_hex_radius = 12 # HexLocations radius: half the distance between cell centers
+floor_hex_cell = 11 # Hexagon circumradius, 4.95mm walls (2 * 12 - sqrt(3) * 11)
+floor_hex_counts = (14, 10)
+floor_hex_shift = (0, 0) # Grid offset from the floor center
+
+# Board ghosts: "ghost" (one solid per board) or "detailed" (PCB and connectors), see rack_lod.py
+board_detail = BOARD_DETAIL
+
 # --- Layout Calculation ---
 # Layout:
 # DC-DC: Back Left (Connectors facing BACK)
@@ -58,8 +90,6 @@ gap = 2 # Tight gap between boards
 box_inner_w = 170 # Fixed width
 box_inner_d = 140 # Increased to 140mm to resolve Cutout/USB-C overlap
 
-print(f"Box Internal Dimensions: {box_inner_w:.1f} x {box_inner_d:.1f} mm")
-
 # Component Positions (Relative to Box Origin 0,0)
 
 # USB-C: Back Right (Fixed Anchor)
@@ -98,15 +128,7 @@ def make_detailed_dcdc():
     pcb = pcb + comps.part
              
     # Terminals (Green)
-    with BuildPart() as terms:
-        with Locations((0, 0, 2)):
-            term_w = 15
-            term_d = 10 
-            term_h = 10
-            with Locations([(10 + i*22, 0, 0) for i in range(4)]):
-                Box(term_w, term_d, term_h, align=(Align.MIN, Align.MIN, Align.MIN))
-                
-    return pcb, terms.part
+    return pcb, make_connectors(dcdc_terminals)
 
 def make_detailed_sata():
     """Generates SATA parts: (PCB, Connectors)."""
@@ -121,247 +143,389 @@ def make_detailed_sata():
              Box(sata_board_w-20, sata_board_d-10, 5, align=(Align.MIN, Align.MIN, Align.MIN)).moved(Location((5,5)))
     pcb = pcb + comps.part
 
-    # Connectors (White) - On Right Edge (X=58)
+    # Connectors (White) - Molex on the Right Edge (X=58), DC Jack (Black) flush with the Bottom Edge (Y=0)
+    return pcb, make_connectors(sata_connectors)
+
+def make_detailed_m2():
+    """Generates M.2 adapter parts: (PCB, Plug). 96 wide along X, 24 deep."""
+    pcb = Box(m2_pcb_d, m2_pcb_w, 2, align=(Align.MIN, Align.MIN, Align.MIN))
+    return pcb, make_connectors(m2_connectors)
+
+def make_connectors(connectors):
+    """Boxes for a board's (label, u, v, w, d, height) connectors, on top of its 2mm PCB."""
     with BuildPart() as conns:
-        with Locations((0, 0, 2)):
-            # Large Molex
-            conn_w = 10
-            conn_l = 25
-            conn_h = 12
-            with Locations([(sata_board_w - conn_w, y, 0) for y in [25, 55]]): # Adjusted positions
-                Box(conn_w, conn_l, conn_h, align=(Align.MIN, Align.MIN, Align.MIN))
-    
-            # DC Jack (Black) - Bottom Edge (Y=0)
-            # Position: Center X approx 20-30?
-            # From image: Bottom left-ish. Let's say X=20, Y=0.
-            # Size: 10x15 (deep) x 10
-            # Extends slightly off board? Or flush? Lets make it flush with edge.
-            with Locations((15, 0, 0)):
-                 Box(12, 14, 10, align=(Align.MIN, Align.MIN, Align.MIN))
-                 
-    return pcb, conns.part
-
-# Generate Ghosts
-dcdc_pcb_raw, dcdc_terms_raw = make_detailed_dcdc()
-sata_pcb_raw, sata_conns_raw = make_detailed_sata()
+        for _, u, v, w, d, height in connectors:
+            with Locations((u, v, 2)):
+                Box(w, d, height, align=(Align.MIN, Align.MIN, Align.MIN))
+    return conns.part
 
 # --- Builders ---
 
+def box_floor_keepouts():
+    """Floor regions the hex pattern must leave solid."""
+    def mounts(center_x, center_y, w_hole, d_hole):
+        return [circle_keepout(center_x + x, center_y + y, standoff_radius + 4) for x in [-w_hole/2, w_hole/2] for y in [-d_hole/2, d_hole/2]]
+
+    return [
+        # DC-DC Mounts
+        *mounts(dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d),
+        # SATA Mounts
+        *mounts(sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d),
+        # M.2 & USB-C
+        circle_keepout(m2_x + 2, m2_y + 2, standoff_radius + 4),
+        circle_keepout(m2_x + 96 - 2, m2_y + 2, standoff_radius + 4),
+        circle_keepout(m2_x + 2, m2_y + 24 - 2, standoff_radius + 4),
+        circle_keepout(m2_x + 96 - 2, m2_y + 24 - 2, standoff_radius + 4),
+        rect_keepout(usbc_x - 2, usbc_y - 2, usbc_bracket_width + 4, usbc_bracket_thickness + 4),
+    ]
+
+def box_floor_plate():
+    """Box floor honeycomb: outline, hex grid and solid regions (see rack_infill.py)."""
+    return {
+        "outer": (0, 0, box_inner_w, box_inner_d),
+        # Safe Zones
+        # User wants 5mm visible border inside the walls.
+        # Walls are 1.6mm thick. So we need 5 + 1.6 = 6.6mm border from the outer edge.
+        "safe": (6.6, 6.6, box_inner_w - 6.6, box_inner_d - 6.6),
+        "keepouts": box_floor_keepouts(),
+        "center": (box_inner_w/2, box_inner_d/2),
+        "thickness": floor_thickness,
+        "hex": (floor_hex_radius, floor_hex_cell, floor_hex_counts, floor_hex_shift),
+        "params": ("floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift"),
+    }
+
+def box_cutters():
+    """Hole solids subtracted from the box."""
+    cutters = []
+
+    # Standoff Holes (M3 Pilot)
+    hole = Cylinder(radius=screw_hole_radius, height=standoff_height + floor_thickness + 1, align=(Align.CENTER, Align.CENTER, Align.MIN))
+    def add_holes(center_x, center_y, w_hole, d_hole):
+        for x in [-w_hole/2, w_hole/2]:
+            for y in [-d_hole/2, d_hole/2]:
+                cutters.append(Location((center_x + x, center_y + y, 0)) * hole)
+
+    add_holes(dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d)
+    add_holes(sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d)
+    add_holes(m2_x + 48, m2_y + 12, 96 - 4, 24 - 4)
+
+    # USB-C Hole
+    hole_y_center = usbc_y + usbc_bracket_thickness/2
+    cutters.append(
+        Location((usbc_x + usbc_bracket_width/2, hole_y_center, floor_thickness + usbc_hole_height))
+        * Rotation(90, 0, 0)
+        * Cylinder(radius=usbc_hole_dia/2, height=usbc_bracket_thickness + 10, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+    )
+
+    return cutters
+
+def box_openings():
+    """Wall openings around the connectors facing a wall (rack_cutouts.py)."""
+    board_top = floor_thickness + standoff_height + 2
+    return wall_openings([
+        ("DC-DC", connector_boxes(dcdc_terminals, dcdc_x, dcdc_y, dcdc_board_w, dcdc_board_d, board_top, dcdc_rot)),
+        ("SATA", connector_boxes(sata_connectors, sata_x, sata_y, sata_board_w, sata_board_d, board_top, sata_rot)),
+        ("M.2", connector_boxes(m2_connectors, m2_x, m2_y, m2_pcb_d, m2_pcb_w, board_top)),
+    ], box_inner_w, box_inner_d, cutout_margin, cutout_reach)
+
+@cached_part(
+    "box_inner_w", "box_inner_d", "box_height", "wall_thickness", "floor_thickness",
+    "dcdc_x", "dcdc_y", "dcdc_board_w", "dcdc_board_d", "dcdc_hole_w", "dcdc_hole_d",
+    "sata_x", "sata_y", "sata_board_w", "sata_board_d", "sata_hole_w", "sata_hole_d",
+    "m2_x", "m2_y", "usbc_x", "usbc_y", "usbc_bracket_width", "usbc_bracket_thickness",
+    "usbc_bracket_height", "usbc_hole_dia", "usbc_hole_height",
+    "standoff_height", "standoff_radius", "screw_hole_radius",
+    "dcdc_rot", "sata_rot", "dcdc_terminals", "sata_connectors", "m2_connectors", "cutout_margin", "cutout_reach",
+    "floor_hex_radius", "floor_hex_cell", "floor_hex_counts", "floor_hex_shift",
+)
 def make_box():
     """Generates the compact box with hex floor, mounts, and wall cutouts."""
+
+    # Hole cutters, created before BuildPart so they aren't added to the box
+    with stage("box.cutters"):
+        cutters = box_cutters()
     
     with BuildPart() as box:
         # 1. Floor with Hex Pattern
-        with BuildSketch(Plane.XY):
-            Rectangle(box_inner_w, box_inner_d, align=(Align.MIN, Align.MIN))
-            
-            # Hex Pattern
-            with BuildSketch(mode=Mode.PRIVATE) as sk_hex:
-                with Locations((box_inner_w/2, box_inner_d/2)):
-                    # Increased radius for larger holes (less plastic)
-                    # Adjusted counts for larger hexes
-                    with HexLocations(radius=12, x_count=14, y_count=10):
-                        RegularPolygon(radius=11, side_count=6)
-            
-            # Safe Zones
-            # User wants 5mm visible border inside the walls.
-            # Walls are 1.6mm thick. So we need 5 + 1.6 = 6.6mm border from the outer edge.
-            # Use Center alignment to ensure symmetry and avoid shift errors.
-            margin = 6.6
-            with BuildSketch(mode=Mode.PRIVATE) as sk_allowed:
-                with Locations((box_inner_w/2, box_inner_d/2)):
-                    Rectangle(box_inner_w - 2*margin, box_inner_d - 2*margin, align=(Align.CENTER, Align.CENTER))
-                
-                with BuildSketch(mode=Mode.SUBTRACT):
-                    # DC-DC Mounts
-                    with Locations((dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2)):
-                         with Locations([(x, y) for x in [-dcdc_hole_w/2, dcdc_hole_w/2] for y in [-dcdc_hole_d/2, dcdc_hole_d/2]]):
-                            Circle(radius=standoff_radius + 4)
-
-                    # SATA Mounts
-                    with Locations((sata_x + sata_board_w/2, sata_y + sata_board_d/2)): 
-                         with Locations([(x, y) for x in [-sata_hole_w/2, sata_hole_w/2] for y in [-sata_hole_d/2, sata_hole_d/2]]):
-                            Circle(radius=standoff_radius + 4)
-                            
-                    # M.2 & USB-C 
-                    with Locations((m2_x + 2, m2_y + 2)): Circle(radius=standoff_radius + 4)
-                    with Locations((m2_x + 96 - 2, m2_y + 2)): Circle(radius=standoff_radius + 4)
-                    with Locations((m2_x + 2, m2_y + 24 - 2)): Circle(radius=standoff_radius + 4)
-                    with Locations((m2_x + 96 - 2, m2_y + 24 - 2)): Circle(radius=standoff_radius + 4)
-                    with Locations((usbc_x - 2, usbc_y - 2)): Rectangle(usbc_bracket_width + 4, usbc_bracket_thickness + 4, align=(Align.MIN, Align.MIN))
-
-            cutouts = sk_hex.sketch & sk_allowed.sketch
-            add(cutouts, mode=Mode.SUBTRACT)
-        
-        extrude(amount=floor_thickness)
+        # Cutouts = Hexagons INTERSECT (SafeZone MINUS Mounts), clipped in rack_pattern
+        with stage("box.floor.hex"):
+            floor_face = plate_face(box_floor_plate())
+        with stage("box.floor.extrude"):
+            extrude(floor_face, amount=floor_thickness)
         
         # 2. Walls with Cutouts
         
-        # Define Walls (Solids)
-        # Use mode=Mode.PRIVATE to prevent the base Box from being added to the part at (0,0)
-        
-        # Back Wall (Top)
-        top_wall = Location((0, box_inner_d, 0)) * Box(box_inner_w, wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
-        # Front Wall (Bottom)
-        bottom_wall = Location((0, -wall_thickness, 0)) * Box(box_inner_w, wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
-        # Left Wall
-        left_wall = Location((-wall_thickness, -wall_thickness, 0)) * Box(wall_thickness, box_inner_d + 2*wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
-        # Right Wall
-        right_wall = Location((box_inner_w, -wall_thickness, 0)) * Box(wall_thickness, box_inner_d + 2*wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
-        
-        walls = top_wall + bottom_wall + left_wall + right_wall
-        
-        # Define Cutouts (Solids)
+        with stage("box.walls.cutouts"):
+            # Define Walls (Solids)
+            # Use mode=Mode.PRIVATE to prevent the base Box from being added to the part at (0,0)
         
-        # DC-DC Cutout (Back Wall)
-        dcdc_cutout = Location((dcdc_x + 50, box_inner_d + wall_thickness/2, 15)) * Box(90, wall_thickness + 10, 20, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.PRIVATE)
+            # Back Wall (Top)
+            top_wall = Location((0, box_inner_d, 0)) * Box(box_inner_w, wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
+            # Front Wall (Bottom)
+            bottom_wall = Location((0, -wall_thickness, 0)) * Box(box_inner_w, wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
+            # Left Wall
+            left_wall = Location((-wall_thickness, -wall_thickness, 0)) * Box(wall_thickness, box_inner_d + 2*wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
+            # Right Wall
+            right_wall = Location((box_inner_w, -wall_thickness, 0)) * Box(wall_thickness, box_inner_d + 2*wall_thickness, box_height, align=(Align.MIN, Align.MIN, Align.MIN), mode=Mode.PRIVATE)
         
-        # SATA Cutout (Right Wall)
-        # Connectors span Y=25 to Y=80 relative to board origin.
-        # Cutout should cover this range with some margin.
-        # Center at 55 (avrg of 25 and 85ish). Height 70 extends 35 either side -> 20 to 90.
-        sata_cutout = Location((box_inner_w + wall_thickness/2, sata_y + 55, 15)) * Box(wall_thickness + 10, 70, 20, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.PRIVATE)
+            walls = top_wall + bottom_wall + left_wall + right_wall
         
-        # M.2 Cutout (Left Wall)
-        # Dynamic Y position based on m2_y
-        # Widen by 2mm as requested (24 -> 26)
-        m2_cutout = Location((-wall_thickness/2, m2_y + 12, 15)) * Box(wall_thickness + 10, 26, 20, align=(Align.CENTER, Align.CENTER, Align.CENTER), mode=Mode.PRIVATE)
+            # Define Cutouts (Solids)
+            # One opening per board and wall its connectors face (DC-DC: back, SATA: right, M.2: left),
+            # sized from the connector tables, so moving a board moves its opening
+            openings = wall_cutters(box_openings(), box_inner_w, box_inner_d, wall_thickness)
         
-        # Text "Powerbox" on FRONT Wall (Outside)
-        # Front Wall is at Y = 0 (inner face). Outer face is Y = -wall_thickness.
-        # Logo on FRONT Wall (Outside)
-        # "Flash" Icon + "POWERBOX" Text
-        with BuildSketch(Plane.XZ.offset(wall_thickness), mode=Mode.PRIVATE) as sk_logo:
-             with Locations((box_inner_w/2, 20)): # Center of Front Wall
+            # Text "Powerbox" on FRONT Wall (Outside)
+            # Front Wall is at Y = 0 (inner face). Outer face is Y = -wall_thickness.
+            # Logo on FRONT Wall (Outside)
+            # "Flash" Icon + "POWERBOX" Text
+            with BuildSketch(Plane.XZ.offset(wall_thickness), mode=Mode.PRIVATE) as sk_logo:
+                 with Locations((box_inner_w/2, 20)): # Center of Front Wall
                 
-                # 1. Lightning Bolt Icon (Vector Shape)
-                # Position: Left of text. Total width approx 160mm.
-                # Let's center the whole group.
-                # Bolt is approx 15mm wide x 25mm high.
-                # Text is approx 120mm wide.
-                # Total width ~ 145mm.
-                # Start Bolt at X = -70 relative to center.
+                    # 1. Lightning Bolt Icon (Vector Shape)
+                    # Position: Left of text. Total width approx 160mm.
+                    # Let's center the whole group.
+                    # Bolt is approx 15mm wide x 25mm high.
+                    # Text is approx 120mm wide.
+                    # Total width ~ 145mm.
+                    # Start Bolt at X = -70 relative to center.
                 
-                with Locations((-75, 0)):
-                    # Draw a cool lightning bolt
-                    # Points relative to its specific center
-                    Polygon([
-                        (5, 12),   # Top Right tip
-                        (-5, 4),   # Top Left inner
-                        (-8, 12),  # Top Left tip
-                        (-2, -2),  # Middle Left
-                        (-6, -2),  # Bottom Left Ext
-                        (4, -12),  # Bottom Tip
-                        (0, 0),    # Middle Right
-                        (6, 0)     # Top Right Ext
-                    ], align=(Align.CENTER, Align.CENTER))
+                    with Locations((-75, 0)):
+                        # Draw a cool lightning bolt
+                        # Points relative to its specific center
+                        Polygon([
+                            (5, 12),   # Top Right tip
+                            (-5, 4),   # Top Left inner
+                            (-8, 12),  # Top Left tip
+                            (-2, -2),  # Middle Left
+                            (-6, -2),  # Bottom Left Ext
+                            (4, -12),  # Bottom Tip
+                            (0, 0),    # Middle Right
+                            (6, 0)     # Top Right Ext
+                        ], align=(Align.CENTER, Align.CENTER))
                 
-                # 2. Text "POWERBOX"
-                # Use a strong font. "Impact" or "Futura" or "Arial Black".
-                # Trying "Futura" (Mac standard).
-                with Locations((10, 0)): # Shift right to make room for bolt
-                    Text("POWERBOX", font_size=24, font="Futura", font_style=FontStyle.BOLD, align=(Align.CENTER, Align.CENTER))
+                    # 2. Text "POWERBOX"
+                    # Use a strong font. "Impact" or "Futura" or "Arial Black".
+                    # Trying "Futura" (Mac standard).
+                    with Locations((10, 0)): # Shift right to make room for bolt
+                        Text("POWERBOX", font_size=24, font="Futura", font_style=FontStyle.BOLD, align=(Align.CENTER, Align.CENTER))
         
-        # Create solid for Logo (Private)
-        # Extrude into the wall (-Y direction)
-        text_solid = extrude(sk_logo.sketch, amount=-0.6, mode=Mode.PRIVATE)
+            # Create solid for Logo (Private)
+            # Extrude into the wall (-Y direction)
+            text_solid = extrude(sk_logo.sketch, amount=-0.6, mode=Mode.PRIVATE)
         
-        # Apply subtractions (Carve the socket)
-        walls = walls - dcdc_cutout - sata_cutout - m2_cutout - text_solid
+            # Apply subtractions (Carve the socket): openings and logo in a single cut
+            walls = batched_cut(walls, [*openings, text_solid])
         
-        add(walls)
+            add(walls)
             
         # 3. Standoffs (Updated)
-        def add_standoffs(center_x, center_y, w_hole, d_hole):
-             with Locations((center_x, center_y, floor_thickness)):
-                with Locations([(x, y) for x in [-w_hole/2, w_hole/2] for y in [-d_hole/2, d_hole/2]]):
-                    Cylinder(radius=standoff_radius, height=standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
+        with stage("box.standoffs"):
+            def add_standoffs(center_x, center_y, w_hole, d_hole):
+                 with Locations((center_x, center_y, floor_thickness)):
+                    with Locations([(x, y) for x in [-w_hole/2, w_hole/2] for y in [-d_hole/2, d_hole/2]]):
+                        Cylinder(radius=standoff_radius, height=standoff_height, align=(Align.CENTER, Align.CENTER, Align.MIN))
 
-        add_standoffs(dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d)
-        add_standoffs(sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d)
+            add_standoffs(dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d)
+            add_standoffs(sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d)
         
-        # M.2 Standoffs (48, 12 offset relative to m2_x, m2_y)
-        m2_hole_w = 96 - 4
-        m2_hole_d = 24 - 4
-        add_standoffs(m2_x + 48, m2_y + 12, m2_hole_w, m2_hole_d)
+            # M.2 Standoffs (48, 12 offset relative to m2_x, m2_y)
+            m2_hole_w = 96 - 4
+            m2_hole_d = 24 - 4
+            add_standoffs(m2_x + 48, m2_y + 12, m2_hole_w, m2_hole_d)
 
         # 4. USB-C Bracket
-        with Locations((usbc_x, usbc_y, floor_thickness)):
-            Box(usbc_bracket_width, usbc_bracket_thickness, usbc_bracket_height, align=(Align.MIN, Align.MIN, Align.MIN))
-            with Locations((0, 0, usbc_bracket_height)):
-                Box(usbc_bracket_width, usbc_bracket_thickness, 5, align=(Align.MIN, Align.MIN, Align.MIN))
+        with stage("box.bracket"):
+            with Locations((usbc_x, usbc_y, floor_thickness)):
+                Box(usbc_bracket_width, usbc_bracket_thickness, usbc_bracket_height, align=(Align.MIN, Align.MIN, Align.MIN))
+                with Locations((0, 0, usbc_bracket_height)):
+                    Box(usbc_bracket_width, usbc_bracket_thickness, 5, align=(Align.MIN, Align.MIN, Align.MIN))
                 
         # 5. Holes (Subtractions)
-        with BuildPart(mode=Mode.SUBTRACT):
-            # Standoff Holes (M3 Pilot)
-            def add_holes(center_x, center_y, w_hole, d_hole):
-                with Locations((center_x, center_y, 0)):
-                    with Locations([(x, y) for x in [-w_hole/2, w_hole/2] for y in [-d_hole/2, d_hole/2]]):
-                        Cylinder(radius=screw_hole_radius, height=standoff_height + floor_thickness + 1, align=(Align.CENTER, Align.CENTER, Align.MIN))
-            
-            add_holes(dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d)
-            add_holes(sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d)
-            add_holes(m2_x + 48, m2_y + 12, m2_hole_w, m2_hole_d)
-             
-            # USB-C Hole
-            hole_y_center = usbc_y + usbc_bracket_thickness/2
-            with Locations((usbc_x + usbc_bracket_width/2, hole_y_center, floor_thickness + usbc_hole_height)):
-                with Locations(Rotation(90, 0, 0)):
-                    Cylinder(radius=usbc_hole_dia/2, height=usbc_bracket_thickness + 10, align=(Align.CENTER, Align.CENTER, Align.CENTER))
+        with stage("box.subtract.holes"):
+            subtract(box, cutters, "box")
 
     return box.part, text_solid
 
-# --- Apply Rotations to Ghosts ---
-
-# DC-DC: Rotate 180 around its center (50, 34)
-# Then move to position (dcdc_x, dcdc_y, z)
-# Translation first, then Rotate? No, Local Rotation.
-# If we rotate the Part geometry 180, the headers at Y=0 move to Top (relative to part).
-# Then we place the part.
-# Center adjustment: simple rotate around (0,0) is fine if we generated centered? 
-# Currently generated at 0,0 min corner. Rotating 180 moves it to negative coords.
-# Correction: rotate around Z axis (origin).
-# Raw: 0..W, 0..D. Rotated 180: -W..0, -D..0.
-# We want to place it at dcdc_x..dcdc_x+W, dcdc_y..dcdc_y+D.
-# So we need to translate by (dcdc_x + W, dcdc_y + D).
-dcdc_pcb = dcdc_pcb_raw.rotate(Axis.Z, 180)
-dcdc_terms = dcdc_terms_raw.rotate(Axis.Z, 180)
-
-# Final Location includes the shift for the rotation
-dcdc_shift = (dcdc_x + dcdc_board_w, dcdc_y + dcdc_board_d, standoff_height + floor_thickness)
-dcdc_pcb_loc = Location(dcdc_shift) * dcdc_pcb
-dcdc_terms_loc = Location(dcdc_shift) * dcdc_terms
-
-# SATA: Rotate 0 (No change needed, connectors on Right Edge aligned with Right Wall)
-sata_pcb_loc = Location((sata_x, sata_y, standoff_height + floor_thickness)) * sata_pcb_raw
-sata_conn_loc = Location((sata_x, sata_y, standoff_height + floor_thickness)) * sata_conns_raw
-
-# M.2
-m2_ghost = Location((m2_x, m2_y, standoff_height + floor_thickness)) * Box(96, 24, 2, align=(Align.MIN, Align.MIN, Align.MIN))
-
-# USB-C
-usbc_ghost = Location((usbc_x + usbc_bracket_width/2, usbc_y + usbc_bracket_thickness, floor_thickness + usbc_hole_height)) * Rotation(90, 0, 0) * Cylinder(radius=15/2, height=40, align=(Align.CENTER, Align.CENTER, Align.MIN))
+# --- Ghosts (Visualization Only) ---
+
+def make_ghosts(detail=board_detail):
+    """Generates the board ghosts at their final positions: [(name, shape, color)].
+
+    "detailed" keeps PCB and connectors apart, "ghost" fuses each board into one solid (rack_lod.py).
+    """
+    # Generate Ghosts
+    dcdc_pcb_raw, dcdc_terms_raw = make_detailed_dcdc()
+    sata_pcb_raw, sata_conns_raw = make_detailed_sata()
+
+    # --- Apply Rotations to Ghosts ---
+
+    # DC-DC: Rotate 180 around its center (50, 34)
+    # Then move to position (dcdc_x, dcdc_y, z)
+    # Translation first, then Rotate? No, Local Rotation.
+    # If we rotate the Part geometry 180, the headers at Y=0 move to Top (relative to part).
+    # Then we place the part.
+    # Center adjustment: simple rotate around (0,0) is fine if we generated centered? 
+    # Currently generated at 0,0 min corner. Rotating 180 moves it to negative coords.
+    # Correction: rotate around Z axis (origin).
+    # Raw: 0..W, 0..D. Rotated 180: -W..0, -D..0.
+    # We want to place it at dcdc_x..dcdc_x+W, dcdc_y..dcdc_y+D.
+    # So we need to translate by (dcdc_x + W, dcdc_y + D).
+    dcdc_pcb = dcdc_pcb_raw.rotate(Axis.Z, 180)
+    dcdc_terms = dcdc_terms_raw.rotate(Axis.Z, 180)
+
+    # Final Location includes the shift for the rotation
+    dcdc_shift = (dcdc_x + dcdc_board_w, dcdc_y + dcdc_board_d, standoff_height + floor_thickness)
+    dcdc_pcb_loc = Location(dcdc_shift) * dcdc_pcb
+    dcdc_terms_loc = Location(dcdc_shift) * dcdc_terms
+
+    # SATA: Rotate 0 (No change needed, connectors on Right Edge aligned with Right Wall)
+    sata_pcb_loc = Location((sata_x, sata_y, standoff_height + floor_thickness)) * sata_pcb_raw
+    sata_conn_loc = Location((sata_x, sata_y, standoff_height + floor_thickness)) * sata_conns_raw
+
+    # M.2
+    m2_pcb_raw, m2_conns_raw = make_detailed_m2()
+    m2_pcb_loc = Location((m2_x, m2_y, standoff_height + floor_thickness)) * m2_pcb_raw
+    m2_conn_loc = Location((m2_x, m2_y, standoff_height + floor_thickness)) * m2_conns_raw
+
+    # USB-C
+    usbc_ghost = Location((usbc_x + usbc_bracket_width/2, usbc_y + usbc_bracket_thickness, floor_thickness + usbc_hole_height)) * Rotation(90, 0, 0) * Cylinder(radius=15/2, height=40, align=(Align.CENTER, Align.CENTER, Align.MIN))
+
+    if detail == "detailed":
+        return [
+            ("DC-DC PCB", dcdc_pcb_loc, "red"), ("DC-DC Terms (Green)", dcdc_terms_loc, "green"),
+            ("SATA PCB", sata_pcb_loc, "blue"), ("SATA Conns (White)", sata_conn_loc, "white"),
+            ("M.2 PCB", m2_pcb_loc, "green"), ("M.2 Plug", m2_conn_loc, "white"),
+            ("USB-C", usbc_ghost, "purple"),
+        ]
+    return [
+        ("DC-DC", ghost_solid([dcdc_pcb_loc, dcdc_terms_loc]), "red"),
+        ("SATA", ghost_solid([sata_pcb_loc, sata_conn_loc]), "blue"),
+        ("M.2", ghost_solid([m2_pcb_loc, m2_conn_loc]), "green"), ("USB-C", usbc_ghost, "purple"),
+    ]
+
+# --- Layout Preview ---
+
+def layout():
+    """Top view of the box for `python rack.py layout v3`, mirroring make_box and make_ghosts (rack_layout.py)."""
+    board_z = floor_thickness + standoff_height
+    posts = (floor_thickness, board_z)
+    hole_z = floor_thickness + usbc_hole_height
+    return [
+        bounds("Box", 0, 0, box_inner_w, box_inner_d, wall_thickness, (0, box_height)),
+
+        # DC-DC: rotated 180, terminals along its back edge
+        *board("DC-DC", dcdc_x, dcdc_y, dcdc_board_w, dcdc_board_d, board_z, 2, [
+            ("components", 10, 10, dcdc_board_w - 20, dcdc_board_d - 20, 5),
+            *dcdc_terminals,
+        ], rotation=dcdc_rot),
+        *standoffs("DC-DC standoff", dcdc_x + dcdc_board_w/2, dcdc_y + dcdc_board_d/2, dcdc_hole_w, dcdc_hole_d, standoff_radius, posts, "DC-DC"),
+
+        # SATA: connectors on the right edge, DC jack on the front edge
+        *board("SATA", sata_x, sata_y, sata_board_w, sata_board_d, board_z, 2, [
+            ("components", 5, 5, sata_board_w - 20, sata_board_d - 10, 5),
+            *sata_connectors,
+        ], rotation=sata_rot),
+        *standoffs("SATA standoff", sata_x + sata_board_w/2, sata_y + sata_board_d/2, sata_hole_w, sata_hole_d, standoff_radius, posts, "SATA"),
+        # Room for the DC jack's plug: 35mm in front of the board
+        keepout("SATA jack clearance", sata_x + 15 - 3, sata_y - 35, 12 + 6, 35, (floor_thickness, box_height), "SATA"),
+
+        # M.2: 96 x 24, lying along X
+        *board("M.2", m2_x, m2_y, m2_pcb_d, m2_pcb_w, board_z, 2, m2_connectors),
+        *standoffs("M.2 standoff", m2_x + 48, m2_y + 12, 96 - 4, 24 - 4, standoff_radius, posts, "M.2"),
+
+        # USB-C: bracket with its 5mm cap, the socket reaching 40mm in from the back
+        rect("bracket", "USB-C bracket", usbc_x, usbc_y, usbc_bracket_width, usbc_bracket_thickness,
+             (floor_thickness, floor_thickness + usbc_bracket_height + 5), "USB-C"),
+        rect("component", "USB-C socket", usbc_x + usbc_bracket_width/2 - 15/2, usbc_y + usbc_bracket_thickness - 40, 15, 40,
+             (hole_z - 15/2, hole_z + 15/2), "USB-C"),
+
+        # Wall cutouts around the connectors facing a wall
+        *[cutout(o["name"], o["wall"], *opening_rect(o, box_inner_w, box_inner_d, wall_thickness), o["z"], o["group"]) for o in box_openings()],
+        cutout("USB-C hole", "back", usbc_x + usbc_bracket_width/2 - usbc_hole_dia/2, usbc_y + usbc_bracket_thickness/2 - (usbc_bracket_thickness + 10)/2,
+               usbc_hole_dia, usbc_bracket_thickness + 10, (hole_z - usbc_hole_dia/2, hole_z + usbc_hole_dia/2), "USB-C"),
+    ]
+
+# Component -> the parameters placing it and the wall its connectors face, for
+# `python rack.py pack v3` (rack_pack.py). The components are layout() groups.
+PACKING = {
+    "box": ("box_inner_w", "box_inner_d"),
+    "gap": gap, "wall_gap": padding,
+    "components": {
+        "DC-DC": {"x": "dcdc_x", "y": "dcdc_y", "wall": "back"},
+        "SATA": {"x": "sata_x", "y": "sata_y", "wall": "right"},
+        "M.2": {"x": "m2_x", "y": "m2_y", "wall": "left"},
+        "USB-C": {"x": "usbc_x", "y": "usbc_y", "wall": "back", "wall_gap": 0}, # Flush: the bracket is the wall's inside
+    },
+}
+
+# --- Build Everything ---
+
+# Everything comes out of one make_box() call
+PART_NAMES = ["box", "text", "combined"]
+
+# Honeycomb plate name -> plate function, see rack_infill.py
+HONEYCOMBS = {
+    "box_floor": "box_floor_plate",
+}
+
+# (part, file name), see rack_export.export_parts
+EXPORTS = [
+    ("combined", "rack_v3_box.step"),
+    # STL usually flattens/merges flush faces, making text invisible.
+    # So we export separate STLs for maximum compatibility.
+    ("box", "rack_v3_box_base.stl"),
+    ("text", "rack_v3_text.stl"),
+    # Also keep the combined one just in case
+    ("combined", "rack_v3_box_combined.stl"),
+]
+
+# STL mesh profile per part (rack_mesh.PROFILES), others use the default
+STL_PROFILES = {
+    "text": "archive", # Small letters, keep their curves smooth
+}
 
-if __name__ == "__main__":
+def build(names=None):
+    """Builds the named parts (default: all) and returns {name: shape}."""
+    names = PART_NAMES if names is None else names
     box_part, text_part = make_box()
-    
+
     # Create Assembly for Export
     # Compound allows exporting multiple solids in one file (recognized as parts by Slicers)
-    final_assembly = Compound([box_part, text_part])
-    
-    export_step(final_assembly, "rack_v3_box.step")
-    # STL usually flattens/merges flush faces, making text invisible.
-    # So we export separate STLs for maximum compatibility.
-    export_stl(box_part, "rack_v3_box_base.stl")
-    export_stl(text_part, "rack_v3_text.stl")
-    # Also keep the combined one just in case
-    export_stl(final_assembly, "rack_v3_box_combined.stl")
-    
+    parts = {"box": box_part, "text": text_part}
+    if "combined" in names:
+        parts["combined"] = Compound([box_part, text_part])
+    return {name: parts[name] for name in names}
+
+def view_objects(parts):
+    """Returns what the viewer shows: the box, its text and the board ghosts as [(name, shape, color, alpha)]."""
+    # Update visualization to show text in a contrasting color
+    objects = [(label, parts[name], color, None) for name, label, color in [("box", "V3 Box", "lightgray"), ("text", "Powerbox Text", "black")] if name in parts]
+    objects += [(name, shape, color, None) for name, shape, color in make_ghosts()]
+    return objects
+
+def show_parts(parts):
+    """Sends the box and the board ghosts to the ocp_vscode viewer."""
+    from ocp_vscode import show
+
+    objects = view_objects(parts)
+    prime_view(objects) # Meshes from the tessellation cache, see rack_meshcache.py
+    show(*[shape for _, shape, _, _ in objects],
+         names=[name for name, _, _, _ in objects],
+         colors=[color for _, _, color, _ in objects],
+         transparent=True)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    print(f"Box Internal Dimensions: {box_inner_w:.1f} x {box_inner_d:.1f} mm")
+
+    parts = build()
+    export_parts(parts, EXPORTS, params=design_params(globals()), profiles=STL_PROFILES, design="rack_v3")
+
     try:
-        # Update visualization to show text in a contrasting color
-        show(box_part, text_part, dcdc_pcb_loc, dcdc_terms_loc, sata_pcb_loc, sata_conn_loc, m2_ghost, usbc_ghost,
-             names=["V3 Box", "Powerbox Text", "DC-DC PCB", "DC-DC Terms (Green)", "SATA PCB", "SATA Conns (White)", "M.2", "USB-C"],
-             colors=["lightgray", "black", "red", "green", "blue", "white", "green", "purple"],
-             transparent=True)
+        show_parts(parts)
     except:
         pass
+
+if __name__ == "__main__":
+    main()
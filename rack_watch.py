@@ -0,0 +1,231 @@
+# ==============================================================================
+# Watch Mode
+# Keeps OCC loaded, rebuilds what an edit touched and pushes it to the viewer.
+# ==============================================================================
+#
+# Usage:
+#
+#     python rack.py watch v106                          # rebuild + show on every save
+#     python rack.py watch v106 --params my_rack.json    # plus parameter overrides
+#     python rack.py watch v3 --export build/            # also keep the exports current
+#
+# Watched: the design module, the rack_*.py helpers next to it and the
+# parameter file ({"rack_inner_width": 190, ...}, see rack_params.py).
+#
+# On a change the design module is reloaded with the current overrides and
+# each part (an entry of the design's PARTS, or the whole build() for designs
+# without PARTS) gets a key from its generator source and the parameters it
+# reads (rack_deps.generator_reads, plus cached_part's declared names). Only
+# parts whose key changed are rebuilt; a parameter file change first prints
+# the parts it affects (rack_deps.affected). A changed helper module is
+# reloaded first; the keys include the helper functions a generator calls,
+# so only the parts using it rebuild. A failing build keeps the last good
+# part and is retried on the next change.
+#
+# The first view is sent with show(). After that only viewer objects whose
+# geometry changed are sent again (show_object), unless objects were added or
+# removed. Solids that didn't change get their mesh from the tessellation
+# cache (rack_meshcache.prime) instead of being meshed again by the viewer.
+
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+from rack_cache import part_params, source_digest
+from rack_deps import affected, generator_reads
+from rack_manifest import geometry_hash
+from rack_meshcache import prime_view
+from rack_params import load_variant, module_path
+
+INTERVAL = 0.5 # Seconds between file checks
+
+
+# --- Parts ---
+
+def part_specs(module):
+    """{part: (generator, *arg globals)}, or the whole build() as one part."""
+    specs = getattr(module, "PARTS", None)
+    return dict(specs) if specs else {"*": ("build",)}
+
+
+def part_key(module, spec):
+    func_name, *arg_names = spec
+    func = getattr(module, func_name)
+    declared = getattr(func, "cache_params", None) is not None
+    payload = json.dumps({
+        "source": source_digest(func),
+        "args": [repr(getattr(module, name)) for name in arg_names],
+        "params": part_params(func) if declared else {name: getattr(module, name) for name in sorted(generator_reads(func))},
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def build_part(module, name, spec):
+    """Builds one entry of part_specs, returning {part: shape}."""
+    func_name, *arg_names = spec
+    result = getattr(module, func_name)(*[getattr(module, arg) for arg in arg_names])
+    return result if name == "*" else {name: result}
+
+
+# --- Viewer ---
+
+def _same(a, b):
+    """True if b is a (located) reference to the same geometry as a, tree, labels and colors included."""
+    children_a, children_b = list(getattr(a, "children", ())), list(getattr(b, "children", ()))
+    if (a.label, a.color and tuple(a.color)) != (b.label, b.color and tuple(b.color)) or len(children_a) != len(children_b):
+        return False
+    if children_a:
+        return all(_same(x, y) for x, y in zip(children_a, children_b))
+    return a.wrapped.IsSame(b.wrapped)
+
+
+class Viewer:
+    """Pushes view_objects() output to ocp_vscode, only what changed after the first time."""
+
+    def __init__(self, port):
+        self.port = port
+        self.shown = None # name -> shape
+        self.ocp = None
+
+    def update(self, objects):
+        if self.ocp is None:
+            try:
+                import ocp_vscode
+            except ImportError as e:
+                print(f"Viewer unavailable: {e}")
+                self.ocp = False
+                return
+            ocp_vscode.set_port(self.port)
+            self.ocp = ocp_vscode
+        if not self.ocp:
+            return
+
+        names = [name for name, _, _, _ in objects]
+        if self.shown is None or set(names) != set(self.shown):
+            prime_view(objects)
+            self.ocp.show(
+                *[shape for _, shape, _, _ in objects], names=names,
+                colors=[color for _, _, color, _ in objects],
+                alphas=[1.0 if alpha is None else alpha for _, _, _, alpha in objects],
+            )
+            print(f"Viewer: showed {len(objects)} objects")
+        else:
+            changed = [
+                (name, shape, color, alpha) for name, shape, color, alpha in objects
+                if not _same(self.shown[name], shape) and geometry_hash(self.shown[name]) != geometry_hash(shape)
+            ]
+            prime_view(changed)
+            for name, shape, color, alpha in changed:
+                options = {"color": color} if alpha is None else {"color": color, "alpha": alpha}
+                self.ocp.show_object(shape, name=name, options=options)
+            print(f"Viewer: updated {', '.join(name for name, *_ in changed) or 'nothing'}")
+        self.shown = {name: shape for name, shape, _, _ in objects}
+
+
+# --- Watcher ---
+
+class Watcher:
+    def __init__(self, module_name, params_file=None, names=None, export_folder=None, port=3939):
+        self.module_name = module_name
+        self.params_file = params_file
+        self.names = names
+        self.export_folder = export_folder
+        self.viewer = Viewer(port)
+        self.keys = {} # part spec -> key it was built with
+        self.parts = {}
+        self.mtimes = {}
+        self.last_overrides = None
+        self.folder = os.path.dirname(os.path.abspath(module_path(module_name)))
+
+    def watched_files(self):
+        files = sorted(
+            os.path.join(self.folder, name) for name in os.listdir(self.folder)
+            if name.startswith("rack") and name.endswith(".py")
+        )
+        return files + ([os.path.abspath(self.params_file)] if self.params_file else [])
+
+    def changed_files(self):
+        changed = []
+        for path in self.watched_files():
+            mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            if self.mtimes.get(path, -1) != mtime:
+                changed.append(path)
+                self.mtimes[path] = mtime
+        return changed
+
+    def overrides(self):
+        if not self.params_file or not os.path.exists(self.params_file):
+            return {}
+        with open(self.params_file) as f:
+            return json.load(f)
+
+    def reload_helpers(self, paths):
+        """Re-imports changed helper modules."""
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name not in (self.module_name, "rack", __name__) and name in sys.modules:
+                importlib.reload(sys.modules[name])
+
+    def rebuild(self, changed):
+        start = time.perf_counter()
+        self.reload_helpers(changed)
+        overrides = self.overrides()
+        module = load_variant(self.module_name, overrides, register=True)
+        if self.last_overrides is not None and overrides != self.last_overrides:
+            names = {name for name in set(overrides) | set(self.last_overrides) if overrides.get(name) != self.last_overrides.get(name)}
+            parts, _ = affected(module, names)
+            print(f"Changed {', '.join(sorted(names))}: affects {', '.join(parts) or 'no parts'}")
+        self.last_overrides = overrides
+
+        specs = part_specs(module)
+        if self.names and "*" not in specs:
+            specs = {name: spec for name, spec in specs.items() if name in self.names or "assembly" in self.names}
+        rebuilt = []
+        for name, spec in specs.items():
+            key = part_key(module, spec)
+            if self.keys.get(name) == key:
+                continue
+            part_start = time.perf_counter()
+            try:
+                self.parts.update(build_part(module, name, spec))
+            except Exception:
+                traceback.print_exc()
+                print(f"Build of {name} failed, keeping the last good version")
+                continue
+            self.keys[name] = key
+            rebuilt.append(f"{name} ({time.perf_counter() - part_start:.2f}s)")
+        print(f"Rebuilt {', '.join(rebuilt) if rebuilt else 'nothing'} in {time.perf_counter() - start:.2f}s")
+
+        if rebuilt and self.export_folder is not None:
+            self.export(module)
+        try:
+            self.viewer.update(module.view_objects(self.parts))
+        except Exception:
+            traceback.print_exc()
+
+    def export(self, module):
+        from rack_export import export_parts
+        from rack_manifest import design_params
+
+        parts = dict(self.parts)
+        if "assembly" in module.PART_NAMES and hasattr(module, "make_assembly") and all(name in parts for name in module.PARTS):
+            parts["assembly"] = module.make_assembly(parts)
+        os.makedirs(self.export_folder, exist_ok=True)
+        export_parts(parts, module.EXPORTS, folder=self.export_folder, params=design_params(vars(module)),
+                     max_workers=1, profiles=getattr(module, "STL_PROFILES", None), design=self.module_name)
+
+    def run(self, interval=INTERVAL):
+        print(f"Watching {self.module_name} (Ctrl+C to stop)")
+        while True:
+            changed = self.changed_files()
+            if changed:
+                print(f"--- {', '.join(os.path.basename(path) for path in changed[:3])}{' ...' if len(changed) > 3 else ''}")
+                try:
+                    self.rebuild(changed if self.keys else [])
+                except Exception:
+                    traceback.print_exc() # E.g. a syntax error mid-edit: wait for the next save
+            time.sleep(interval)
@@ -0,0 +1,56 @@
+# ==============================================================================
+# Mesh Array Tests
+# The bulk triangulation read (binary BREP) against the element by element one.
+# ==============================================================================
+#
+# Usage:
+#
+#     python -m pytest test_rack_mesh.py
+#
+# Both reads run on every face of the v106 shelf (planar and curved faces,
+# UV nodes), so an OCC upgrade that changes the binary layout shows up here
+# as a fallback or a mismatch rather than as broken STL files.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("build123d")
+
+import rack_mesh
+
+
+@pytest.fixture(scope="module")
+def shelf_triangulations():
+    from OCP.BRep import BRep_Tool
+    from OCP.TopLoc import TopLoc_Location
+
+    import rack_v106
+
+    shelf = rack_v106.make_shelf()
+    rack_mesh.clear_mesh(shelf)
+    rack_mesh.tessellate(shelf)
+    meshes = [BRep_Tool.Triangulation_s(face, TopLoc_Location()) for face in rack_mesh._faces(shelf)]
+    return shelf, [mesh for mesh in meshes if mesh is not None]
+
+
+def test_bulk_read_matches_element_read(shelf_triangulations):
+    _, meshes = shelf_triangulations
+    assert meshes
+    for mesh in meshes:
+        bulk = rack_mesh._bulk_arrays(mesh)
+        assert bulk is not None, "binary BREP layout not recognized"
+        nodes, triangles = rack_mesh._element_arrays(mesh)
+        np.testing.assert_array_equal(bulk[0], nodes)
+        np.testing.assert_array_equal(bulk[1], triangles)
+
+
+def test_fallback_gives_the_same_mesh(shelf_triangulations, monkeypatch):
+    shelf, _ = shelf_triangulations
+    vertices, triangles = rack_mesh.mesh_arrays(shelf)
+
+    monkeypatch.setattr(rack_mesh, "_bulk_read", True)
+    monkeypatch.setattr(rack_mesh, "_bulk_arrays", lambda mesh: None)
+    fallback_vertices, fallback_triangles = rack_mesh.mesh_arrays(shelf)
+    assert rack_mesh._bulk_read is False
+    np.testing.assert_array_equal(vertices, fallback_vertices)
+    np.testing.assert_array_equal(triangles, fallback_triangles)